@@ -0,0 +1,61 @@
+"""
+API routes for operating a running worker
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from datetime import datetime
+import asyncio
+import os
+from core.config import settings
+from core.observability import profiler
+
+router = APIRouter()
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    scope: str = Query("app", pattern="^(all|app|hot)$"),
+    include_idle: bool = False
+):
+    """
+    Sample this worker's stacks and return them as collapsed stacks
+
+    Profiles only the process that handles the request. scope "app" keeps
+    stacks through backend code, "hot" only those through ReasoningLoop,
+    TextChunker or PDFProcessor. Render the output with flamegraph.pl,
+    speedscope or inferno.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (PROFILER_ENABLED)")
+
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}"
+        )
+
+    try:
+        # Sampling runs on a worker thread, so the event loop (and the
+        # requests it serves) is profiled rather than blocked
+        collapsed, samples = await asyncio.to_thread(
+            profiler.profile,
+            seconds,
+            interval_ms / 1000,
+            scope,
+            include_idle
+        )
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"profile-{os.getpid()}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.folded"
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(samples),
+            "X-Profile-Pid": str(os.getpid()),
+        }
+    )
@@ -2,41 +2,202 @@
 API routes for audit logs
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-from datetime import datetime
-from models.schemas import AuditLogEntry, AuditLogQuery
-from core.governance.audit_logger import AuditLogger
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Optional
+from datetime import date, datetime
+import asyncio
+import csv
+import io
+from models.schemas import AuditLogEntry, AuditSearchResponse, AuditStatsResponse
+from core import serialization
+from core.governance.audit_logger import get_audit_logger
+from core.governance.audit_archive import run_retention
 
 router = APIRouter()
 
-audit_logger = AuditLogger()
+audit_logger = get_audit_logger()
+
+EXPORT_COLUMNS = [
+    "id", "timestamp", "question", "answer", "citations", "confidence_score",
+    "user_id", "llm_prompt", "llm_response", "retrieved_sources",
+    "document_versions", "reasoning_steps", "manual_review_recommended", "trace"
+]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
 
 
 @router.get("/logs", response_model=List[AuditLogEntry])
 async def get_audit_logs(
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     min_confidence: Optional[float] = None,
     document_id: Optional[str] = None,
-    limit: int = 100
+    chunk_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
 ):
     """
-    Retrieve audit logs with optional filters
+    Retrieve audit logs with optional filters, newest first
+    
+    When more logs match, the X-Next-Cursor header carries the cursor for
+    the next page.
     """
     try:
+        # Fetch one extra row to know whether another page exists
         logs = audit_logger.get_logs(
             start_date=start_date,
             end_date=end_date,
             min_confidence=min_confidence,
             document_id=document_id,
-            limit=limit
+            chunk_id=chunk_id,
+            limit=limit + 1,
+            cursor=cursor
         )
-        
-        return [AuditLogEntry(**log) for log in logs]
-        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving logs: {str(e)}")
+    
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = audit_logger.encode_cursor(logs[-1])
+    
+    # Validated and serialized once, by the response model
+    return logs
+
+
+@router.get("/logs/export")
+async def export_audit_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_confidence: Optional[float] = None,
+    document_id: Optional[str] = None,
+    chunk_id: Optional[str] = None
+):
+    """
+    Stream every matching audit log, oldest first, as NDJSON or CSV
+    """
+    batches = audit_logger.iter_logs(
+        start_date=start_date,
+        end_date=end_date,
+        min_confidence=min_confidence,
+        document_id=document_id,
+        chunk_id=chunk_id
+    )
+    body = _ndjson_lines(batches) if format == "ndjson" else _csv_lines(batches)
+    
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="audit_logs.{format}"'}
+    )
+
+
+def _ndjson_lines(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    """Encode log batches as NDJSON, one chunk per batch"""
+    for batch in batches:
+        yield b"".join(serialization.dumps_bytes(log) + b"\n" for log in batch)
+
+
+def _csv_lines(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    """Encode log batches as CSV with JSON-encoded nested fields"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    
+    for batch in batches:
+        for log in batch:
+            writer.writerow([
+                serialization.dumps(value) if isinstance(value, (list, dict)) else value
+                for value in (log.get(column) for column in EXPORT_COLUMNS)
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+@router.get("/search", response_model=AuditSearchResponse)
+async def search_audit_logs(
+    q: str = Query(..., min_length=1),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Full-text search over audit questions and answers, best match first
+    """
+    if not audit_logger.search_enabled:
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite with FTS5")
+    
+    try:
+        page = audit_logger.search_logs(
+            q,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            offset=offset
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching logs: {str(e)}")
+    
+    return AuditSearchResponse(query=q, limit=limit, offset=offset, **page)
+
+
+@router.get("/stats", response_model=AuditStatsResponse)
+async def get_audit_stats(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    top_documents: int = Query(10, ge=1, le=100)
+):
+    """
+    Question counts, average confidence, manual-review rates and most-cited
+    documents, answered from precomputed rollups
+    """
+    try:
+        return audit_logger.get_stats(
+            start_date=start_date,
+            end_date=end_date,
+            granularity=granularity,
+            top_documents=top_documents
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving stats: {str(e)}")
+
+
+@router.post("/archive")
+async def archive_audit_logs(before: Optional[date] = None):
+    """
+    Move closed days into the Parquet archive and apply retention
+    
+    Defaults to archiving everything older than AUDIT_HOT_RETENTION_DAYS.
+    """
+    if not audit_logger.archive.available:
+        raise HTTPException(status_code=501, detail="Audit archive requires pyarrow")
+    if before and before > date.today():
+        raise HTTPException(status_code=400, detail="before cannot be after today")
+    
+    try:
+        return await asyncio.to_thread(run_retention, audit_logger, before)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error archiving logs: {str(e)}")
+
+
+@router.get("/archive")
+async def get_audit_archive():
+    """
+    Get the archive manifest
+    """
+    return audit_logger.archive.manifest()
 
 
 @router.get("/logs/{log_id}", response_model=AuditLogEntry)
@@ -2,18 +2,40 @@
 API routes for document management
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from typing import List, Dict, Any, Optional
+import asyncio
 import os
+import shutil
 import uuid
+import zipfile
 from datetime import datetime
 
-from models.schemas import DocumentResponse, DocumentStatus
+from models.schemas import (
+    BulkIngestionResponse,
+    DocumentResponse,
+    DocumentStatus,
+    IngestionJobResponse,
+    IngestionQueueStats,
+    JobPriority,
+    JobStatus,
+)
 from core.ingestion.pdf_processor import PDFProcessor
 from core.ingestion.chunker import TextChunker
+from core.ingestion.job_queue import IngestionJobQueue, QueueFullError, TransientJobError
+from core.ingestion.pipeline import IngestionPipeline
+from core.ingestion.uploads import InvalidUploadError, UploadTooLargeError, save_upload
+from core.ingestion.bulk_ingestor import (
+    ArchiveTooLargeError,
+    BulkIngestor,
+    BulkManifest,
+    collect_directory_pdfs,
+    extract_pdf_archive,
+)
 from services.watsonx_ai.client import WatsonxAIClient
 from services.watsonx_data.client import WatsonxDataClient
-from core.governance.audit_logger import AuditLogger
+from core.governance.audit_logger import get_audit_logger
+from core.config import settings
 
 router = APIRouter()
 
@@ -22,44 +44,66 @@ documents_store = {}
 processor = PDFProcessor()
 chunker = TextChunker()
 
-# Initialize clients (may fail if credentials not set, that's OK for now)
-try:
-    ai_client = WatsonxAIClient()
-except Exception:
-    ai_client = None
+audit_logger = get_audit_logger()
 
-try:
-    data_client = WatsonxDataClient()
-except Exception:
-    data_client = None
+# Clients, the pipelines using them and the ingestion job queue (whose
+# worker threads run ingestion outside the web worker) are built in the
+# application lifespan (see init_services), so importing this module stays
+# cheap and doesn't create the queue database
+job_queue: Optional[IngestionJobQueue] = None
+bulk_manifest: Optional[BulkManifest] = None
+ai_client: Optional[WatsonxAIClient] = None
+data_client: Optional[WatsonxDataClient] = None
+pipeline: Optional[IngestionPipeline] = None
+bulk_ingestor: Optional[BulkIngestor] = None
 
-audit_logger = AuditLogger()
+# Allowance for multipart boundaries and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Document status as seen by clients, derived from the ingestion job
+JOB_TO_DOCUMENT_STATUS = {
+    JobStatus.QUEUED: DocumentStatus.PENDING,
+    JobStatus.RUNNING: DocumentStatus.PROCESSING,
+    JobStatus.RETRYING: DocumentStatus.PROCESSING,
+    JobStatus.SUCCEEDED: DocumentStatus.COMPLETED,
+    JobStatus.FAILED: DocumentStatus.FAILED,
+    JobStatus.CANCELLED: DocumentStatus.FAILED,
+}
 
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
-    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...),
-    document_type: str = None
+    document_type: str = None,
+    priority: JobPriority = JobPriority.NORMAL
 ):
     """
-    Upload and process a PDF document
+    Upload a PDF document and queue it for processing
     """
     # Validate file type
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
+    _check_content_length(request, settings.UPLOAD_MAX_BYTES)
+    
+    # Reject before writing the upload when ingestion is saturated
+    if job_queue.is_full():
+        raise _queue_full_error()
+    
     # Generate document ID
     doc_id = str(uuid.uuid4())
     
-    # Save file temporarily
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"{doc_id}.pdf")
+    # Stream file to disk, rejecting non-PDF content from its first bytes
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(settings.UPLOAD_DIR, f"{doc_id}.pdf")
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    saved = await _save_upload_or_400(
+        file,
+        file_path,
+        max_bytes=settings.UPLOAD_MAX_BYTES,
+        header_check=PDFProcessor.has_pdf_header
+    )
     
     # Create document record
     document = {
@@ -70,75 +114,379 @@ async def upload_document(
         "chunks_count": 0,
         "uploaded_at": datetime.now(),
         "processed_at": None,
-        "metadata": {}
+        "metadata": {
+            "file_size": saved["size"],
+            "file_hash": saved["sha256"]
+        }
     }
-    documents_store[doc_id] = document
     
-    # Process document in background
-    background_tasks.add_task(process_document, doc_id, file_path)
+    try:
+        job = job_queue.submit(
+            kind="document",
+            document_id=doc_id,
+            payload={**document, "file_path": file_path},
+            priority=priority.value
+        )
+    except QueueFullError:
+        os.remove(file_path)
+        raise _queue_full_error()
     
-    return DocumentResponse(**document)
+    document["job_id"] = job["id"]
+    documents_store[doc_id] = document
+    
+    return DocumentResponse(**_document_view(document))
 
 
-async def process_document(doc_id: str, file_path: str):
-    """Process document: extract, chunk, embed, and store"""
-    try:
-        # Update status
-        documents_store[doc_id]["status"] = DocumentStatus.PROCESSING
+@router.post("/bulk", response_model=BulkIngestionResponse)
+async def bulk_upload(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    directory: Optional[str] = Form(None),
+    document_type: str = None,
+    priority: JobPriority = JobPriority.LOW
+):
+    """
+    Ingest many PDFs at once from a ZIP archive or a server-side directory
+    """
+    if (file is None) == (directory is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either a ZIP file or a directory, not both"
+        )
+    
+    if job_queue.is_full():
+        raise _queue_full_error()
+    
+    work_dir = None
+    if file is not None:
+        if not file.filename.lower().endswith(".zip"):
+            raise HTTPException(status_code=400, detail="Only ZIP archives are supported")
         
-        # Extract text from PDF
-        extracted = processor.extract_text(file_path)
+        _check_content_length(request, settings.BULK_UPLOAD_MAX_BYTES)
         
-        # Chunk text
-        chunks = chunker.chunk_text(
-            text=extracted["text"],
-            document_id=doc_id,
-            metadata={
-                "filename": documents_store[doc_id]["filename"],
-                "total_pages": extracted["total_pages"],
-                "document_type": documents_store[doc_id].get("document_type")
-            }
-        )
+        work_dir = os.path.join(settings.UPLOAD_DIR, "bulk", str(uuid.uuid4()))
+        os.makedirs(work_dir, exist_ok=True)
+        archive_path = os.path.join(work_dir, "archive.zip")
         
-        # Generate embeddings
-        embeddings = []
-        if ai_client:
-            for chunk in chunks:
-                try:
-                    embedding = ai_client.generate_embedding(chunk["text"])
-                    embeddings.append(embedding)
-                except Exception as e:
-                    # If embedding fails, use dummy embedding
-                    embeddings.append([0.0] * 768)
-        else:
-            # No AI client, use dummy embeddings
-            embeddings = [[0.0] * 768] * len(chunks)
+        try:
+            await _save_upload_or_400(
+                file,
+                archive_path,
+                max_bytes=settings.BULK_UPLOAD_MAX_BYTES,
+                header_check=lambda data: data[:4] == b"PK\x03\x04"
+            )
+        except HTTPException:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
         
-        # Store in watsonx.data
-        if data_client:
-            try:
-                data_client.store_chunks(chunks, embeddings)
-            except Exception as e:
-                # Log error but continue
-                documents_store[doc_id]["metadata"]["storage_error"] = str(e)
+        try:
+            # Off the event loop: unpacking a large archive takes a while
+            files = await asyncio.to_thread(extract_pdf_archive, archive_path, work_dir)
+        except zipfile.BadZipFile:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail="Invalid ZIP archive")
+        except ArchiveTooLargeError as e:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
         
-        # Update document record
-        documents_store[doc_id]["status"] = DocumentStatus.COMPLETED
-        documents_store[doc_id]["chunks_count"] = len(chunks)
-        documents_store[doc_id]["processed_at"] = datetime.now()
+        source_type, source = "archive", file.filename
+    else:
+        try:
+            files = collect_directory_pdfs(directory)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Clean up temp file
+        source_type, source = "directory", directory
+    
+    if not files:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No PDF files found")
+    
+    batch = bulk_manifest.create_batch(
+        source_type=source_type,
+        source=source,
+        files=files,
+        root=work_dir,
+        metadata={"document_type": document_type}
+    )
+    
+    try:
+        job = job_queue.submit(
+            kind="bulk",
+            document_id=batch["id"],
+            payload={"batch_id": batch["id"]},
+            priority=priority.value
+        )
+    except QueueFullError:
+        bulk_manifest.update_batch(batch["id"], status="failed")
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        raise _queue_full_error()
+    
+    _register_bulk_documents(batch["id"], job["id"])
+    
+    return BulkIngestionResponse(**_batch_view(batch["id"]))
+
+
+@router.get("/bulk/{batch_id}", response_model=BulkIngestionResponse)
+async def get_bulk_batch(batch_id: str, include_files: bool = False):
+    """Get progress and throughput of a bulk ingestion batch"""
+    batch = _batch_view(batch_id, include_files=include_files)
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return BulkIngestionResponse(**batch)
+
+
+@router.get("/jobs", response_model=List[IngestionJobResponse])
+async def list_jobs(status: Optional[JobStatus] = None, limit: int = 100):
+    """List ingestion jobs, newest first"""
+    jobs = job_queue.list_jobs(status=status.value if status else None, limit=limit)
+    return [IngestionJobResponse(**job) for job in jobs]
+
+
+@router.get("/jobs/stats", response_model=IngestionQueueStats)
+async def get_queue_stats():
+    """Get ingestion queue depth and job counts"""
+    return IngestionQueueStats(**job_queue.stats())
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job(job_id: str):
+    """Get a specific ingestion job"""
+    job = job_queue.get_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return IngestionJobResponse(**job)
+
+
+def process_document_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue handler: extract, chunk, embed, and store a document"""
+    payload = job["payload"]
+    doc_id = job["document_id"]
+    file_path = payload["file_path"]
+    
+    run = pipeline.run([{
+        "document_id": doc_id,
+        "file_path": file_path,
+        "metadata": {
+            "filename": payload["filename"],
+            "document_type": payload.get("document_type")
+        }
+    }], is_deleted=job_queue.is_deleted)
+    result = run["documents"][doc_id]
+    
+    if result.get("deleted"):
+        # Deleted while it was being ingested: nothing was stored
         os.remove(file_path)
+        return {"deleted": True, "chunks_count": 0, "pipeline": run["metrics"]}
+    
+    if not result["success"]:
+        # Embedding and storage outages are retried by the queue
+        if result["transient"]:
+            raise TransientJobError(result["error"])
         
-    except Exception as e:
-        documents_store[doc_id]["status"] = DocumentStatus.FAILED
-        documents_store[doc_id]["metadata"]["error"] = str(e)
+        # Extraction failures are permanent, don't keep the file around
+        os.remove(file_path)
+        raise ValueError(result["error"])
+    
+    # Clean up temp file
+    os.remove(file_path)
+    
+    return {
+        "chunks_count": result["chunks_count"],
+        "total_pages": result["total_pages"],
+        "pipeline": run["metrics"],
+    }
+
+
+def process_bulk_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue handler: ingest (or resume) a bulk batch"""
+    return bulk_ingestor.run(
+        job["payload"]["batch_id"],
+        final_attempt=job["attempts"] >= job["max_attempts"]
+    )
+
+
+def init_services(
+    shared_ai_client: Optional[WatsonxAIClient],
+    shared_data_client: Optional[WatsonxDataClient]
+):
+    """Build the job queue and the ingestion pipelines around the shared clients"""
+    global job_queue, bulk_manifest, ai_client, data_client, pipeline, bulk_ingestor
+    
+    job_queue = IngestionJobQueue()
+    job_queue.register_handler("document", process_document_job)
+    job_queue.register_handler("bulk", process_bulk_job)
+    bulk_manifest = BulkManifest()
+    
+    ai_client = shared_ai_client
+    data_client = shared_data_client
+    pipeline = IngestionPipeline(
+        pdf_processor=processor,
+        chunker=chunker,
+        ai_client=ai_client,
+        data_client=data_client
+    )
+    bulk_ingestor = BulkIngestor(
+        manifest=bulk_manifest,
+        pdf_processor=processor,
+        chunker=chunker,
+        ai_client=ai_client,
+        data_client=data_client
+    )
+
+
+def restore_documents():
+    """Rebuild the document index from persisted ingestion jobs"""
+    for job in job_queue.list_jobs(kind="bulk", limit=None):
+        _register_bulk_documents(job["payload"]["batch_id"], job["id"])
+    
+    for job in job_queue.list_jobs(kind="document", limit=None, include_deleted=False):
+        if job["document_id"] in documents_store:
+            continue
+        
+        payload = job["payload"]
+        documents_store[job["document_id"]] = {
+            "id": job["document_id"],
+            "filename": payload["filename"],
+            "document_type": payload.get("document_type"),
+            "status": DocumentStatus.PENDING,
+            "chunks_count": 0,
+            "uploaded_at": payload["uploaded_at"],
+            "processed_at": None,
+            "metadata": payload.get("metadata") or {},
+            "job_id": job["id"],
+        }
+
+
+def _register_bulk_documents(batch_id: str, job_id: str):
+    """Add the files of a bulk batch to the document index"""
+    batch = bulk_manifest.get_batch(batch_id, include_files=True)
+    if not batch:
+        return
+    
+    for entry in batch["files"]:
+        if entry["document_id"] in documents_store or entry["status"] == "deleted":
+            continue
+        
+        documents_store[entry["document_id"]] = {
+            "id": entry["document_id"],
+            "filename": os.path.basename(entry["path"]),
+            "document_type": batch["metadata"].get("document_type"),
+            "status": DocumentStatus.PENDING,
+            "chunks_count": 0,
+            "uploaded_at": batch["created_at"],
+            "processed_at": None,
+            "metadata": {"batch_id": batch_id},
+            "job_id": job_id,
+            "batch_id": batch_id,
+            "position": entry["position"],
+        }
+
+
+def _batch_view(batch_id: str, include_files: bool = False) -> Optional[Dict[str, Any]]:
+    """Merge a bulk batch with the state of its ingestion job"""
+    batch = bulk_manifest.get_batch(batch_id, include_files=include_files)
+    if not batch:
+        return None
+    
+    jobs = job_queue.list_jobs(kind="bulk", document_id=batch_id, limit=1)
+    batch["job_id"] = jobs[0]["id"] if jobs else None
+    batch["status"] = jobs[0]["status"] if jobs else JobStatus.FAILED
+    return batch
+
+
+def _document_view(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a document record with the state of its ingestion job"""
+    job = job_queue.get_job(document["job_id"]) if document.get("job_id") else None
+    if not job:
+        return document
+    
+    view = {**document, "metadata": dict(document.get("metadata") or {})}
+    view["status"] = JOB_TO_DOCUMENT_STATUS[JobStatus(job["status"])]
+    
+    # Files of a bulk batch complete individually
+    if document.get("batch_id"):
+        entry = bulk_manifest.get_file(document["batch_id"], document["position"])
+        if entry and entry["status"] == "completed":
+            view["status"] = DocumentStatus.COMPLETED
+            view["chunks_count"] = entry["chunks"]
+            view["processed_at"] = entry["finished_at"]
+            view["metadata"]["total_pages"] = entry["pages"]
+        elif entry and entry["status"] == "failed":
+            view["status"] = DocumentStatus.FAILED
+            view["metadata"]["error"] = entry["error"]
+        return view
+    
+    if job["result"]:
+        view["chunks_count"] = job["result"].get("chunks_count", 0)
+        view["metadata"]["total_pages"] = job["result"].get("total_pages")
+    
+    if job["status"] == JobStatus.SUCCEEDED:
+        view["processed_at"] = job["finished_at"]
+    
+    if job["error"]:
+        view["metadata"]["error"] = job["error"]
+    
+    return view
+
+
+def _check_content_length(request: Request, max_bytes: int):
+    """Reject oversized requests from their Content-Length before reading the body"""
+    content_length = request.headers.get("content-length")
+    if (
+        content_length
+        and content_length.isdigit()
+        and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES
+    ):
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the maximum upload size of {max_bytes} bytes"
+        )
+
+
+async def _save_upload_or_400(
+    file: UploadFile,
+    file_path: str,
+    max_bytes: int,
+    header_check
+) -> Dict[str, Any]:
+    """Stream an upload to disk, mapping rejections to HTTP errors"""
+    try:
+        return await save_upload(
+            file,
+            file_path,
+            max_bytes=max_bytes,
+            header_check=header_check
+        )
+    except InvalidUploadError:
+        raise HTTPException(status_code=400, detail="File content does not match its type")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def _queue_full_error() -> HTTPException:
+    """429 response telling clients to back off"""
+    return HTTPException(
+        status_code=429,
+        detail="Ingestion queue is full, retry later",
+        headers={"Retry-After": str(int(job_queue.retry_backoff) or 1)}
+    )
 
 
 @router.get("/", response_model=List[DocumentResponse])
 async def list_documents():
     """List all uploaded documents"""
-    return [DocumentResponse(**doc) for doc in documents_store.values()]
+    # Validated and serialized once, by the response model
+    return [_document_view(doc) for doc in documents_store.values()]
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -147,7 +495,7 @@ async def get_document(document_id: str):
     if document_id not in documents_store:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return DocumentResponse(**documents_store[document_id])
+    return DocumentResponse(**_document_view(documents_store[document_id]))
 
 
 @router.delete("/{document_id}")
@@ -156,8 +504,18 @@ async def delete_document(document_id: str):
     if document_id not in documents_store:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    # Recorded before the chunks are removed, so a running job (or a bulk
+    # job covering the file) discards the document instead of storing it,
+    # and a restart doesn't bring it back
+    document = documents_store[document_id]
+    if document.get("batch_id"):
+        bulk_manifest.mark_file_deleted(document["batch_id"], document["position"])
+    elif document.get("job_id"):
+        job_queue.mark_deleted(document_id)
+    
     # Delete from watsonx.data
-    data_client.delete_document(document_id)
+    if data_client:
+        data_client.delete_document(document_id)
     
     # Remove from store
     del documents_store[document_id]
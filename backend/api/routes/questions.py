@@ -2,22 +2,25 @@
 API routes for question answering
 """
 
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import logging
+import time
 from fastapi import APIRouter, HTTPException
-from models.schemas import QuestionRequest, AnswerResponse
-from core.agent.reasoning_loop import ReasoningLoop
-from core.governance.audit_logger import AuditLogger
+from fastapi.responses import StreamingResponse
+from models.schemas import BatchQuestionRequest, QuestionRequest, AnswerResponse
+from core.config import settings
+from core.container import container
+from core.governance.audit_writer import get_audit_writer, AuditBackpressureError, AuditUnavailableError
+from core.observability import metrics, tracing
+from core.serialization import dumps_bytes
+from services.watsonx_ai.admission import AdmissionTimeoutError, RateLimitedError
 
 router = APIRouter()
 
-# Initialize reasoning loop (may fail if clients not configured)
-try:
-    reasoning_loop = ReasoningLoop()
-except Exception as e:
-    reasoning_loop = None
-    import warnings
-    warnings.warn(f"Failed to initialize ReasoningLoop: {str(e)}")
+logger = logging.getLogger(__name__)
 
-audit_logger = AuditLogger()
+audit_writer = get_audit_writer()
 
 
 @router.post("/ask", response_model=AnswerResponse)
@@ -25,42 +28,193 @@ async def ask_question(request: QuestionRequest):
     """
     Ask a question and get an answer with citations
     """
-    if not reasoning_loop:
-        raise HTTPException(
-            status_code=503,
-            detail="Reasoning loop not initialized. Please check watsonx.ai and watsonx.data configuration."
-        )
+    reasoning_loop = _require_reasoning_loop()
     
     try:
-        # Process question through reasoning loop
-        result = await reasoning_loop.process_question(
-            question=request.question,
-            context=request.context
-        )
-        
-        # Log interaction for audit
-        log_id = audit_logger.log_interaction(
-            question=request.question,
-            answer=result["answer"],
-            citations=result["citations"],
-            confidence_score=result["confidence_score"],
-            llm_prompt=result.get("llm_prompt"),
-            llm_response=result.get("llm_response"),
-            retrieved_sources=result.get("retrieved_sources", []),
-            document_versions=result.get("document_versions", {}),
-            reasoning_steps=result.get("reasoning_steps", []),
-            manual_review_recommended=result["manual_review_recommended"]
-        )
+        with tracing.start_trace("ask") as trace:
+            # Process question through reasoning loop
+            result = await reasoning_loop.process_question(
+                question=request.question,
+                context=request.context
+            )
+            
+            # Log interaction for audit (with the trace recorded so far)
+            with metrics.REASONING_STAGE_SECONDS.labels("audit").time(), tracing.span("audit"):
+                log_id = await audit_writer.log_interaction(
+                    **_audit_fields(request.question, result, trace.to_dict() if trace else None)
+                )
         
         # Format response
-        return AnswerResponse(
-            answer=result["answer"],
-            explanation=result["explanation"],
-            citations=result["citations"],
-            confidence_score=result["confidence_score"],
-            manual_review_recommended=result["manual_review_recommended"],
-            reasoning_steps=result.get("reasoning_steps")
-        )
+        return _answer_response(result, trace.to_dict() if trace and request.include_trace else None)
         
+    except (AuditBackpressureError, AuditUnavailableError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except AdmissionTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RateLimitedError as e:
+        retry_after = str(int(e.retry_after or 1))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+
+
+@router.post("/batch")
+async def ask_batch(request: BatchQuestionRequest):
+    """
+    Answer a batch of questions, streaming results as they complete
+
+    All query embeddings are computed in one call, retrieval runs
+    concurrently, and at most max_concurrency LLM calls (capped by
+    BATCH_MAX_CONCURRENCY) run at a time, at batch priority so interactive
+    /ask requests are admitted first. Audit entries are written in bulk.
+
+    The response is NDJSON: one line per question, in completion order,
+    with its index, status ("answered" or "error"), audit_log_id and
+    answer (or error), then a final line with a summary.
+    """
+    reasoning_loop = _require_reasoning_loop()
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.BATCH_MAX_QUESTIONS} questions"
+        )
+    
+    return StreamingResponse(_run_batch(reasoning_loop, request), media_type="application/x-ndjson")
+
+
+async def _run_batch(reasoning_loop, request: BatchQuestionRequest) -> AsyncIterator[bytes]:
+    """Answer the batch's questions concurrently, yielding one NDJSON line per result"""
+    start = time.perf_counter()
+    embeddings = await _embed_questions(request.questions)
+    budget = asyncio.Semaphore(
+        min(request.max_concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    )
+    
+    async def answer(index: int, question: str):
+        """(index, result, trace, error) for one question"""
+        with tracing.start_trace("batch_question") as trace:
+            try:
+                result = await reasoning_loop.process_question(
+                    question=question,
+                    context=request.context,
+                    priority="batch",
+                    query_embedding=embeddings[index],
+                    generation_budget=budget
+                )
+            except Exception as e:
+                return index, None, None, e
+        return index, result, trace.to_dict() if trace else None, None
+    
+    tasks = [asyncio.create_task(answer(index, question)) for index, question in enumerate(request.questions)]
+    pending_records: List[Dict[str, Any]] = []
+    counts = {"answered": 0, "error": 0, "degraded": 0}
+    
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result, trace, error = await next_done
+            if error is not None:
+                counts["error"] += 1
+                yield _ndjson_line({
+                    "index": index,
+                    "question": request.questions[index],
+                    "status": "error",
+                    "error": str(error),
+                    "retryable": isinstance(error, (AdmissionTimeoutError, RateLimitedError)),
+                })
+                continue
+            
+            record = audit_writer.audit_logger.build_record(**_audit_fields(request.questions[index], result, trace))
+            pending_records.append(record)
+            if len(pending_records) >= settings.AUDIT_BATCH_SIZE:
+                await audit_writer.submit_many(pending_records)
+                pending_records = []
+            
+            counts["answered"] += 1
+            counts["degraded"] += int(result.get("degraded", False))
+            response = _answer_response(result, trace if request.include_trace else None)
+            yield _ndjson_line({
+                "index": index,
+                "question": request.questions[index],
+                "status": "answered",
+                "audit_log_id": record["id"],
+                "answer": response.model_dump(mode="json"),
+            })
+        
+        yield _ndjson_line({
+            "summary": {
+                "questions": len(request.questions),
+                **counts,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+        })
+    finally:
+        # Client gone or batch done: stop what is left and keep the audit trail complete
+        for task in tasks:
+            task.cancel()
+        await asyncio.shield(audit_writer.submit_many(pending_records))
+
+
+async def _embed_questions(questions: List[str]) -> List[Optional[List[float]]]:
+    """
+    Query embeddings for all questions in one call
+
+    Falls back to embedding per question (in hybrid search) if the batch
+    call fails.
+    """
+    ai_client = container.ai_client
+    if ai_client is None:
+        return [None] * len(questions)
+    
+    unique = list(dict.fromkeys(questions))
+    try:
+        vectors = await asyncio.to_thread(ai_client.generate_embeddings, unique)
+    except Exception:
+        logger.warning("Batch embedding of %d questions failed; embedding per question", len(unique), exc_info=True)
+        return [None] * len(questions)
+    by_question = dict(zip(unique, vectors))
+    return [by_question[question] for question in questions]
+
+
+def _require_reasoning_loop():
+    """Reasoning loop built in the application lifespan, or 503 if clients aren't configured"""
+    reasoning_loop = container.reasoning_loop
+    if not reasoning_loop:
+        raise HTTPException(
+            status_code=503,
+            detail="Reasoning loop not initialized. Please check watsonx.ai and watsonx.data configuration."
+        )
+    return reasoning_loop
+
+
+def _audit_fields(question: str, result: Dict[str, Any], trace: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Audit log arguments for an answered question"""
+    return {
+        "question": question,
+        "answer": result["answer"],
+        "citations": result["citations"],
+        "confidence_score": result["confidence_score"],
+        "llm_prompt": result.get("llm_prompt"),
+        "llm_response": result.get("llm_response"),
+        "retrieved_sources": result.get("retrieved_sources", []),
+        "document_versions": result.get("document_versions", {}),
+        "reasoning_steps": result.get("reasoning_steps", []),
+        "manual_review_recommended": result["manual_review_recommended"],
+        "trace": trace,
+    }
+
+
+def _answer_response(result: Dict[str, Any], trace: Optional[Dict[str, Any]]) -> AnswerResponse:
+    return AnswerResponse(
+        answer=result["answer"],
+        explanation=result["explanation"],
+        citations=result["citations"],
+        confidence_score=result["confidence_score"],
+        manual_review_recommended=result["manual_review_recommended"],
+        reasoning_steps=result.get("reasoning_steps"),
+        degraded=result.get("degraded", False),
+        trace=trace
+    )
+
+
+def _ndjson_line(payload: Dict[str, Any]) -> bytes:
+    return dumps_bytes(payload) + b"\n"
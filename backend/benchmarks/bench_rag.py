@@ -0,0 +1,300 @@
+"""
+Ingestion and retrieval benchmark on a synthetic regulatory corpus
+
+Runs the real ingestion and retrieval code against local stand-ins for
+watsonx.ai and watsonx.data (see standins.py):
+
+- chunking: TextChunker over every page of the corpus
+- embedding: batched embedding of all chunks (hashing stand-in, or the
+  local sentence-transformers model with --embedder local)
+- store: WatsonxDataClient.store_chunks into a SQLite file
+- queries: vector, keyword and HybridSearch latency percentiles, plus the
+  share of queries whose source document is in the top results
+- memory: peak traced allocations per phase and the process's max RSS
+
+Results are written as JSON. With --compare, they are checked against an
+earlier run and the script exits non-zero if a metric regressed by more
+than --tolerance.
+
+Usage (from backend/):
+    python benchmarks/bench_rag.py [--documents 50] [--pages 20] [--queries 200]
+        [--output results.json] [--compare baseline.json] [--tolerance 0.15]
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import corpus_bytes, generate_corpus, generate_queries
+from standins import HashingEmbedder, LocalDataClient
+
+from core.config import settings
+from core.ingestion.chunker import TextChunker
+from core.rag.hybrid_search import HybridSearch
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics where larger is better; everything else (latencies, memory) is lower-is-better
+HIGHER_IS_BETTER = ("per_second", "hit_rate")
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples_ms)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def measured(func: Callable[[], Any]):
+    """Run func, returning (result, seconds, peak traced MB)"""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def bench_chunking(corpus: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    chunker = TextChunker()
+
+    def run():
+        return [
+            chunk
+            for document in corpus
+            for chunk in chunker.iter_chunks(
+                document["pages"], document["id"], {"document_name": document["name"]}
+            )
+        ]
+
+    chunks, elapsed, peak_mb = measured(run)
+    pages = sum(len(document["pages"]) for document in corpus)
+    return chunks, {
+        "chunks": len(chunks),
+        "pages_per_second": pages / elapsed,
+        "chunks_per_second": len(chunks) / elapsed,
+        "mb_per_second": corpus_bytes(corpus) / (1024 * 1024) / elapsed,
+        "peak_traced_mb": peak_mb,
+    }
+
+
+def bench_embedding(embedder, chunks: List[Dict[str, Any]], batch_size: int):
+    def run():
+        embeddings = []
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            embeddings.extend(embedder.generate_embeddings([chunk["text"] for chunk in batch]))
+        return embeddings
+
+    embeddings, elapsed, peak_mb = measured(run)
+    return embeddings, {
+        "batch_size": batch_size,
+        "chunks_per_second": len(chunks) / elapsed,
+        "peak_traced_mb": peak_mb,
+    }
+
+
+def bench_store(data_client: LocalDataClient, chunks, embeddings, batch_size: int) -> Dict[str, float]:
+    def run():
+        for start in range(0, len(chunks), batch_size):
+            data_client.store_chunks(chunks[start:start + batch_size], embeddings[start:start + batch_size])
+
+    _, elapsed, peak_mb = measured(run)
+    return {
+        "batch_size": batch_size,
+        "chunks_per_second": len(chunks) / elapsed,
+        "peak_traced_mb": peak_mb,
+    }
+
+
+def bench_queries(
+    embedder,
+    data_client: LocalDataClient,
+    queries: List[Dict[str, Any]],
+    top_k: int
+) -> Dict[str, Dict[str, float]]:
+    data_client.load_indexes()
+    search = HybridSearch(data_client=data_client, ai_client=embedder)
+    # Hashing embeddings score lower than model embeddings; keep every vector hit
+    search.similarity_threshold = 0.0
+    query_embeddings = embedder.generate_embeddings([query["text"] for query in queries])
+
+    runners = {
+        "vector": lambda i: data_client.vector_search(query_embeddings[i], top_k=top_k, threshold=0.0),
+        "keyword": lambda i: data_client.keyword_search(queries[i]["text"], top_k=top_k),
+        "hybrid": lambda i: search.search(queries[i]["text"], top_k=top_k),
+    }
+
+    results = {}
+    for name, runner in runners.items():
+        runner(0)  # warm up
+        samples, hits = [], 0
+        tracemalloc.reset_peak()
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            found = runner(i)
+            samples.append((time.perf_counter() - start) * 1000)
+            hits += any(result.get("document_id") == query["document_id"] for result in found)
+        _, peak = tracemalloc.get_traced_memory()
+        results[name] = {
+            **percentiles(samples),
+            "queries_per_second": len(queries) / (sum(samples) / 1000),
+            "hit_rate": hits / len(queries),
+            "peak_traced_mb": peak / (1024 * 1024),
+        }
+    return results
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by dotted path"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    skip: Tuple[str, ...] = ("chunks", "batch_size")
+) -> List[str]:
+    """
+    Report metrics that regressed beyond tolerance (a fraction, e.g. 0.15)
+
+    Counts and configuration (any path component in skip) are not compared.
+    """
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    regressions = []
+
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>9}")
+    for path in sorted(now.keys() & before.keys()):
+        if set(skip).intersection(path.split(".")) or before[path] == 0:
+            continue
+        change = (now[path] - before[path]) / before[path]
+        higher_is_better = path.endswith(HIGHER_IS_BETTER)
+        regressed = -change > tolerance if higher_is_better else change > tolerance
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{path:<44}{before[path]:>12.3f}{now[path]:>12.3f}{change:>+8.1%}{marker}")
+        if regressed:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--articles-per-page", type=int, default=3)
+    parser.add_argument("--clauses-per-article", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embedder", choices=("hashing", "local"), default="hashing",
+                        help="hashing stand-in, or WatsonxAIClient's local sentence-transformers fallback")
+    parser.add_argument("--dimension", type=int, default=384, help="Hashing embedding size")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression (fraction)")
+    args = parser.parse_args()
+
+    if args.embedder == "local":
+        from services.watsonx_ai.client import WatsonxAIClient
+        embedder = WatsonxAIClient()
+    else:
+        embedder = HashingEmbedder(args.dimension)
+
+    corpus = generate_corpus(
+        documents=args.documents,
+        pages=args.pages,
+        articles_per_page=args.articles_per_page,
+        clauses_per_article=args.clauses_per_article,
+        seed=args.seed
+    )
+    queries = generate_queries(corpus, count=args.queries, seed=args.seed + 1)
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        data_client = LocalDataClient(os.path.join(workdir, "chunks.db"))
+
+        chunks, chunking = bench_chunking(corpus)
+        embeddings, embedding = bench_embedding(embedder, chunks, settings.EMBEDDING_BATCH_SIZE)
+        store = bench_store(data_client, chunks, embeddings, settings.PIPELINE_STORE_BATCH_SIZE)
+        query_results = bench_queries(embedder, data_client, queries, args.top_k)
+        data_client.connection.close()
+    tracemalloc.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "embedder": args.embedder,
+            "corpus": {
+                "documents": args.documents,
+                "pages": args.pages,
+                "articles_per_page": args.articles_per_page,
+                "clauses_per_article": args.clauses_per_article,
+                "seed": args.seed,
+                "mb": corpus_bytes(corpus) / (1024 * 1024),
+            },
+            "queries": args.queries,
+            "top_k": args.top_k,
+        },
+        "results": {
+            "chunking": chunking,
+            "embedding": embedding,
+            "store": store,
+            "queries": query_results,
+            # ru_maxrss is KB on Linux
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+        },
+    }
+
+    print(json.dumps(report["results"], indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("corpus") != report["meta"]["corpus"]:
+            print("Warning: baseline was run on a different corpus")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
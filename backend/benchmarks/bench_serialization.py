@@ -0,0 +1,188 @@
+"""
+Serialization benchmark for large /audit/logs pages and /documents listings
+
+Compares the stdlib json path with core.serialization (orjson when
+installed):
+
+- audit columns: encoding and decoding the JSON columns of audit rows
+- responses: rendering a full page through FastAPI, before (models built
+  in the route, stdlib JSONResponse) and after (dicts validated once by the
+  response model, fast response class)
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--rows 1000] [--repeat 20]
+"""
+
+from typing import Callable, List
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from core import serialization
+from models.schemas import AuditLogEntry, DocumentResponse
+
+
+def make_logs(count: int) -> List[dict]:
+    """Audit log entries shaped like real ones (10 sources, 5 citations)"""
+    start = datetime(2024, 1, 1)
+    logs = []
+    for i in range(count):
+        sources = [
+            {
+                "chunk_id": f"doc{j}_chunk_{i % 50}",
+                "document_id": f"doc{j}",
+                "document_name": f"Policy {j}.pdf",
+                "page_number": j + 1,
+                "text": "The controller shall implement appropriate technical measures. " * 12,
+                "combined_score": 0.91 - j * 0.03,
+            }
+            for j in range(10)
+        ]
+        logs.append({
+            "id": str(uuid.uuid4()),
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "question": f"What are the data retention requirements for case {i}?",
+            "answer": "Records must be retained for five years after the end of the relationship. " * 4,
+            "citations": [
+                {
+                    "document_id": source["document_id"],
+                    "document_name": source["document_name"],
+                    "section": "Article 5",
+                    "page_number": source["page_number"],
+                    "chunk_id": source["chunk_id"],
+                    "relevance_score": source["combined_score"],
+                    "excerpt": source["text"][:300] + "...",
+                }
+                for source in sources[:5]
+            ],
+            "confidence_score": 0.82,
+            "user_id": None,
+            "llm_prompt": "You are PolicyIQ, an expert regulatory compliance assistant. " * 40,
+            "llm_response": "Records must be retained for five years. " * 20,
+            "retrieved_sources": sources,
+            "document_versions": {f"doc{j}": "v1" for j in range(10)},
+            "reasoning_steps": ["Question analyzed", "Retrieved chunks", "Generated answer"],
+            "manual_review_recommended": False,
+        })
+    return logs
+
+
+def make_documents(count: int) -> List[dict]:
+    """Document records as kept by the documents route"""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "filename": f"policy_{i}.pdf",
+            "document_type": "policy",
+            "status": "completed",
+            "chunks_count": 120,
+            "uploaded_at": datetime(2024, 1, 1),
+            "processed_at": datetime(2024, 1, 1, 0, 5),
+            "metadata": {"file_size": 1048576, "file_hash": "ab" * 32, "total_pages": 40},
+            "job_id": str(uuid.uuid4()),
+            "file_path": f"uploads/{i}_policy_{i}.pdf",
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func: Callable, repeat: int) -> float:
+    """Median wall time of func in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_audit_columns(logs: List[dict], repeat: int) -> dict:
+    """Encode/decode the four JSON columns of every row"""
+    columns = ("citations", "retrieved_sources", "document_versions", "reasoning_steps")
+
+    def encode(dumps):
+        return [[dumps(log[column]) for column in columns] for log in logs]
+
+    encoded = encode(json.dumps)
+
+    def decode(loads):
+        return [[loads(value) for value in row] for row in encoded]
+
+    return {
+        "encode_stdlib_ms": timed(lambda: encode(json.dumps), repeat),
+        "encode_fast_ms": timed(lambda: encode(serialization.dumps), repeat),
+        "decode_stdlib_ms": timed(lambda: decode(json.loads), repeat),
+        "decode_fast_ms": timed(lambda: decode(serialization.loads), repeat),
+    }
+
+
+def bench_responses(logs: List[dict], documents: List[dict], repeat: int) -> dict:
+    """Render /audit/logs and /documents pages through FastAPI"""
+    before = FastAPI(default_response_class=JSONResponse)
+    after = FastAPI(default_response_class=serialization.FastJSONResponse)
+
+    @before.get("/logs", response_model=List[AuditLogEntry])
+    async def logs_before():
+        return [AuditLogEntry(**log) for log in logs]
+
+    @before.get("/documents", response_model=List[DocumentResponse])
+    async def documents_before():
+        return [DocumentResponse(**document) for document in documents]
+
+    @after.get("/logs", response_model=List[AuditLogEntry])
+    async def logs_after():
+        return logs
+
+    @after.get("/documents", response_model=List[DocumentResponse])
+    async def documents_after():
+        return documents
+
+    results = {}
+    for name, app in (("before", before), ("after", after)):
+        client = TestClient(app)
+        for path in ("/logs", "/documents"):
+            client.get(path)  # warm up
+            results[f"{path.strip('/')}_{name}_ms"] = timed(lambda: client.get(path), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Audit logs / documents per page")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (median reported)")
+    args = parser.parse_args()
+
+    if serialization.orjson is None:
+        print("orjson is not installed: the fast path falls back to stdlib json")
+
+    logs = make_logs(args.rows)
+    documents = make_documents(args.rows)
+
+    results = {**bench_audit_columns(logs, args.repeat), **bench_responses(logs, documents, args.repeat)}
+
+    print(f"{'measurement':<28}{'median ms':>12}")
+    for name, value in results.items():
+        print(f"{name:<28}{value:>12.2f}")
+
+    for label, slow, fast in (
+        ("audit column encode", "encode_stdlib_ms", "encode_fast_ms"),
+        ("audit column decode", "decode_stdlib_ms", "decode_fast_ms"),
+        ("/audit/logs response", "logs_before_ms", "logs_after_ms"),
+        ("/documents response", "documents_before_ms", "documents_after_ms"),
+    ):
+        print(f"{label:<28}{results[slow] / results[fast]:>11.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
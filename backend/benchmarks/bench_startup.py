@@ -0,0 +1,96 @@
+"""
+API cold-start benchmark
+
+Measures, in fresh interpreters (what every uvicorn worker or new pod pays):
+
+- import: time to `import main`
+- startup: time to import the app and run its lifespan startup (client
+  construction, database restore) until it can serve requests
+- modules: with --importtime, the slowest modules reported by
+  `python -X importtime`, to spot heavy SDKs pulled in at import
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--repeat 5] [--importtime] [--top 15]
+"""
+
+from typing import List, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+print((time.perf_counter() - start) * 1000)
+"""
+
+STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+with TestClient(main.app) as client:
+    client.get("/health")
+    print((time.perf_counter() - start) * 1000)
+"""
+
+
+def run_snippet(snippet: str, extra_args: List[str] = None) -> subprocess.CompletedProcess:
+    """Run a snippet in a fresh interpreter from backend/"""
+    return subprocess.run(
+        [sys.executable, *(extra_args or []), "-c", snippet],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure(snippet: str, repeat: int) -> List[float]:
+    """Milliseconds reported by the snippet (last stdout line) per run"""
+    return [float(run_snippet(snippet).stdout.strip().splitlines()[-1]) for _ in range(repeat)]
+
+
+def slowest_modules(top: int) -> List[Tuple[str, float]]:
+    """Top-level modules with the highest cumulative import time (ms)"""
+    result = run_snippet("import main", ["-X", "importtime"])
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        # Submodules are reported too; keep the package's largest figure
+        totals[package] = max(totals.get(package, 0.0), int(cumulative) / 1000)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def summarize(samples: List[float]) -> str:
+    return f"min {min(samples):8.1f}  median {statistics.median(samples):8.1f}  max {max(samples):8.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest modules")
+    parser.add_argument("--top", type=int, default=15, help="Modules listed with --importtime")
+    args = parser.parse_args()
+
+    print(f"{'measurement (ms)':<18}{'':>4}")
+    print(f"{'import main':<18}{summarize(measure(IMPORT_SNIPPET, args.repeat))}")
+    print(f"{'app startup':<18}{summarize(measure(STARTUP_SNIPPET, args.repeat))}")
+
+    if args.importtime:
+        print(f"\n{'module':<32}{'cumulative ms':>14}")
+        for name, millis in slowest_modules(args.top):
+            print(f"{name:<32}{millis:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
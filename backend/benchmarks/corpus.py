@@ -0,0 +1,188 @@
+"""
+Deterministic synthetic regulatory corpus
+
+Documents look like regulations and internal policies: numbered articles
+with titles, clauses and cross-references, split into pages. The same
+seed always produces the same corpus, so benchmark runs are comparable.
+Each query is built from one article's terms and remembers where it came
+from, which gives a rough retrieval hit rate alongside the latency numbers.
+"""
+
+from typing import Any, Dict, List
+import random
+
+REGULATIONS = [
+    "General Data Protection Regulation", "Payment Card Industry Data Security Standard",
+    "Anti-Money Laundering Directive", "Basel III Capital Framework",
+    "SOC 2 Trust Services Criteria", "Markets in Financial Instruments Directive",
+    "Consumer Credit Directive", "Operational Resilience Policy",
+    "Know Your Customer Procedure", "Record Retention Policy",
+]
+
+TOPICS = [
+    "data retention", "customer due diligence", "encryption of cardholder data",
+    "incident reporting", "access control", "capital adequacy", "liquidity coverage",
+    "transaction monitoring", "consent management", "third-party risk",
+    "vendor management", "audit logging", "breach notification", "sanctions screening",
+    "beneficial ownership", "record keeping", "business continuity", "change management",
+    "data subject rights", "cross-border transfers", "key management", "vulnerability scanning",
+]
+
+SUBJECTS = [
+    "The controller", "The institution", "The service provider", "Each obliged entity",
+    "The processor", "Senior management", "The compliance officer", "The merchant",
+]
+
+OBLIGATIONS = [
+    "shall implement appropriate technical and organisational measures for",
+    "must document and periodically review its approach to",
+    "shall ensure that adequate controls are in place regarding",
+    "is required to report without undue delay any failure of",
+    "shall retain records demonstrating compliance with",
+    "must obtain prior approval from the supervisory authority before changing",
+]
+
+QUALIFIERS = [
+    "within seventy-two hours", "at least annually", "for a period of five years",
+    "on a risk-based approach", "in accordance with Article {ref}", "where technically feasible",
+    "unless an exemption under Article {ref} applies", "proportionate to the nature and scale of the business",
+]
+
+
+def generate_corpus(
+    documents: int = 20,
+    pages: int = 10,
+    articles_per_page: int = 3,
+    clauses_per_article: int = 4,
+    seed: int = 42
+) -> List[Dict[str, Any]]:
+    """
+    Build the corpus
+
+    Args:
+        documents: Number of documents
+        pages: Pages per document
+        articles_per_page: Articles (sections) per page
+        clauses_per_article: Clauses per article
+        seed: Random seed
+
+    Returns:
+        Documents with id, name, pages (list of page texts) and articles
+        ({"number", "title", "topic", "page"})
+    """
+    rng = random.Random(seed)
+    corpus = []
+
+    for doc_index in range(documents):
+        regulation = REGULATIONS[doc_index % len(REGULATIONS)]
+        name = f"{regulation} ({2010 + doc_index % 15})"
+        document = {"id": f"doc-{doc_index:04d}", "name": name, "pages": [], "articles": []}
+        article_number = 1
+
+        for page_number in range(1, pages + 1):
+            paragraphs = []
+            for _ in range(articles_per_page):
+                topic = rng.choice(TOPICS)
+                title = f"Article {article_number} - {topic.capitalize()}"
+                clauses = []
+                for clause_number in range(1, clauses_per_article + 1):
+                    qualifier = rng.choice(QUALIFIERS).format(ref=rng.randint(1, article_number + 5))
+                    clauses.append(
+                        f"{clause_number}. {rng.choice(SUBJECTS)} {rng.choice(OBLIGATIONS)} "
+                        f"{topic} {qualifier}, as set out in the {regulation}."
+                    )
+                paragraphs.append(title + "\n" + " ".join(clauses))
+                document["articles"].append({
+                    "number": article_number,
+                    "title": title,
+                    "topic": topic,
+                    "page": page_number,
+                })
+                article_number += 1
+            document["pages"].append("\n\n".join(paragraphs))
+
+        corpus.append(document)
+
+    return corpus
+
+
+def generate_queries(corpus: List[Dict[str, Any]], count: int = 100, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Questions about random articles of the corpus
+
+    Returns:
+        Queries with text, document_id and page of the article they ask about
+    """
+    rng = random.Random(seed)
+    templates = [
+        "What does {name} require for {topic}?",
+        "What are the {topic} obligations under {name}?",
+        "How long must records about {topic} be kept according to {name}?",
+        "Who is responsible for {topic} in {name}?",
+    ]
+    queries = []
+    for _ in range(count):
+        document = rng.choice(corpus)
+        article = rng.choice(document["articles"])
+        queries.append({
+            "text": rng.choice(templates).format(name=document["name"], topic=article["topic"]),
+            "document_id": document["id"],
+            "page": article["page"],
+        })
+    return queries
+
+
+def corpus_bytes(corpus: List[Dict[str, Any]]) -> int:
+    """Total UTF-8 size of all page texts"""
+    return sum(len(page.encode("utf-8")) for document in corpus for page in document["pages"])
+
+
+def build_pdf(pages: List[str], line_width: int = 90) -> bytes:
+    """
+    Minimal text-only PDF, one page per page text
+
+    Enough for the upload endpoint and the PDF text extractors; avoids a
+    PDF-writing dependency in the load test.
+    """
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    # 1: catalog, 2: page tree, 3: font, then a page and its content per page
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{page_id} 0 R" for page_id in page_ids).encode(), len(pages)
+        ),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, text in zip(page_ids, pages):
+        lines = []
+        for paragraph in text.split("\n"):
+            words, current = paragraph.split(), ""
+            for word in words:
+                if current and len(current) + len(word) >= line_width:
+                    lines.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}".strip()
+            lines.append(current)
+        content = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines[:70]) + " ET"
+        stream = content.encode("latin-1", "replace")
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)
+        )
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        output += b"%010d 00000 n \n" % offsets[number]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
@@ -0,0 +1,358 @@
+"""
+End-to-end load test for /ask and /upload
+
+Drives a running PolicyIQ server over HTTP with a mix of questions and
+PDF uploads, ramping through concurrency levels:
+
+- questions: examples/sample_questions.txt plus seeded paraphrases of
+  each, so caches see a realistic mix of repeats and near-repeats
+- uploads: synthetic regulatory PDFs (see corpus.py), sent concurrently
+  with the questions at --upload-share of all requests
+- per stage: throughput, latency percentiles and status codes per
+  endpoint, error rate, and (with --server-pid, Linux only) the server's
+  CPU use and resident memory
+
+Results are written as JSON. For nightly runs, --max-error-rate,
+--max-p99-ms and --min-throughput fail the run on absolute limits, and
+--compare checks every metric against an earlier run (see bench_rag.py);
+the script exits non-zero if any check fails.
+
+Offline, run the server against benchmarks/mock_watsonx.py (see its
+docstring for the environment) and load a corpus first with --seed-documents.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--base-url http://localhost:8000]
+        [--stages 1,5,10,25] [--stage-seconds 30] [--upload-share 0.05]
+        [--server-pid PID] [--output results.json] [--compare baseline.json]
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter, defaultdict
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_rag import compare, percentiles
+from corpus import build_pdf, generate_corpus
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SAMPLE_QUESTIONS = os.path.join(REPO_DIR, "examples", "sample_questions.txt")
+
+ASK_PATH = "/api/v1/questions/ask"
+UPLOAD_PATH = "/api/v1/documents/upload"
+
+# Rewrites applied to sample questions; {q} is the question, {lq} the same
+# with a lowercase first letter
+PARAPHRASES = [
+    "{q}",
+    "Under our current policies, {lq}",
+    "Quick question for compliance: {lq}",
+    "Can you tell me {lq}",
+    "{q} Please cite the relevant section.",
+    "I need to confirm something. {q}",
+    "{q} Is there an exception for small firms?",
+]
+
+# Counts and configuration, not compared against a baseline
+SKIP_COMPARE = ("requests", "concurrency", "seconds", "cpu_seconds", "statuses", "ingestion_queue")
+
+
+def load_questions(path: str = SAMPLE_QUESTIONS) -> List[str]:
+    """Numbered questions ("1. ...") from the sample questions file"""
+    with open(path, encoding="utf-8") as f:
+        return [match.group(1).strip() for match in re.finditer(r"^\s*\d+\.\s+(.+)$", f.read(), re.MULTILINE)]
+
+
+def question_mix(questions: List[str], variants: int, seed: int) -> List[str]:
+    """Each question plus up to variants - 1 paraphrases of it"""
+    rng = random.Random(seed)
+    mix = []
+    for question in questions:
+        lowered = question[0].lower() + question[1:]
+        templates = [PARAPHRASES[0]] + rng.sample(PARAPHRASES[1:], min(variants - 1, len(PARAPHRASES) - 1))
+        mix.extend(template.format(q=question, lq=lowered) for template in templates)
+    rng.shuffle(mix)
+    return mix
+
+
+class ProcessSampler:
+    """CPU and RSS of a (server) process, read from /proc once a second"""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.rss_samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+
+    def _cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            # Fields after the parenthesized command name; utime and stime are 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def _rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def _run(self):
+        while True:
+            self.rss_samples.append(self._rss_mb())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.rss_samples = []
+        self._cpu_start = self._cpu_seconds()
+        self._wall_start = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        cpu_seconds = self._cpu_seconds() - self._cpu_start
+        wall = time.perf_counter() - self._wall_start
+        return {
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": 100 * cpu_seconds / wall,
+            "rss_mb": self.rss_samples[-1] if self.rss_samples else self._rss_mb(),
+            "peak_rss_mb": max(self.rss_samples, default=0.0),
+        }
+
+
+class LoadTest:
+    """Workers issuing questions and uploads until a stage's deadline"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        questions: List[str],
+        pdfs: List[bytes],
+        upload_share: float,
+        seed: int
+    ):
+        self.client = client
+        self.questions = questions
+        self.pdfs = pdfs
+        self.upload_share = upload_share if pdfs else 0.0
+        self.rng = random.Random(seed)
+
+    async def ask(self) -> int:
+        response = await self.client.post(ASK_PATH, json={"question": self.rng.choice(self.questions)})
+        return response.status_code
+
+    async def upload(self) -> int:
+        index = self.rng.randrange(len(self.pdfs))
+        response = await self.client.post(
+            UPLOAD_PATH,
+            files={"file": (f"loadtest-{index:04d}.pdf", self.pdfs[index], "application/pdf")}
+        )
+        return response.status_code
+
+    async def _worker(self, deadline: float, samples: Dict[str, List[float]], statuses: Dict[str, Counter]):
+        while time.perf_counter() < deadline:
+            endpoint = "upload" if self.rng.random() < self.upload_share else "ask"
+            start = time.perf_counter()
+            try:
+                status = await (self.upload() if endpoint == "upload" else self.ask())
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.TransportError:
+                status = "connection_error"
+            samples[endpoint].append((time.perf_counter() - start) * 1000)
+            statuses[endpoint][str(status)] += 1
+
+    async def run_stage(self, concurrency: int, seconds: float, sampler: Optional[ProcessSampler]) -> Dict[str, Any]:
+        samples: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+        if sampler:
+            sampler.start()
+
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(self._worker(deadline, samples, statuses) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        total = sum(len(values) for values in samples.values())
+        errors = sum(count for counter in statuses.values() for code, count in counter.items() if code != "200")
+        stage: Dict[str, Any] = {
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "requests": total,
+            "throughput_per_second": total / elapsed,
+            "error_rate": errors / total if total else 0.0,
+        }
+        for endpoint, values in samples.items():
+            endpoint_errors = sum(count for code, count in statuses[endpoint].items() if code != "200")
+            stage[endpoint] = {
+                **percentiles(values),
+                "requests": len(values),
+                "throughput_per_second": len(values) / elapsed,
+                "error_rate": endpoint_errors / len(values),
+                "statuses": dict(statuses[endpoint]),
+            }
+        if sampler:
+            stage["server"] = await sampler.stop()
+        return stage
+
+
+async def seed_documents(client: httpx.AsyncClient, pdfs: List[bytes], timeout: float) -> int:
+    """Upload pdfs and wait for their ingestion jobs, so questions have something to retrieve"""
+    job_ids = []
+    for index, pdf in enumerate(pdfs):
+        response = await client.post(
+            UPLOAD_PATH,
+            files={"file": (f"seed-{index:04d}.pdf", pdf, "application/pdf")}
+        )
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+
+    pending, deadline = set(job_ids), time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        for job_id in list(pending):
+            job = (await client.get(f"/api/v1/documents/jobs/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed", "cancelled"):
+                pending.discard(job_id)
+        await asyncio.sleep(0.5)
+    return len(job_ids) - len(pending)
+
+
+def check_thresholds(report: Dict[str, Any], args) -> List[str]:
+    """Absolute limits for nightly runs, checked at every stage"""
+    failures = []
+    for name, stage in report["results"]["stages"].items():
+        if args.max_error_rate is not None and stage["error_rate"] > args.max_error_rate:
+            failures.append(f"{name}: error rate {stage['error_rate']:.2%} > {args.max_error_rate:.2%}")
+        if args.min_throughput is not None and stage["throughput_per_second"] < args.min_throughput:
+            failures.append(f"{name}: throughput {stage['throughput_per_second']:.1f}/s < {args.min_throughput}/s")
+        for endpoint in ("ask", "upload"):
+            if args.max_p99_ms is not None and endpoint in stage and stage[endpoint]["p99_ms"] > args.max_p99_ms:
+                failures.append(f"{name}: {endpoint} p99 {stage[endpoint]['p99_ms']:.0f} ms > {args.max_p99_ms:.0f} ms")
+    return failures
+
+
+def print_stage(name: str, stage: Dict[str, Any]):
+    line = (
+        f"{name:<10}{stage['throughput_per_second']:>9.1f}/s  errors {stage['error_rate']:>6.2%}"
+    )
+    for endpoint in ("ask", "upload"):
+        if endpoint in stage:
+            line += f"  {endpoint} p50 {stage[endpoint]['p50_ms']:>7.0f} p99 {stage[endpoint]['p99_ms']:>7.0f} ms"
+    if "server" in stage:
+        line += f"  cpu {stage['server']['cpu_percent']:>5.0f}%  rss {stage['server']['peak_rss_mb']:>6.0f} MB"
+    print(line, flush=True)
+
+
+async def run(args) -> Dict[str, Any]:
+    questions = question_mix(load_questions(args.questions_file), args.variants, args.seed)
+    corpus = generate_corpus(documents=args.upload_documents, pages=args.upload_pages, seed=args.seed)
+    pdfs = [build_pdf(document["pages"]) for document in corpus]
+
+    limits = httpx.Limits(max_connections=max(args.stages) + 10, max_keepalive_connections=max(args.stages))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        (await client.get("/health")).raise_for_status()
+
+        if args.seed_documents:
+            seeded = await seed_documents(client, pdfs[:args.seed_documents], args.seed_timeout)
+            print(f"Seeded {seeded}/{args.seed_documents} documents")
+
+        load_test = LoadTest(client, questions, pdfs if args.upload_share > 0 else [], args.upload_share, args.seed)
+        sampler = ProcessSampler(args.server_pid) if args.server_pid else None
+        stages = {}
+        for concurrency in args.stages:
+            name = f"c{concurrency}"
+            stages[name] = await load_test.run_stage(concurrency, args.stage_seconds, sampler)
+            print_stage(name, stages[name])
+
+        queue = (await client.get("/api/v1/documents/jobs/stats")).json() if args.upload_share > 0 else None
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "base_url": args.base_url,
+            "stages": args.stages,
+            "stage_seconds": args.stage_seconds,
+            "upload_share": args.upload_share,
+            "questions": len(questions),
+            "seed": args.seed,
+        },
+        "results": {
+            "stages": stages,
+            "ingestion_queue": queue,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--stages", type=lambda value: [int(part) for part in value.split(",")],
+                        default=[1, 5, 10, 25], help="Comma-separated concurrency levels")
+    parser.add_argument("--stage-seconds", type=float, default=30.0)
+    parser.add_argument("--upload-share", type=float, default=0.05, help="Fraction of requests that are uploads")
+    parser.add_argument("--questions-file", default=SAMPLE_QUESTIONS)
+    parser.add_argument("--variants", type=int, default=4, help="Phrasings per sample question")
+    parser.add_argument("--upload-documents", type=int, default=20, help="Distinct PDFs to upload")
+    parser.add_argument("--upload-pages", type=int, default=5)
+    parser.add_argument("--seed-documents", type=int, default=0,
+                        help="Upload and ingest this many PDFs before the first stage")
+    parser.add_argument("--seed-timeout", type=float, default=300.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--server-pid", type=int, help="Sample this process's CPU and memory (Linux)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression (fraction)")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if any stage's error rate exceeds this")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if any endpoint's p99 exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if any stage serves fewer requests per second")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    failures = check_thresholds(report, args)
+    for failure in failures:
+        print(f"THRESHOLD {failure}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["stages"] != report["meta"]["stages"]:
+            print("Warning: baseline was run with different stages")
+        regressions = compare(report, baseline, args.tolerance, skip=SKIP_COMPARE)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            failures.extend(regressions)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
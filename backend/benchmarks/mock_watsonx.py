@@ -0,0 +1,243 @@
+"""
+Local stand-in for the IBM Cloud endpoints PolicyIQ calls
+
+Implements, with configurable latency and error injection:
+
+- POST /identity/token                 IAM API key -> bearer token
+- POST /ml/v1/text/generation          text generation
+- POST /ml/v1/text/generation_stream   server-sent events, one per token batch
+- POST /ml/v1/text/embeddings          embeddings (deterministic, hash based)
+- GET  /mock/stats                     request counts per endpoint
+
+Latencies are log-normal around a median with a spread (sigma); each
+endpoint can also fail at a given rate with 429/500/503 responses, as the
+real service does under load.
+
+Point the backend at it (watsonx.data is replaced by a SQLite file):
+
+    WATSONX_AI_URL=http://localhost:8081
+    WATSONX_AI_IAM_URL=http://localhost:8081/identity/token
+    WATSONX_AI_API_KEY=mock
+    WATSONX_AI_PROJECT_ID=mock
+    WATSONX_AI_USE_SDK=false
+    EMBEDDING_BACKEND=watsonx
+    WATSONX_DATA_URL=sqlite:///mock_chunks.db
+
+Usage (from backend/):
+    python benchmarks/mock_watsonx.py [--port 8081] [--generation-ms 1500]
+        [--embedding-ms 40] [--iam-ms 150] [--sigma 0.4] [--error-rate 0.01]
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Form, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ERROR_STATUSES = (429, 500, 503)
+
+
+class MockConfig:
+    """Latency and failure settings (mutable at runtime via POST /mock/config)"""
+
+    def __init__(
+        self,
+        generation_ms: float = 1500.0,
+        embedding_ms: float = 40.0,
+        iam_ms: float = 150.0,
+        sigma: float = 0.4,
+        error_rate: float = 0.0,
+        tokens_per_second: float = 40.0,
+        embedding_dimension: int = 768,
+        token_ttl_seconds: int = 3600,
+        seed: Optional[int] = None
+    ):
+        self.generation_ms = generation_ms
+        self.embedding_ms = embedding_ms
+        self.iam_ms = iam_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.embedding_dimension = embedding_dimension
+        self.token_ttl_seconds = token_ttl_seconds
+        self.rng = random.Random(seed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if key != "rng"}
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock watsonx")
+    tokens: Dict[str, float] = {}
+    stats: Counter = Counter()
+
+    async def simulate(endpoint: str, median_ms: float):
+        """Sleep for a log-normal latency, then maybe fail"""
+        stats[f"{endpoint}.requests"] += 1
+        if median_ms > 0:
+            await asyncio.sleep(median_ms / 1000 * math.exp(config.rng.gauss(0, config.sigma)))
+        if config.rng.random() < config.error_rate:
+            status = config.rng.choice(ERROR_STATUSES)
+            stats[f"{endpoint}.errors"] += 1
+            headers = {"Retry-After": "1"} if status == 429 else None
+            raise HTTPException(status_code=status, detail=f"Injected {status}", headers=headers)
+
+    def authorize(authorization: Optional[str]):
+        token = (authorization or "").removeprefix("Bearer ").strip()
+        expires = tokens.get(token)
+        if expires is None or expires < time.time():
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    @app.post("/identity/token")
+    async def iam_token(apikey: str = Form(...), grant_type: str = Form(...)):
+        await simulate("iam", config.iam_ms)
+        if grant_type != "urn:ibm:params:oauth:grant-type:apikey" or apikey == "invalid":
+            return JSONResponse(
+                status_code=400,
+                content={"errorCode": "BXNIM0415E", "errorMessage": "Provided API key could not be found."}
+            )
+        token = uuid.uuid4().hex
+        expiration = time.time() + config.token_ttl_seconds
+        tokens[token] = expiration
+        return {
+            "access_token": token,
+            "refresh_token": "not_supported",
+            "token_type": "Bearer",
+            "expires_in": config.token_ttl_seconds,
+            "expiration": int(expiration),
+        }
+
+    @app.post("/ml/v1/text/generation")
+    async def generation(request: Request, authorization: Optional[str] = Header(None)):
+        authorize(authorization)
+        body = await request.json()
+        text = _answer(body.get("input", ""), body.get("parameters", {}))
+        await simulate("generation", config.generation_ms)
+        return _generation_result(body, text, len(text.split()), "eos_token")
+
+    @app.post("/ml/v1/text/generation_stream")
+    async def generation_stream(request: Request, authorization: Optional[str] = Header(None)):
+        authorize(authorization)
+        body = await request.json()
+        # Time to first token is a fraction of a full generation
+        await simulate("generation_stream", config.generation_ms * 0.2)
+        words = _answer(body.get("input", ""), body.get("parameters", {})).split(" ")
+
+        async def events():
+            for index in range(0, len(words), 4):
+                piece = " ".join(words[index:index + 4]) + (" " if index + 4 < len(words) else "")
+                await asyncio.sleep(len(piece.split()) / config.tokens_per_second)
+                stop = "eos_token" if index + 4 >= len(words) else "not_finished"
+                payload = _generation_result(body, piece, len(piece.split()), stop)
+                yield f"id: {index // 4 + 1}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/ml/v1/text/embeddings")
+    async def embeddings(request: Request, authorization: Optional[str] = Header(None)):
+        authorize(authorization)
+        body = await request.json()
+        inputs: List[str] = body.get("inputs", [])
+        # Larger batches take longer, sublinearly
+        await simulate("embeddings", config.embedding_ms * (1 + math.log1p(len(inputs)) / 2))
+        return {
+            "model_id": body.get("model_id"),
+            "results": [{"embedding": _embedding(text, config.embedding_dimension)} for text in inputs],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "input_token_count": sum(len(text.split()) for text in inputs),
+        }
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return {"config": config.to_dict(), "counts": dict(stats)}
+
+    @app.post("/mock/config")
+    async def update_config(changes: Dict[str, float]):
+        for key, value in changes.items():
+            if key == "rng" or not hasattr(config, key):
+                raise HTTPException(status_code=400, detail=f"Unknown setting {key}")
+            setattr(config, key, type(getattr(config, key))(value))
+        return config.to_dict()
+
+    return app
+
+
+def _generation_result(body: Dict[str, Any], text: str, tokens: int, stop_reason: str) -> Dict[str, Any]:
+    return {
+        "model_id": body.get("model_id"),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "results": [{
+            "generated_text": text,
+            "generated_token_count": tokens,
+            "input_token_count": len(body.get("input", "").split()),
+            "stop_reason": stop_reason,
+        }],
+    }
+
+
+def _answer(prompt: str, parameters: Dict[str, Any]) -> str:
+    """Plausible answer built from the prompt's question and contexts"""
+    question = re.search(r"Question:\s*(.+)", prompt)
+    contexts = re.findall(r"\[Context (\d+)\]:\n(.+)", prompt)
+    lines = [
+        f"Based on the provided documents, {question.group(1).strip() if question else 'the question'} "
+        "is addressed by the cited provisions."
+    ]
+    for number, excerpt in contexts[:3]:
+        lines.append(f"- Context {number} states: {excerpt[:160].strip()}")
+    lines.append("Confidence: medium")
+    words = "\n".join(lines).split(" ")
+    return " ".join(words[:int(parameters.get("max_new_tokens", 1000))])
+
+
+def _embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic unit vector seeded by the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimension)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--generation-ms", type=float, default=1500.0, help="Median generation latency")
+    parser.add_argument("--embedding-ms", type=float, default=40.0, help="Median embedding latency")
+    parser.add_argument("--iam-ms", type=float, default=150.0, help="Median IAM token latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="Log-normal spread of latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 429/500/503")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Streaming speed")
+    parser.add_argument("--embedding-dimension", type=int, default=768)
+    parser.add_argument("--token-ttl", type=int, default=3600, help="IAM token lifetime in seconds")
+    parser.add_argument("--seed", type=int, help="Seed for latency and error sampling")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = MockConfig(
+        generation_ms=args.generation_ms,
+        embedding_ms=args.embedding_ms,
+        iam_ms=args.iam_ms,
+        sigma=args.sigma,
+        error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second,
+        embedding_dimension=args.embedding_dimension,
+        token_ttl_seconds=args.token_ttl,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
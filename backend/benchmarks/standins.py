@@ -0,0 +1,150 @@
+"""
+Local stand-ins for watsonx.ai and watsonx.data
+
+- HashingEmbedder: deterministic feature-hashing embeddings (no model, no
+  network), similar texts get similar vectors
+- LocalDataClient: the real WatsonxDataClient on a SQLite file, with
+  brute-force cosine vector search and a BM25 keyword search in place of
+  the Presto queries
+
+Retrieval latencies measured with these cover the application code around
+the stores (HybridSearch, staging, serialization), not watsonx.data itself.
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter, defaultdict
+import json
+import math
+import re
+import sqlite3
+import zlib
+
+from services.watsonx_data.client import WatsonxDataClient, unpack_embedding
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbedder:
+    """Drop-in for WatsonxAIClient's embedding methods"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def generate_embedding(self, text: str) -> List[float]:
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimension
+            tokens = tokenize(text)
+            # Unigrams and bigrams, signed by a second hash bit
+            for feature in tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vectors.append([value / norm for value in vector])
+        return vectors
+
+
+class LocalDataClient(WatsonxDataClient):
+    """WatsonxDataClient on SQLite with in-memory search indexes"""
+
+    def __init__(self, path: str):
+        super().__init__(connection_factory=lambda: sqlite3.connect(path, timeout=30))
+        self._chunks: Optional[List[Dict[str, Any]]] = None
+        self._matrix = None
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: List[int] = []
+
+    def commit_document(self, load_id: str, document_id: str):
+        super().commit_document(load_id, document_id)
+        self._chunks = None  # Reload indexes on the next search
+
+    def load_indexes(self):
+        """Read all chunks and build the vector matrix and inverted index"""
+        cursor = self._get_connection().execute(
+            "SELECT chunk_id, document_id, chunk_index, text, embedding, metadata FROM document_chunks"
+        )
+        chunks, vectors = [], []
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        lengths = []
+        for position, (chunk_id, document_id, chunk_index, text, embedding, metadata) in enumerate(cursor):
+            metadata = json.loads(metadata or "{}")
+            chunks.append({
+                "chunk_id": chunk_id,
+                "document_id": document_id,
+                "chunk_index": chunk_index,
+                "text": text,
+                "metadata": metadata,
+                "document_name": metadata.get("document_name"),
+            })
+            vectors.append(unpack_embedding(bytes(embedding)))
+            terms = Counter(tokenize(text))
+            lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                postings[term][position] = frequency
+
+        self._chunks = chunks
+        self._matrix = numpy.array(vectors, dtype=numpy.float32) if numpy is not None else vectors
+        self._postings = dict(postings)
+        self._lengths = lengths
+
+    def vector_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        threshold: float = 0.7
+    ) -> List[Dict[str, Any]]:
+        if self._chunks is None:
+            self.load_indexes()
+        if not self._chunks:
+            return []
+
+        if numpy is not None:
+            scores = self._matrix @ numpy.asarray(query_embedding, dtype=numpy.float32)
+            order = numpy.argsort(-scores)[:top_k].tolist()
+            scores = scores.tolist()
+        else:
+            scores = [sum(a * b for a, b in zip(row, query_embedding)) for row in self._matrix]
+            order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:top_k]
+
+        return [
+            {**self._chunks[index], "similarity": float(scores[index])}
+            for index in order
+            if scores[index] >= threshold
+        ]
+
+    def keyword_search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        if self._chunks is None:
+            self.load_indexes()
+        if not self._chunks:
+            return []
+
+        # BM25, normalized to 0..1 like the relevance scores HybridSearch expects
+        count = len(self._chunks)
+        average_length = sum(self._lengths) / count
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings.items():
+                length_norm = 1.2 * (0.25 + 0.75 * self._lengths[position] / average_length)
+                scores[position] += idf * frequency * 2.2 / (frequency + length_norm)
+
+        if not scores:
+            return []
+        best = max(scores.values())
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [{**self._chunks[position], "relevance": score / best} for position, score in ranked]
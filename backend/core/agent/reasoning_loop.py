@@ -2,36 +2,61 @@
 Agentic reasoning loop: plan, search, reason, verify, respond
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from contextlib import contextmanager, nullcontext
+import asyncio
+import json
 from core.rag.hybrid_search import HybridSearch
 from services.watsonx_ai.client import WatsonxAIClient
+from services.watsonx_ai.admission import AdmissionTimeoutError, RateLimitedError
+from services.watsonx_ai.resilience import CircuitOpenError, TransientServiceError
 from core.agent.confidence_scorer import ConfidenceScorer
+from core.config import settings
+from core.observability import metrics, tracing
+from core.single_flight import AsyncSingleFlight
 
 
 class ReasoningLoop:
     """Implements the agentic reasoning loop"""
 
-    def __init__(self):
-        try:
-            self.search = HybridSearch()
-        except Exception as e:
-            self.search = None
-            import warnings
-            warnings.warn(f"Failed to initialize HybridSearch: {str(e)}")
+    def __init__(
+        self,
+        search: Optional[HybridSearch] = None,
+        llm: Optional[WatsonxAIClient] = None
+    ):
+        """
+        Args:
+            search: Shared hybrid search (created if not given)
+            llm: Shared watsonx.ai client (created if not given)
+        """
+        self.search = search
+        if self.search is None:
+            try:
+                self.search = HybridSearch()
+            except Exception as e:
+                import warnings
+                warnings.warn(f"Failed to initialize HybridSearch: {str(e)}")
         
-        try:
-            self.llm = WatsonxAIClient()
-        except Exception as e:
-            self.llm = None
-            import warnings
-            warnings.warn(f"Failed to initialize WatsonxAIClient: {str(e)}")
+        self.llm = llm
+        if self.llm is None:
+            try:
+                self.llm = WatsonxAIClient()
+            except Exception as e:
+                import warnings
+                warnings.warn(f"Failed to initialize WatsonxAIClient: {str(e)}")
         
         self.confidence_scorer = ConfidenceScorer()
+        
+        # Identical questions in flight at the same time share one run
+        self.in_flight_questions = AsyncSingleFlight()
 
     async def process_question(
         self,
         question: str,
-        context: Dict[str, Any] = None
+        context: Dict[str, Any] = None,
+        priority: str = "interactive",
+        query_embedding: Optional[List[float]] = None,
+        generation_budget: Optional[asyncio.Semaphore] = None
     ) -> Dict[str, Any]:
         """
         Process a question through the reasoning loop
@@ -39,36 +64,120 @@ class ReasoningLoop:
         Args:
             question: User question
             context: Optional context
+            priority: Admission priority of the LLM call ("interactive" or "batch")
+            query_embedding: Embedding of the question, if already computed
+            generation_budget: Caller-side limit on concurrent LLM calls (e.g. per batch)
             
         Returns:
             Complete answer with citations and confidence
         """
-        # Step 1: Plan - Decompose question
-        plan = await self._plan(question)
-        
-        # Step 2: Search - Retrieve relevant documents
-        search_results = await self._search(question, plan)
+        def run():
+            return self._process_question(question, context, priority, query_embedding, generation_budget)
         
-        # Step 3: Reason - Generate answer with LLM
-        reasoning_result = await self._reason(question, search_results)
+        if not settings.COALESCE_QUESTIONS:
+            return await run()
         
-        # Step 4: Verify - Self-check answer
-        verification = await self._verify(
-            question,
-            reasoning_result,
-            search_results
-        )
-        
-        # Step 5: Respond - Format final answer
-        response = await self._respond(
-            question,
-            reasoning_result,
-            verification,
-            search_results
+        # Callers joining an identical question in flight get the same
+        # answer; each still writes its own audit entry
+        with tracing.span("coalesce") as span:
+            result, shared = await self.in_flight_questions.do(
+                self._question_key(question, context, priority, generation_budget),
+                run
+            )
+            span.set(shared=shared)
+        if shared:
+            metrics.COALESCED_REQUESTS.labels("question").inc()
+        return dict(result)
+
+    @staticmethod
+    def _question_key(
+        question: str,
+        context: Optional[Dict[str, Any]],
+        priority: str,
+        generation_budget: Optional[asyncio.Semaphore]
+    ) -> Tuple[str, Optional[int], str]:
+        """
+        Identical questions (with equal context) coalesce
+
+        Only calls that would run the same way share a run: same priority
+        and same generation budget, so an interactive question never waits
+        behind a batch's budget at batch priority (or the reverse), while
+        repeats within one batch still coalesce. The query embedding is left
+        out, it is derived from the question. The question is compared
+        exactly: the answer and its audit record quote it as asked.
+        """
+        return (
+            priority,
+            id(generation_budget) if generation_budget is not None else None,
+            question + "\x00" + (
+                json.dumps(context, sort_keys=True, default=str) if context else ""
+            )
         )
+
+    async def _process_question(
+        self,
+        question: str,
+        context: Optional[Dict[str, Any]],
+        priority: str,
+        query_embedding: Optional[List[float]],
+        generation_budget: Optional[asyncio.Semaphore]
+    ) -> Dict[str, Any]:
+        """Plan, search, reason, verify and respond (see process_question)"""
+        with metrics.track(
+            metrics.QUESTION_SECONDS.labels(),
+            requests=metrics.QUESTIONS,
+            in_flight=metrics.QUESTIONS_IN_FLIGHT.labels()
+        ):
+            # Step 1: Plan - Decompose question
+            with self._stage("plan") as span:
+                plan = await self._plan(question)
+                span.set(sub_questions=len(plan["sub_questions"]), is_complex=plan["is_complex"])
+            
+            # Step 2: Search - Retrieve relevant documents
+            with self._stage("search") as span:
+                search_results = await self._search(question, plan, query_embedding)
+                span.set(results=len(search_results))
+            
+            # Step 3: Reason - Generate answer with LLM
+            with self._stage("reason") as span:
+                reasoning_result = await self._reason(question, search_results, priority, generation_budget)
+                span.set(
+                    context_chunks=reasoning_result["context_used"],
+                    generated=reasoning_result["llm_response"] is not None
+                )
+            
+            # Step 4: Verify - Self-check answer
+            with self._stage("verify") as span:
+                verification = await self._verify(
+                    question,
+                    reasoning_result,
+                    search_results
+                )
+                span.set(supported=verification["is_supported"], confidence=verification["confidence"])
+            
+            # Step 5: Respond - Format final answer
+            with self._stage("respond") as span:
+                response = await self._respond(
+                    question,
+                    reasoning_result,
+                    verification,
+                    search_results
+                )
+                span.set(
+                    confidence_score=response["confidence_score"],
+                    citations=len(response["citations"]),
+                    manual_review_recommended=response["manual_review_recommended"]
+                )
         
         return response
 
+    @staticmethod
+    @contextmanager
+    def _stage(name: str):
+        """Time a reasoning stage in the metrics and in the request trace"""
+        with metrics.REASONING_STAGE_SECONDS.labels(name).time(), tracing.span(name) as span:
+            yield span
+
     async def _plan(self, question: str) -> Dict[str, Any]:
         """
         Plan: Decompose question into sub-queries if needed
@@ -115,7 +224,8 @@ Respond in JSON format:
     async def _search(
         self,
         question: str,
-        plan: Dict[str, Any]
+        plan: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search: Retrieve relevant document chunks
@@ -123,6 +233,7 @@ Respond in JSON format:
         Args:
             question: Original question
             plan: Planning results
+            query_embedding: Embedding of the original question, if already computed
             
         Returns:
             List of relevant chunks
@@ -136,7 +247,12 @@ Respond in JSON format:
         
         for sub_q in plan["sub_questions"]:
             try:
-                results = self.search.search(sub_q)
+                # Embedding and store queries block; keep them off the event loop
+                results = await asyncio.to_thread(
+                    self.search.search,
+                    sub_q,
+                    query_embedding=query_embedding if sub_q == question else None
+                )
                 all_results.extend(results)
             except Exception:
                 # If search fails, continue with empty results
@@ -162,7 +278,9 @@ Respond in JSON format:
     async def _reason(
         self,
         question: str,
-        search_results: List[Dict[str, Any]]
+        search_results: List[Dict[str, Any]],
+        priority: str = "interactive",
+        generation_budget: Optional[asyncio.Semaphore] = None
     ) -> Dict[str, Any]:
         """
         Reason: Use LLM to generate answer from retrieved context
@@ -170,6 +288,8 @@ Respond in JSON format:
         Args:
             question: User question
             search_results: Retrieved chunks
+            priority: Admission priority of the LLM call
+            generation_budget: Optional caller-side limit on concurrent LLM calls
             
         Returns:
             LLM reasoning result
@@ -189,10 +309,18 @@ Respond in JSON format:
         
         # Generate answer with context
         try:
-            llm_response = self.llm.generate_with_context(
-                question=question,
-                context=context_chunks
-            )
+            async with generation_budget or nullcontext():
+                llm_response = await self.llm.agenerate_with_context(
+                    question=question,
+                    context=context_chunks,
+                    priority=priority
+                )
+        except (AdmissionTimeoutError, RateLimitedError):
+            # Overload: let the caller shed the request instead of answering with an error
+            raise
+        except (CircuitOpenError, TransientServiceError):
+            # watsonx.ai is degraded: fail fast with what retrieval found
+            return self._retrieval_only(search_results)
         except Exception as e:
             # Return error message if LLM call fails
             return {
@@ -207,6 +335,21 @@ Respond in JSON format:
             "context_used": len(context_chunks)
         }
 
+    def _retrieval_only(self, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reasoning result listing the top passages, used while watsonx.ai is unavailable"""
+        lines = ["watsonx.ai is temporarily unavailable, so no answer was generated."]
+        if search_results:
+            lines.append("The most relevant passages from your documents:")
+            for result in search_results[:3]:
+                excerpt = " ".join(result.get("text", "").split())[:300]
+                lines.append(f"- {result.get('document_name') or result.get('document_id', '')}: {excerpt}")
+        return {
+            "answer": "\n".join(lines),
+            "llm_response": None,
+            "context_used": len(search_results),
+            "degraded": True
+        }
+
     async def _verify(
         self,
         question: str,
@@ -294,24 +437,42 @@ Respond in JSON:
             verification=verification
         )
         
+        # Without a generated answer there is nothing to be confident in
+        degraded = reasoning_result.get("degraded", False)
+        if degraded:
+            confidence_score = 0.0
+        
         # Determine if manual review is needed
         manual_review = confidence_score < self.confidence_scorer.manual_review_threshold
         
         # Extract explanation from answer (simplified)
         explanation = self._extract_explanation(answer)
         
+        llm_response = reasoning_result.get("llm_response") or {}
+        
         return {
             "answer": self._extract_direct_answer(answer),
             "explanation": explanation,
             "citations": citations,
             "confidence_score": confidence_score,
             "manual_review_recommended": manual_review,
+            "degraded": degraded,
             "reasoning_steps": [
                 "Question analyzed and decomposed",
                 f"Retrieved {len(search_results)} relevant document chunks",
-                "Generated answer using LLM reasoning",
+                (
+                    "watsonx.ai unavailable: returned retrieved passages without an answer"
+                    if degraded else "Generated answer using LLM reasoning"
+                ),
                 "Verified answer against source documents",
                 "Calculated confidence score"
+            ],
+            # Kept for the audit log
+            "llm_prompt": llm_response.get("prompt"),
+            "llm_response": llm_response.get("text"),
+            "retrieved_sources": [
+                {key: value for key, value in result.items() if key != "embedding"}
+                for result in search_results
             ]
         }
 
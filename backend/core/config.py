@@ -19,23 +19,53 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
 
+    # Observability
+    METRICS_ENABLED: bool = True
+    TRACING_ENABLED: bool = True
+    PROFILER_ENABLED: bool = False  # Exposes POST /api/v1/admin/profile
+    PROFILER_MAX_SECONDS: float = 60.0
+
     # watsonx.ai
     WATSONX_AI_API_KEY: Optional[str] = None
     WATSONX_AI_URL: str = "https://us-south.ml.cloud.ibm.com"
     WATSONX_AI_PROJECT_ID: Optional[str] = None
     WATSONX_AI_MODEL: str = "meta-llama/llama-2-70b-chat"
+    WATSONX_AI_IAM_URL: str = "https://iam.cloud.ibm.com/identity/token"
+    WATSONX_AI_USE_SDK: bool = True  # False: always call the REST API (e.g. a local mock)
+
+    # watsonx.ai admission control (concurrent generations)
+    WATSONX_AI_MAX_IN_FLIGHT: int = 8
+    WATSONX_AI_MIN_IN_FLIGHT: int = 1
+    WATSONX_AI_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    WATSONX_AI_ADAPTIVE_CONCURRENCY: bool = True  # AIMD on 429s and slow calls
+    WATSONX_AI_LATENCY_TARGET_SECONDS: float = 15.0
+
+    # watsonx.ai resilience
+    WATSONX_AI_TIMEOUT_SECONDS: float = 30.0
+    WATSONX_AI_RETRY_ATTEMPTS: int = 3
+    WATSONX_AI_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    WATSONX_AI_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    WATSONX_AI_HEDGE_ENABLED: bool = False  # Duplicate generations slower than the percentile below
+    WATSONX_AI_HEDGE_PERCENTILE: float = 0.95
+    WATSONX_AI_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    WATSONX_AI_BREAKER_FAILURE_THRESHOLD: int = 5
+    WATSONX_AI_BREAKER_RESET_SECONDS: float = 30.0
 
     # watsonx.data
     WATSONX_DATA_URL: Optional[str] = None
     WATSONX_DATA_USERNAME: Optional[str] = None
     WATSONX_DATA_PASSWORD: Optional[str] = None
     WATSONX_DATA_DATABASE: str = "policyiq_db"
+    WATSONX_DATA_CATALOG: str = "iceberg_data"
+    WATSONX_DATA_INSERT_BATCH_ROWS: int = 200
 
     # Embedding
     EMBEDDING_MODEL: str = "ibm/slate-125m-english-rtrvr"
     EMBEDDING_DIMENSION: int = 768
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BACKEND: str = "local"  # "local" (sentence-transformers) or "watsonx"
 
     # RAG
     MAX_RETRIEVAL_RESULTS: int = 10
@@ -43,10 +73,71 @@ class Settings(BaseSettings):
     KEYWORD_WEIGHT: float = 0.3
     VECTOR_WEIGHT: float = 0.7
 
+    # Request coalescing (identical concurrent requests share one computation)
+    COALESCE_QUESTIONS: bool = True
+    COALESCE_EMBEDDINGS: bool = True
+
+    # Batch questions
+    BATCH_MAX_QUESTIONS: int = 500
+    BATCH_MAX_CONCURRENCY: int = 4  # Concurrent LLM calls per batch
+
     # Confidence
     MIN_CONFIDENCE_THRESHOLD: float = 0.6
     MANUAL_REVIEW_THRESHOLD: float = 0.7
 
+    # Uploads
+    UPLOAD_DIR: str = "uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    BULK_UPLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    BULK_ARCHIVE_MAX_MEMBERS: int = 10000
+    BULK_ARCHIVE_MAX_MEMBER_BYTES: int = 200 * 1024 * 1024  # uncompressed, per PDF
+    BULK_ARCHIVE_MAX_TOTAL_BYTES: int = 8 * 1024 * 1024 * 1024  # uncompressed, all PDFs
+
+    # Audit log database
+    AUDIT_DB_PATH: str = "audit_logs.db"
+    AUDIT_DB_SYNCHRONOUS: str = "NORMAL"  # WAL + NORMAL: durable across app crashes
+    AUDIT_DB_CACHE_SIZE_KB: int = 16384
+    AUDIT_DB_BUSY_TIMEOUT_MS: int = 5000
+
+    # Audit writer
+    AUDIT_WRITER_ENABLED: bool = True
+    AUDIT_BATCH_SIZE: int = 100
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    AUDIT_DURABILITY: str = "batch"  # "batch": fsync per batch, "record": fsync per record
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = 5.0
+    AUDIT_DEAD_LETTER_PATH: str = "audit_dead_letter.jsonl"  # records that failed to write, replayed later
+
+    # Audit payload compression
+    AUDIT_COMPRESSION_ENABLED: bool = True
+    AUDIT_COMPRESSION_LEVEL: int = 3
+    AUDIT_COMPRESSION_MIN_BYTES: int = 256
+    AUDIT_COMPRESSION_DICT_SIZE: int = 65536
+    AUDIT_COMPRESSION_TRAINING_SAMPLES: int = 500
+
+    # Audit archive
+    AUDIT_ARCHIVE_DIR: str = "audit_archive"
+    AUDIT_ARCHIVE_COMPRESSION: str = "zstd"
+    AUDIT_HOT_RETENTION_DAYS: int = 90
+    AUDIT_ARCHIVE_RETENTION_DAYS: Optional[int] = None  # None keeps archives forever
+
+    # Ingestion pipeline
+    PIPELINE_QUEUE_SIZE: int = 64
+    PIPELINE_STORE_BATCH_SIZE: int = 256
+
+    # Ingestion job queue
+    INGESTION_QUEUE_DB_PATH: str = "ingestion_jobs.db"
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_QUEUE_DEPTH: int = 100
+    INGESTION_MAX_RETRIES: int = 3
+    INGESTION_RETRY_BACKOFF_SECONDS: float = 5.0
+
+    # Bulk ingestion
+    BULK_INGEST_ROOT: Optional[str] = None  # Server-side directories must live under this path
+    BULK_EXTRACT_WORKERS: int = 4
+    BULK_STORE_BATCH_SIZE: int = 500
+
     class Config:
         env_file = ".env"
         case_sensitive = True
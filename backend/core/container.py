@@ -0,0 +1,48 @@
+"""
+Shared service clients, built once per process
+"""
+
+from typing import Optional
+import warnings
+from core.agent.reasoning_loop import ReasoningLoop
+from core.rag.hybrid_search import HybridSearch
+from services.watsonx_ai.client import WatsonxAIClient
+from services.watsonx_data.client import WatsonxDataClient
+
+
+class ServiceContainer:
+    """
+    Holds the watsonx clients and the reasoning loop shared by all routes
+
+    Built from the application lifespan instead of at import time, so
+    importing the app stays cheap and every component shares one set of
+    clients (and one local embedding model) instead of creating its own.
+    """
+
+    def __init__(self):
+        self.ai_client: Optional[WatsonxAIClient] = None
+        self.data_client: Optional[WatsonxDataClient] = None
+        self.reasoning_loop: Optional[ReasoningLoop] = None
+
+    def start(self):
+        """Create the clients (missing credentials leave them unset)"""
+        try:
+            self.ai_client = WatsonxAIClient()
+        except Exception as e:
+            warnings.warn(f"Failed to initialize WatsonxAIClient: {str(e)}")
+
+        try:
+            self.data_client = WatsonxDataClient()
+        except Exception as e:
+            warnings.warn(f"Failed to initialize WatsonxDataClient: {str(e)}")
+
+        try:
+            self.reasoning_loop = ReasoningLoop(
+                search=HybridSearch(data_client=self.data_client, ai_client=self.ai_client),
+                llm=self.ai_client
+            )
+        except Exception as e:
+            warnings.warn(f"Failed to initialize ReasoningLoop: {str(e)}")
+
+
+container = ServiceContainer()
@@ -0,0 +1,369 @@
+"""
+Columnar archive tier for audit logs
+
+Closed days are rolled out of the hot SQLite table into zstd-compressed
+Parquet files, one directory per day, described by a manifest:
+
+    <archive_dir>/manifest.json
+    <archive_dir>/date=2024-01-31/part-<uuid>.parquet
+
+Run as a module to archive on a schedule (e.g. from cron):
+
+    python -m core.governance.audit_archive [--before YYYY-MM-DD]
+"""
+
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import threading
+import uuid
+from core.config import settings
+
+
+MANIFEST_FILE = "manifest.json"
+
+# Columns copied verbatim from audit_logs
+LOG_COLUMNS = [
+    "id", "timestamp", "question", "answer", "citations", "confidence_score",
+    "user_id", "llm_prompt", "llm_response", "retrieved_sources",
+    "document_versions", "reasoning_steps", "manual_review_recommended", "trace"
+]
+
+
+@lru_cache(maxsize=None)
+def _pyarrow_installed() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _schema(pa):
+    """Parquet schema for archived logs"""
+    return pa.schema([
+        ("id", pa.string()),
+        ("timestamp", pa.string()),
+        ("question", pa.string()),
+        ("answer", pa.string()),
+        ("citations", pa.string()),
+        ("confidence_score", pa.float64()),
+        ("user_id", pa.string()),
+        ("llm_prompt", pa.string()),
+        ("llm_response", pa.string()),
+        ("retrieved_sources", pa.string()),
+        ("document_versions", pa.string()),
+        ("reasoning_steps", pa.string()),
+        ("manual_review_recommended", pa.int64()),
+        ("trace", pa.string()),
+        # Denormalized from audit_log_sources for source filters
+        ("source_document_ids", pa.list_(pa.string())),
+        ("source_chunk_ids", pa.list_(pa.string())),
+    ])
+
+
+class AuditArchive:
+    """
+    Parquet archive of audit logs partitioned by day
+
+    The manifest lists each partition's files, row counts and timestamp
+    range, so queries only open the partitions that can match.
+    """
+
+    def __init__(self, archive_dir: str = None, compression: str = None):
+        self.archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+        self.compression = compression or settings.AUDIT_ARCHIVE_COMPRESSION
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether pyarrow is installed (checked without importing it)"""
+        return _pyarrow_installed()
+
+    def manifest(self) -> Dict[str, Any]:
+        """
+        Load the manifest
+
+        The parsed manifest is cached until the file changes, so archive
+        runs from another process (e.g. the CLI) are picked up.
+        """
+        path = os.path.join(self.archive_dir, MANIFEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if self._manifest is None or mtime != self._manifest_mtime:
+            if mtime is None:
+                self._manifest = {"partitions": {}}
+            else:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def partitions(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        descending: bool = False
+    ) -> List[str]:
+        """
+        Archived partition keys (YYYY-MM-DD) overlapping a date range
+
+        Args:
+            start_date: Earliest timestamp of interest
+            end_date: Latest timestamp of interest
+            descending: Newest partition first
+
+        Returns:
+            Sorted partition keys
+        """
+        keys = sorted(self.manifest()["partitions"], reverse=descending)
+        if start_date:
+            keys = [key for key in keys if key >= start_date.date().isoformat()]
+        if end_date:
+            keys = [key for key in keys if key <= end_date.date().isoformat()]
+        return keys
+
+    def archive_before(self, audit_logger, before: date) -> Dict[str, Any]:
+        """
+        Move every log from days before a cutoff into the archive
+
+        Each day is written to Parquet and recorded in the manifest before
+        its rows are deleted from SQLite, so a crash can only leave a day in
+        both tiers (queries de-duplicate by ID), never in neither.
+
+        Args:
+            audit_logger: AuditLogger owning the hot table
+            before: First day to keep in the hot table
+
+        Returns:
+            Archived row counts per partition
+
+        Raises:
+            ValueError: If before is after today (today's logs are still being written)
+        """
+        if before > date.today():
+            raise ValueError(f"before ({before.isoformat()}) cannot be after today")
+        self._require_pyarrow()
+        conn = audit_logger.db.connection()
+        days = [
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT substr(timestamp, 1, 10) FROM audit_logs "
+                "WHERE timestamp < ? ORDER BY 1",
+                (before.isoformat(),)
+            )
+        ]
+
+        archived = {}
+        for day in days:
+            archived[day] = self._archive_day(audit_logger, day)
+
+        return {"before": before.isoformat(), "partitions": archived}
+
+    def purge_before(self, before: date) -> List[str]:
+        """
+        Delete archived partitions older than a cutoff
+
+        Args:
+            before: First day to keep
+
+        Returns:
+            Removed partition keys
+        """
+        with self._lock:
+            manifest = self.manifest()
+            removed = [key for key in manifest["partitions"] if key < before.isoformat()]
+            for key in removed:
+                del manifest["partitions"][key]
+            self._save_manifest(manifest)
+
+        for key in removed:
+            shutil.rmtree(self._partition_dir(key), ignore_errors=True)
+
+        return removed
+
+    def iter_partition(
+        self,
+        key: str,
+        filters: Optional[list] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 1024
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Read the rows of one partition
+
+        Files are streamed in record batches, so only batch_size rows are
+        materialized at a time.
+
+        Args:
+            key: Partition key (YYYY-MM-DD)
+            filters: pyarrow filter expressions applied while reading
+            columns: Columns to read (default: all)
+            batch_size: Rows decoded per batch
+
+        Yields:
+            Row dictionaries with audit_logs columns plus source ID lists
+        """
+        pa, pq = self._require_pyarrow()
+        expression = pq.filters_to_expression(filters) if filters else None
+        read_columns = columns
+        if columns and filters:
+            read_columns = list(dict.fromkeys(columns + [name for name, _, _ in filters]))
+
+        for entry in self.manifest()["partitions"].get(key, {}).get("files", []):
+            parquet_file = pq.ParquetFile(os.path.join(self.archive_dir, entry["file"]))
+            try:
+                for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+                    table = pa.Table.from_batches([batch])
+                    if expression is not None:
+                        table = table.filter(expression)
+                    if read_columns != columns:
+                        table = table.select(columns)
+                    yield from table.to_pylist()
+            finally:
+                parquet_file.close()
+
+    def _archive_day(self, audit_logger, day: str) -> int:
+        """Write one day's logs to Parquet and remove them from SQLite"""
+        conn = audit_logger.db.connection()
+        start, end = day, (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+        # Rows left behind by an interrupted run are already archived
+        if day in self.manifest()["partitions"]:
+            audit_logger.delete_logs([
+                row["id"] for row in self.iter_partition(day, columns=["id"])
+            ])
+
+        rows = [
+            audit_logger.expand_row(row) for row in conn.execute(
+                f"SELECT {', '.join(LOG_COLUMNS)} FROM audit_logs "
+                "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id",
+                (start, end)
+            )
+        ]
+        if not rows:
+            return 0
+
+        sources: Dict[str, Dict[str, List[str]]] = {}
+        for log_id, document_id, chunk_id in conn.execute(
+            "SELECT s.log_id, s.document_id, s.chunk_id FROM audit_log_sources s "
+            "JOIN audit_logs l ON l.id = s.log_id "
+            "WHERE l.timestamp >= ? AND l.timestamp < ?",
+            (start, end)
+        ):
+            entry = sources.setdefault(log_id, {"documents": [], "chunks": []})
+            if document_id and document_id not in entry["documents"]:
+                entry["documents"].append(document_id)
+            if chunk_id:
+                entry["chunks"].append(chunk_id)
+
+        for row in rows:
+            entry = sources.get(row["id"], {})
+            row["source_document_ids"] = entry.get("documents", [])
+            row["source_chunk_ids"] = entry.get("chunks", [])
+
+        pa, pq = self._require_pyarrow()
+        os.makedirs(self._partition_dir(day), exist_ok=True)
+        relative = os.path.join(f"date={day}", f"part-{uuid.uuid4().hex}.parquet")
+        path = os.path.join(self.archive_dir, relative)
+        tmp_path = path + ".tmp"
+        pq.write_table(
+            pa.Table.from_pylist(rows, schema=_schema(pa)),
+            tmp_path,
+            compression=self.compression
+        )
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            manifest = self.manifest()
+            partition = manifest["partitions"].setdefault(day, {"files": [], "rows": 0})
+            partition["files"].append({
+                "file": relative,
+                "rows": len(rows),
+                "min_timestamp": rows[0]["timestamp"],
+                "max_timestamp": rows[-1]["timestamp"],
+                "created_at": datetime.now().isoformat(),
+            })
+            partition["rows"] += len(rows)
+            self._save_manifest(manifest)
+
+        audit_logger.delete_logs([row["id"] for row in rows])
+        return len(rows)
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Atomically replace the manifest file"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, MANIFEST_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(path + ".tmp", path)
+        self._manifest = manifest
+        self._manifest_mtime = os.stat(path).st_mtime_ns
+
+    def _partition_dir(self, key: str) -> str:
+        """Directory holding a partition's files"""
+        return os.path.join(self.archive_dir, f"date={key}")
+
+    def _require_pyarrow(self):
+        """Import pyarrow on first use; it is slow to import"""
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("pyarrow is required for the audit archive. Install with: pip install pyarrow")
+        return pyarrow, pyarrow.parquet
+
+
+def run_retention(audit_logger, before: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Apply the configured retention tiers
+
+    Logs older than AUDIT_HOT_RETENTION_DAYS move to the archive, and
+    archived partitions older than AUDIT_ARCHIVE_RETENTION_DAYS (if set) are
+    deleted.
+
+    Args:
+        audit_logger: AuditLogger to archive from
+        before: Override the hot-tier cutoff day
+
+    Returns:
+        Summary of archived and purged partitions
+    """
+    today = date.today()
+    before = before or today - timedelta(days=settings.AUDIT_HOT_RETENTION_DAYS)
+
+    result = audit_logger.archive.archive_before(audit_logger, before)
+    result["purged"] = []
+    if settings.AUDIT_ARCHIVE_RETENTION_DAYS is not None:
+        result["purged"] = audit_logger.archive.purge_before(
+            today - timedelta(days=settings.AUDIT_ARCHIVE_RETENTION_DAYS)
+        )
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive audit logs to Parquet")
+    parser.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        help="Archive logs before this day (default: AUDIT_HOT_RETENTION_DAYS ago)"
+    )
+    args = parser.parse_args()
+
+    from core.governance.audit_logger import get_audit_logger
+
+    audit_logger = get_audit_logger()
+    try:
+        print(json.dumps(run_retention(audit_logger, args.before), indent=2))
+    finally:
+        audit_logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Compression codec for large audit log columns
+"""
+
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+import logging
+import sqlite3
+import struct
+import threading
+import zlib
+from core.config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+# Encoded values start with a marker byte; anything stored as TEXT is plain
+ZSTD_MARKER = b"\x01"  # followed by a 4-byte dictionary ID (0 = no dictionary)
+ZLIB_MARKER = b"\x02"
+
+
+class PayloadCodec:
+    """
+    Compresses audit payloads (prompts, completions, JSON source lists)
+
+    Uses zstd with a dictionary trained on the first
+    AUDIT_COMPRESSION_TRAINING_SAMPLES payloads, which captures the system
+    prompt and boilerplate repeated across rows, so even short payloads
+    compress well. Dictionaries are kept in audit_compression_dicts and
+    never removed, so every stored value stays decodable. Without the
+    zstandard package, zlib is used instead (no dictionary).
+
+    Values shorter than AUDIT_COMPRESSION_MIN_BYTES are stored as plain
+    text, as are all values written before compression was enabled.
+    """
+
+    def __init__(
+        self,
+        db,
+        enabled: bool = None,
+        level: int = None,
+        min_bytes: int = None,
+        dict_size: int = None,
+        training_samples: int = None
+    ):
+        self.enabled = settings.AUDIT_COMPRESSION_ENABLED if enabled is None else enabled
+        self.level = level or settings.AUDIT_COMPRESSION_LEVEL
+        self.min_bytes = min_bytes or settings.AUDIT_COMPRESSION_MIN_BYTES
+        self.dict_size = dict_size or settings.AUDIT_COMPRESSION_DICT_SIZE
+        self.training_samples = training_samples or settings.AUDIT_COMPRESSION_TRAINING_SAMPLES
+
+        self.db = db
+        self._lock = threading.Lock()
+        self._dicts: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        # Decompressors aren't thread-safe, so each thread keeps its own
+        self._local = threading.local()
+        self._compressor = None
+        self._dict_id = 0
+        self._samples: List[bytes] = []
+        self._set_compressor()
+
+    @staticmethod
+    def create_tables(conn: sqlite3.Connection):
+        """Create the dictionary table"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_compression_dicts (
+                id INTEGER PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                dictionary BLOB NOT NULL
+            )
+        """)
+
+    def load(self):
+        """Load stored dictionaries and compress with the newest one"""
+        if zstandard is None:
+            return
+
+        with self._lock:
+            for dict_id, data in self.db.connection().execute(
+                "SELECT id, dictionary FROM audit_compression_dicts ORDER BY id"
+            ):
+                self._add_dict(dict_id, zstandard.ZstdCompressionDict(data))
+            self._set_compressor()
+
+    def encode(self, text: Optional[str]) -> Optional[Union[str, bytes]]:
+        """
+        Compress a payload if it is large enough to be worth it
+
+        Args:
+            text: Payload text
+
+        Returns:
+            The text itself, or marker-prefixed compressed bytes
+        """
+        if text is None or not self.enabled:
+            return text
+
+        data = text.encode("utf-8")
+        if len(data) < self.min_bytes:
+            return text
+
+        if zstandard is None:
+            return ZLIB_MARKER + zlib.compress(data, min(self.level, 9))
+
+        with self._lock:
+            if not self._dict_id and len(self._samples) < self.training_samples:
+                self._samples.append(data)
+            compressed = self._compressor.compress(data)
+            return ZSTD_MARKER + struct.pack(">I", self._dict_id) + compressed
+
+    def decode(self, value: Optional[Union[str, bytes]]) -> Optional[str]:
+        """
+        Reverse encode
+
+        Args:
+            value: Stored column value
+
+        Returns:
+            Payload text
+        """
+        if value is None or isinstance(value, str):
+            return value
+
+        value = bytes(value)
+        marker = value[:1]
+
+        if marker == ZLIB_MARKER:
+            return zlib.decompress(value[1:]).decode("utf-8")
+
+        if marker == ZSTD_MARKER:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read compressed audit logs")
+            (dict_id,) = struct.unpack(">I", value[1:5])
+            return self._decompressor(dict_id).decompress(value[5:]).decode("utf-8")
+
+        return value.decode("utf-8")
+
+    def train_if_ready(self):
+        """
+        Train and store a dictionary once enough samples are collected
+
+        The dictionary is committed in its own transaction before any row
+        is compressed with it, so stored values never reference a
+        dictionary that was rolled back.
+        """
+        if zstandard is None or self._dict_id:
+            return
+
+        with self._lock:
+            if len(self._samples) < self.training_samples:
+                return
+            samples, self._samples = self._samples, []
+
+            try:
+                trained = zstandard.train_dictionary(self.dict_size, samples)
+            except zstandard.ZstdError as e:
+                logger.warning("Could not train audit compression dictionary: %s", e)
+                return
+
+            with self.db.transaction() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO audit_compression_dicts (created_at, dictionary) VALUES (?, ?)",
+                    (datetime.now().isoformat(), trained.as_bytes())
+                )
+            self._add_dict(cursor.lastrowid, trained)
+            self._set_compressor()
+
+    def _add_dict(self, dict_id: int, dictionary):
+        self._dicts[dict_id] = dictionary
+        self._dict_id = max(self._dict_id, dict_id)
+
+    def _set_compressor(self):
+        """Build the compressor for the newest dictionary"""
+        if zstandard is None:
+            return
+        dictionary = self._dicts.get(self._dict_id)
+        if dictionary is not None:
+            self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=self.level)
+
+    def _decompressor(self, dict_id: int):
+        """Get this thread's decompressor for a dictionary ID"""
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = self._dicts.get(dict_id) if dict_id else None
+            if dict_id and dictionary is None:
+                # Trained by another process after this one started
+                row = self.db.connection().execute(
+                    "SELECT dictionary FROM audit_compression_dicts WHERE id = ?", (dict_id,)
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Unknown audit compression dictionary {dict_id}")
+                dictionary = zstandard.ZstdCompressionDict(row[0])
+                with self._lock:
+                    self._dicts[dict_id] = dictionary
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            decompressors[dict_id] = decompressor
+        return decompressor
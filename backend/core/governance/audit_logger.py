@@ -2,57 +2,201 @@
 Audit logging for governance and compliance
 """
 
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import json
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+import base64
+import hashlib
+import logging
+import re
 import sqlite3
-from pathlib import Path
+import uuid
 from core.config import settings
+from core import serialization
+from core.governance.sqlite_pool import SQLiteConnectionManager
+from core.governance.audit_archive import AuditArchive
+from core.governance.audit_codec import PayloadCodec
+from core.governance.audit_rollups import AuditRollups
+from core.observability import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+# Columns compressed by PayloadCodec
+PAYLOAD_COLUMNS = ("citations", "llm_prompt", "llm_response", "retrieved_sources", "trace")
+
+# Chunk texts at least this long are stored once in audit_chunk_texts and
+# referenced from retrieved_sources and the prompt
+CHUNK_REF_MIN_CHARS = 64
+CHUNK_REF = "\x00chunk:{}\x00"
+CHUNK_REF_PATTERN = re.compile("\x00chunk:([0-9a-f]{64})\x00")
 
 
 class AuditLogger:
     """Logs all interactions for audit and governance"""
 
-    def __init__(self, db_path: str = "audit_logs.db"):
-        self.db_path = db_path
+    def __init__(self, db_path: str = None, archive: Optional[AuditArchive] = None):
+        self.db_path = db_path or settings.AUDIT_DB_PATH
+        self.db = SQLiteConnectionManager(self.db_path)
+        self.archive = archive or AuditArchive()
+        self.codec = PayloadCodec(self.db)
+        # Chunk texts are immutable per content hash, so caching is safe
+        self._chunk_text = lru_cache(maxsize=4096)(self._fetch_chunk_text)
+        self.rollups = AuditRollups()
+        self.search_enabled = False
         self._init_database()
 
     def _init_database(self):
         """Initialize SQLite database for audit logs"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id TEXT PRIMARY KEY,
-                timestamp TEXT NOT NULL,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                citations TEXT,
-                confidence_score REAL,
-                user_id TEXT,
-                llm_prompt TEXT,
-                llm_response TEXT,
-                retrieved_sources TEXT,
-                document_versions TEXT,
-                reasoning_steps TEXT,
-                manual_review_recommended INTEGER
+        with self.db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_logs (
+                    id TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    citations TEXT,
+                    confidence_score REAL,
+                    user_id TEXT,
+                    llm_prompt TEXT,
+                    llm_response TEXT,
+                    retrieved_sources TEXT,
+                    document_versions TEXT,
+                    reasoning_steps TEXT,
+                    manual_review_recommended INTEGER,
+                    trace TEXT
+                )
+            """)
+            
+            # Create index for faster queries
+            # (timestamp, id) is the keyset used for paging
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_timestamp_id 
+                ON audit_logs(timestamp, id)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_confidence 
+                ON audit_logs(confidence_score)
+            """)
+            
+            # One row per retrieved chunk, so source filters use an index
+            # instead of scanning the JSON in retrieved_sources
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_log_sources (
+                    log_id TEXT NOT NULL,
+                    document_id TEXT,
+                    chunk_id TEXT,
+                    score REAL
+                )
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sources_document 
+                ON audit_log_sources(document_id, log_id)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sources_chunk 
+                ON audit_log_sources(chunk_id, log_id)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sources_log 
+                ON audit_log_sources(log_id)
+            """)
+            
+            # Retrieved chunk texts, stored once per distinct content
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_chunk_texts (
+                    content_hash TEXT PRIMARY KEY,
+                    chunk_id TEXT,
+                    content BLOB NOT NULL
+                ) WITHOUT ROWID
+            """)
+            
+            PayloadCodec.create_tables(conn)
+            
+            # Full-text index over questions and answers, using audit_logs
+            # as external content so the text isn't stored twice. Rowids of
+            # audit_logs can change on VACUUM, so run rebuild_search_index
+            # after vacuuming.
+            try:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS audit_logs_fts USING fts5(
+                        question,
+                        answer,
+                        content='audit_logs',
+                        content_rowid='rowid',
+                        tokenize='porter unicode61'
+                    )
+                """)
+                self.search_enabled = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5
+                self.search_enabled = False
+            
+            AuditRollups.create_tables(conn)
+            
+            self.codec.load()
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Bring data written by older versions up to date (tracked in user_version)"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        if version < 1:
+            # Index the sources of logs written before audit_log_sources existed
+            rows = conn.execute("""
+                SELECT id, retrieved_sources FROM audit_logs
+                WHERE id NOT IN (SELECT log_id FROM audit_log_sources)
+            """).fetchall()
+            conn.executemany(
+                "INSERT INTO audit_log_sources (log_id, document_id, chunk_id, score) VALUES (?, ?, ?, ?)",
+                [
+                    source_row
+                    for row in rows
+                    for source_row in self._source_rows(
+                        row["id"], serialization.loads(row["retrieved_sources"] or "[]")
+                    )
+                ]
             )
-        """)
         
-        # Create index for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON audit_logs(timestamp)
-        """)
+        if version < 2:
+            # Superseded by idx_timestamp_id
+            conn.execute("DROP INDEX IF EXISTS idx_timestamp")
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_confidence 
-            ON audit_logs(confidence_score)
-        """)
+        if version < 3 and self.search_enabled:
+            # Index logs written before audit_logs_fts existed
+            conn.execute("INSERT INTO audit_logs_fts(audit_logs_fts) VALUES ('rebuild')")
         
-        conn.commit()
-        conn.close()
+        if version < 4:
+            # Roll up logs written before the rollup tables existed
+            rows = conn.execute(
+                "SELECT timestamp, confidence_score, manual_review_recommended, citations FROM audit_logs"
+            )
+            while True:
+                batch = rows.fetchmany(1000)
+                if not batch:
+                    break
+                self.rollups.apply(conn, [
+                    {
+                        "timestamp": row["timestamp"],
+                        "confidence_score": row["confidence_score"],
+                        "manual_review_recommended": row["manual_review_recommended"],
+                        "citations": serialization.loads(self.codec.decode(row["citations"]) or "[]"),
+                    }
+                    for row in batch
+                ])
+        
+        if version < 5:
+            # Request traces (the column is already there in new databases)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(audit_logs)")}
+            if "trace" not in columns:
+                conn.execute("ALTER TABLE audit_logs ADD COLUMN trace TEXT")
+        
+        conn.execute("PRAGMA user_version = 5")
 
     def log_interaction(
         self,
@@ -66,10 +210,11 @@ class AuditLogger:
         document_versions: Optional[Dict[str, str]] = None,
         reasoning_steps: Optional[List[str]] = None,
         manual_review_recommended: bool = False,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        trace: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        Log an interaction
+        Log an interaction synchronously
         
         Args:
             question: User question
@@ -83,44 +228,177 @@ class AuditLogger:
             reasoning_steps: Steps in reasoning process
             manual_review_recommended: Whether manual review is needed
             user_id: Optional user identifier
+            trace: Optional request trace (stage timeline)
             
         Returns:
             Log entry ID
         """
-        import uuid
-        log_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO audit_logs (
-                id, timestamp, question, answer, citations,
-                confidence_score, user_id, llm_prompt, llm_response,
-                retrieved_sources, document_versions, reasoning_steps,
-                manual_review_recommended
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            log_id,
-            timestamp,
-            question,
-            answer,
-            json.dumps(citations),
-            confidence_score,
-            user_id,
-            llm_prompt,
-            llm_response,
-            json.dumps(retrieved_sources or []),
-            json.dumps(document_versions or {}),
-            json.dumps(reasoning_steps or []),
-            1 if manual_review_recommended else 0
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        return log_id
+        record = self.build_record(
+            question=question,
+            answer=answer,
+            citations=citations,
+            confidence_score=confidence_score,
+            llm_prompt=llm_prompt,
+            llm_response=llm_response,
+            retrieved_sources=retrieved_sources,
+            document_versions=document_versions,
+            reasoning_steps=reasoning_steps,
+            manual_review_recommended=manual_review_recommended,
+            user_id=user_id,
+            trace=trace
+        )
+        self.write_records([record])
+        
+        return record["id"]
+
+    def build_record(
+        self,
+        question: str,
+        answer: str,
+        citations: List[Dict[str, Any]],
+        confidence_score: float,
+        llm_prompt: Optional[str] = None,
+        llm_response: Optional[str] = None,
+        retrieved_sources: Optional[List[Dict[str, Any]]] = None,
+        document_versions: Optional[Dict[str, str]] = None,
+        reasoning_steps: Optional[List[str]] = None,
+        manual_review_recommended: bool = False,
+        user_id: Optional[str] = None,
+        trace: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build a log record with its ID and timestamp assigned
+        
+        Arguments are the same as log_interaction. The record can be written
+        later with write_records, e.g. by the batched AuditWriter.
+        
+        Returns:
+            Record dictionary keyed by audit_logs column
+        """
+        return {
+            "id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "question": question,
+            "answer": answer,
+            "citations": citations,
+            "confidence_score": confidence_score,
+            "user_id": user_id,
+            "llm_prompt": llm_prompt,
+            "llm_response": llm_response,
+            "retrieved_sources": retrieved_sources or [],
+            "document_versions": document_versions or {},
+            "reasoning_steps": reasoning_steps or [],
+            "manual_review_recommended": manual_review_recommended,
+            "trace": trace,
+        }
+
+    def write_records(self, records: List[Dict[str, Any]]):
+        """
+        Write records in a single transaction
+        
+        Args:
+            records: Records built by build_record
+        """
+        if not records:
+            return
+        
+        self.codec.train_if_ready()
+        
+        chunk_texts: Dict[str, tuple] = {}
+        rows = [self._encode_record(record, chunk_texts) for record in records]
+        
+        with metrics.track(metrics.AUDIT_WRITE_SECONDS.labels(), requests=metrics.AUDIT_WRITES):
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO audit_chunk_texts (content_hash, chunk_id, content) VALUES (?, ?, ?)",
+                    [
+                        (content_hash, chunk_id, self.codec.encode(text))
+                        for content_hash, (chunk_id, text) in chunk_texts.items()
+                    ]
+                )
+            
+                conn.executemany("""
+                    INSERT INTO audit_logs (
+                        id, timestamp, question, answer, citations,
+                        confidence_score, user_id, llm_prompt, llm_response,
+                        retrieved_sources, document_versions, reasoning_steps,
+                        manual_review_recommended, trace
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+            
+                if self.search_enabled:
+                    conn.executemany(
+                        "INSERT INTO audit_logs_fts (rowid, question, answer) "
+                        "SELECT rowid, question, answer FROM audit_logs WHERE id = ?",
+                        [(record["id"],) for record in records]
+                    )
+            
+                self.rollups.apply(conn, records)
+            
+                conn.executemany(
+                    "INSERT INTO audit_log_sources (log_id, document_id, chunk_id, score) VALUES (?, ?, ?, ?)",
+                    [
+                        source_row
+                        for record in records
+                        for source_row in self._source_rows(record["id"], record["retrieved_sources"])
+                    ]
+                )
+        metrics.AUDIT_RECORDS_WRITTEN.inc(len(records))
+
+    def _encode_record(self, record: Dict[str, Any], chunk_texts: Dict[str, tuple]) -> tuple:
+        """
+        Build the audit_logs row for a record
+        
+        Chunk texts are replaced by references to audit_chunk_texts (collected
+        into chunk_texts) and payload columns are compressed.
+        """
+        prompt = record["llm_prompt"]
+        sources = []
+        
+        for source in record["retrieved_sources"]:
+            text = source.get("text")
+            if isinstance(text, str) and len(text) >= CHUNK_REF_MIN_CHARS:
+                content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                chunk_texts.setdefault(content_hash, (source.get("chunk_id"), text))
+                source = {key: value for key, value in source.items() if key != "text"}
+                source["text_ref"] = content_hash
+                if prompt:
+                    prompt = prompt.replace(text, CHUNK_REF.format(content_hash))
+            sources.append(source)
+        
+        return (
+            record["id"],
+            record["timestamp"],
+            record["question"],
+            record["answer"],
+            self.codec.encode(serialization.dumps(record["citations"])),
+            record["confidence_score"],
+            record["user_id"],
+            self.codec.encode(prompt),
+            self.codec.encode(record["llm_response"]),
+            self.codec.encode(serialization.dumps(sources)),
+            serialization.dumps(record["document_versions"]),
+            serialization.dumps(record["reasoning_steps"]),
+            1 if record["manual_review_recommended"] else 0,
+            self.codec.encode(serialization.dumps(record["trace"])) if record.get("trace") else None
+        )
+
+    @staticmethod
+    def _source_rows(log_id: str, sources: List[Dict[str, Any]]) -> List[tuple]:
+        """Build audit_log_sources rows for a log's retrieved sources"""
+        rows = []
+        seen = set()
+        
+        for source in sources:
+            key = (source.get("document_id"), source.get("chunk_id"))
+            if key in seen or key == (None, None):
+                continue
+            seen.add(key)
+            
+            score = source.get("combined_score", source.get("similarity", source.get("score")))
+            rows.append((log_id, key[0], key[1], score))
+        
+        return rows
 
     def get_logs(
         self,
@@ -128,83 +406,511 @@ class AuditLogger:
         end_date: Optional[datetime] = None,
         min_confidence: Optional[float] = None,
         document_id: Optional[str] = None,
-        limit: int = 100
+        chunk_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        Retrieve audit logs with filters
+        Retrieve audit logs with filters, newest first
         
         Args:
             start_date: Start date filter
             end_date: End date filter
             min_confidence: Minimum confidence score
-            document_id: Filter by document ID
+            document_id: Only logs that retrieved this document
+            chunk_id: Only logs that retrieved this chunk
             limit: Maximum number of results
+            cursor: Return logs after this position (from encode_cursor)
             
         Returns:
             List of audit log entries
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        where, params = self._build_filters(
+            start_date, end_date, min_confidence, document_id, chunk_id
+        )
+        
+        if cursor:
+            where += " AND (timestamp, id) < (?, ?)"
+            params.extend(self.decode_cursor(cursor))
+        
+        query = f"SELECT * FROM audit_logs WHERE {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        
+        rows = self.db.connection().execute(query, params).fetchall()
+        logs = [self._row_to_log(row) for row in rows]
+        
+        # Archived days are older than every hot row, so the archive can only
+        # contribute once the hot tier runs out: a short page (which includes a
+        # cursor past the hot tier's oldest row)
+        if len(logs) >= limit or not self._has_archive():
+            return logs
+        
+        archived = self._search_archive(
+            start_date, end_date, min_confidence, document_id, chunk_id,
+            limit=limit,
+            cursor=self.decode_cursor(cursor) if cursor else None
+        )
+        
+        # A log can be in both tiers if an archive run was interrupted
+        hot_ids = {log["id"] for log in logs}
+        logs.extend(log for log in archived if log["id"] not in hot_ids)
+        logs.sort(key=lambda log: (log["timestamp"], log["id"]), reverse=True)
+        
+        return logs[:limit]
+
+    def iter_logs(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        min_confidence: Optional[float] = None,
+        document_id: Optional[str] = None,
+        chunk_id: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream every matching log, oldest first, in batches
+        
+        Archived partitions are read first, one at a time, then hot rows are
+        fetched incrementally from a single read transaction on a dedicated
+        connection, so memory use doesn't grow with the number of rows.
+        Hot rows left behind by an interrupted archive run are skipped, so
+        every log is yielded once (only the IDs of those days are held).
+        
+        Args:
+            start_date: Start date filter
+            end_date: End date filter
+            min_confidence: Minimum confidence score
+            document_id: Only logs that retrieved this document
+            chunk_id: Only logs that retrieved this chunk
+            batch_size: Rows fetched per batch
+            
+        Yields:
+            Lists of audit log entries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        where, params = self._build_filters(
+            start_date, end_date, min_confidence, document_id, chunk_id
+        )
+        
+        archived_ids = set()
+        if self._has_archive():
+            keys = self.archive.partitions(start_date, end_date)
+            # Archived days that still have hot rows (an interrupted archive run)
+            leftover_days = {
+                row[0] for row in self.db.connection().execute(
+                    "SELECT DISTINCT substr(timestamp, 1, 10) FROM audit_logs WHERE timestamp < ?",
+                    ((datetime.fromisoformat(keys[-1]) + timedelta(days=1)).date().isoformat(),)
+                )
+            } if keys else set()
+            
+            for key in keys:
+                batch = []
+                for log in self._iter_archive_partition(
+                    key, start_date, end_date, min_confidence, document_id, chunk_id
+                ):
+                    if key in leftover_days:
+                        archived_ids.add(log["id"])
+                    batch.append(log)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+        
+        with self.db.dedicated_connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM audit_logs WHERE {where} ORDER BY timestamp, id", params
+            )
+            while True:
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                logs = [self._row_to_log(row) for row in batch if row["id"] not in archived_ids]
+                if logs:
+                    yield logs
+
+    @staticmethod
+    def encode_cursor(log: Dict[str, Any]) -> str:
+        """Opaque paging cursor pointing just past a log entry"""
+        timestamp = log["timestamp"]
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        raw = serialization.dumps([timestamp, log["id"]]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        """Decode a cursor from encode_cursor into (timestamp, id)"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            timestamp, log_id = serialization.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        
+        if not isinstance(timestamp, str) or not isinstance(log_id, str):
+            raise ValueError("Invalid cursor")
         
-        query = "SELECT * FROM audit_logs WHERE 1=1"
+        return timestamp, log_id
+
+    def _build_filters(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        min_confidence: Optional[float],
+        document_id: Optional[str],
+        chunk_id: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause and parameters shared by log queries"""
+        where = "1=1"
         params = []
         
         if start_date:
-            query += " AND timestamp >= ?"
+            where += " AND timestamp >= ?"
             params.append(start_date.isoformat())
         
         if end_date:
-            query += " AND timestamp <= ?"
+            where += " AND timestamp <= ?"
             params.append(end_date.isoformat())
         
         if min_confidence is not None:
-            query += " AND confidence_score >= ?"
+            where += " AND confidence_score >= ?"
             params.append(min_confidence)
         
         if document_id:
-            query += " AND retrieved_sources LIKE ?"
-            params.append(f"%{document_id}%")
-        
-        query += " ORDER BY timestamp DESC LIMIT ?"
-        params.append(limit)
+            where += " AND id IN (SELECT log_id FROM audit_log_sources WHERE document_id = ?)"
+            params.append(document_id)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        if chunk_id:
+            where += " AND id IN (SELECT log_id FROM audit_log_sources WHERE chunk_id = ?)"
+            params.append(chunk_id)
         
-        logs = []
-        for row in rows:
-            log = dict(row)
-            # Parse JSON fields
-            log["citations"] = json.loads(log.get("citations", "[]"))
-            log["retrieved_sources"] = json.loads(log.get("retrieved_sources", "[]"))
-            log["document_versions"] = json.loads(log.get("document_versions", "{}"))
-            log["reasoning_steps"] = json.loads(log.get("reasoning_steps", "[]"))
-            log["manual_review_recommended"] = bool(log.get("manual_review_recommended", 0))
-            logs.append(log)
-        
-        conn.close()
-        return logs
+        return where, params
 
     def get_log_by_id(self, log_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific log entry by ID"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM audit_logs WHERE id = ?", (log_id,))
-        row = cursor.fetchone()
-        
-        conn.close()
+        row = self.db.connection().execute(
+            "SELECT * FROM audit_logs WHERE id = ?", (log_id,)
+        ).fetchone()
         
         if row:
-            log = dict(row)
-            # Parse JSON fields
-            log["citations"] = json.loads(log.get("citations", "[]"))
-            log["retrieved_sources"] = json.loads(log.get("retrieved_sources", "[]"))
-            log["document_versions"] = json.loads(log.get("document_versions", "{}"))
-            log["reasoning_steps"] = json.loads(log.get("reasoning_steps", "[]"))
-            log["manual_review_recommended"] = bool(log.get("manual_review_recommended", 0))
-            return log
+            return self._row_to_log(row)
+        
+        if self._has_archive():
+            for key in self.archive.partitions(descending=True):
+                for archived in self.archive.iter_partition(key, filters=[("id", "=", log_id)]):
+                    return self._archived_to_log(archived)
         
         return None
+
+    def search_logs(
+        self,
+        query: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Full-text search over questions and answers, best match first
+        
+        The query uses FTS5 syntax (e.g. "data residency" for a phrase,
+        OR/NOT, prefix*). If it doesn't parse, its words are matched as
+        plain terms instead. Only the hot tier is indexed; archived logs
+        aren't searched.
+        
+        Args:
+            query: Search query
+            start_date: Start date filter
+            end_date: End date filter
+            limit: Maximum number of results
+            offset: Number of results to skip
+            
+        Returns:
+            Dictionary with the total match count and the requested page,
+            each result carrying a highlighted answer snippet and its score
+            
+        Raises:
+            RuntimeError: If SQLite lacks FTS5
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Full-text search requires SQLite with FTS5")
+        
+        try:
+            return self._search(query, start_date, end_date, limit, offset)
+        except sqlite3.OperationalError as e:
+            if not self._is_query_syntax_error(e, query):
+                raise
+            terms = " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+            if not terms:
+                return {"total": 0, "results": []}
+            return self._search(terms, start_date, end_date, limit, offset)
+
+    @staticmethod
+    def _is_query_syntax_error(error: sqlite3.OperationalError, query: str) -> bool:
+        """Whether an FTS5 error was caused by the query text rather than the database"""
+        message = str(error)
+        if message.startswith("fts5: syntax error") or message == "unterminated string":
+            return True
+        # "-term" and "name:term" read as column filters on unknown columns
+        column = re.fullmatch(r"no such column: (\w+)", message)
+        return column is not None and column.group(1) in re.findall(r"\w+", query)
+
+    def get_stats(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        granularity: str = "day",
+        top_documents: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Question counts, confidence and manual-review rates from the rollups
+        
+        Args:
+            start_date: Start date filter (aligned to the bucket)
+            end_date: End date filter (aligned to the bucket)
+            granularity: "hour" or "day" time series
+            top_documents: Number of most-cited documents
+            
+        Returns:
+            Totals, time series, confidence distribution and top documents
+        """
+        return self.rollups.stats(
+            self.db.connection(), start_date, end_date, granularity, top_documents
+        )
+
+    def rebuild_search_index(self):
+        """Rebuild the full-text index from audit_logs (e.g. after VACUUM)"""
+        if self.search_enabled:
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO audit_logs_fts(audit_logs_fts) VALUES ('rebuild')")
+
+    def _search(
+        self,
+        match: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        limit: int,
+        offset: int
+    ) -> Dict[str, Any]:
+        """Run a full-text query"""
+        where = "audit_logs_fts MATCH ?"
+        params: List[Any] = [match]
+        
+        if start_date:
+            where += " AND l.timestamp >= ?"
+            params.append(start_date.isoformat())
+        
+        if end_date:
+            where += " AND l.timestamp <= ?"
+            params.append(end_date.isoformat())
+        
+        conn = self.db.connection()
+        total = conn.execute(f"""
+            SELECT COUNT(*) FROM audit_logs_fts
+            JOIN audit_logs l ON l.rowid = audit_logs_fts.rowid
+            WHERE {where}
+        """, params).fetchone()[0]
+        
+        # Matches in the question weigh twice as much as in the answer
+        rows = conn.execute(f"""
+            SELECT
+                l.id, l.timestamp, l.question, l.confidence_score,
+                l.manual_review_recommended,
+                snippet(audit_logs_fts, 1, '[', ']', '...', 16) AS answer_snippet,
+                bm25(audit_logs_fts, 2.0, 1.0) AS rank
+            FROM audit_logs_fts
+            JOIN audit_logs l ON l.rowid = audit_logs_fts.rowid
+            WHERE {where}
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset]).fetchall()
+        
+        return {
+            "total": total,
+            "results": [
+                {
+                    "id": row["id"],
+                    "timestamp": row["timestamp"],
+                    "question": row["question"],
+                    "answer_snippet": row["answer_snippet"],
+                    "confidence_score": row["confidence_score"],
+                    "manual_review_recommended": bool(row["manual_review_recommended"]),
+                    # bm25 is lower-is-better; expose higher-is-better
+                    "score": -row["rank"],
+                }
+                for row in rows
+            ]
+        }
+
+    def delete_logs(self, log_ids: List[str], batch_size: int = 500):
+        """
+        Delete logs and their index entries from the hot table
+        
+        Args:
+            log_ids: IDs of logs to delete
+            batch_size: IDs deleted per statement
+        """
+        with self.db.transaction() as conn:
+            for start in range(0, len(log_ids), batch_size):
+                batch = log_ids[start:start + batch_size]
+                placeholders = ", ".join("?" * len(batch))
+                conn.execute(f"DELETE FROM audit_log_sources WHERE log_id IN ({placeholders})", batch)
+                if self.search_enabled:
+                    conn.execute(
+                        "INSERT INTO audit_logs_fts (audit_logs_fts, rowid, question, answer) "
+                        f"SELECT 'delete', rowid, question, answer FROM audit_logs WHERE id IN ({placeholders})",
+                        batch
+                    )
+                conn.execute(f"DELETE FROM audit_logs WHERE id IN ({placeholders})", batch)
+
+    def existing_ids(self, log_ids: List[str], batch_size: int = 500) -> Set[str]:
+        """IDs among log_ids that are already in the hot table"""
+        found: Set[str] = set()
+        conn = self.db.connection()
+        for start in range(0, len(log_ids), batch_size):
+            batch = log_ids[start:start + batch_size]
+            rows = conn.execute(
+                f"SELECT id FROM audit_logs WHERE id IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def _has_archive(self) -> bool:
+        """Whether any logs have been archived"""
+        return self.archive.available and bool(self.archive.manifest()["partitions"])
+
+    def _search_archive(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        min_confidence: Optional[float],
+        document_id: Optional[str],
+        chunk_id: Optional[str],
+        limit: int,
+        cursor: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest archived logs matching the filters
+        
+        Partitions outside the date range (or newer than the cursor) are
+        never opened, and older partitions are only read until the limit is
+        reached.
+        """
+        if cursor:
+            cursor_end = datetime.fromisoformat(cursor[0])
+            if not end_date or cursor_end < end_date:
+                end_date = cursor_end
+        
+        logs = []
+        for key in self.archive.partitions(start_date, end_date, descending=True):
+            partition_logs = [
+                log for log in self._iter_archive_partition(
+                    key, start_date, end_date, min_confidence, document_id, chunk_id
+                )
+                if not cursor or (log["timestamp"], log["id"]) < cursor
+            ]
+            partition_logs.sort(key=lambda log: (log["timestamp"], log["id"]), reverse=True)
+            logs.extend(partition_logs)
+            
+            # Partitions are disjoint days, so older ones can't outrank these
+            if len(logs) >= limit:
+                break
+        
+        return logs[:limit]
+
+    def _iter_archive_partition(
+        self,
+        key: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        min_confidence: Optional[float],
+        document_id: Optional[str],
+        chunk_id: Optional[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """Read one archived partition with the log filters applied"""
+        filters = []
+        if start_date:
+            filters.append(("timestamp", ">=", start_date.isoformat()))
+        if end_date:
+            filters.append(("timestamp", "<=", end_date.isoformat()))
+        if min_confidence is not None:
+            filters.append(("confidence_score", ">=", min_confidence))
+        
+        for row in self.archive.iter_partition(key, filters=filters):
+            if document_id and document_id not in row["source_document_ids"]:
+                continue
+            if chunk_id and chunk_id not in row["source_chunk_ids"]:
+                continue
+            yield self._archived_to_log(row)
+
+    def _archived_to_log(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert an archived row into a log entry"""
+        row.pop("source_document_ids", None)
+        row.pop("source_chunk_ids", None)
+        return self._row_to_log(row)
+
+    def close(self):
+        """Close all database connections"""
+        self.db.close_all()
+
+    def expand_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """
+        Decode a stored row back into plain audit_logs column values
+        
+        Payloads are decompressed and chunk references resolved, with JSON
+        columns left as text (as written before compression existed).
+        """
+        log = self._row_to_log(row)
+        for column in ("citations", "retrieved_sources", "document_versions", "reasoning_steps"):
+            log[column] = serialization.dumps(log[column])
+        log["manual_review_recommended"] = 1 if log["manual_review_recommended"] else 0
+        if log["trace"] is not None:
+            log["trace"] = serialization.dumps(log["trace"])
+        return log
+
+    def _row_to_log(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a database row into a log entry"""
+        log = dict(row)
+        for column in PAYLOAD_COLUMNS:
+            log[column] = self.codec.decode(log.get(column))
+        
+        # Parse JSON fields
+        log["citations"] = serialization.loads(log.get("citations") or "[]")
+        log["retrieved_sources"] = serialization.loads(log.get("retrieved_sources") or "[]")
+        log["document_versions"] = serialization.loads(log.get("document_versions") or "{}")
+        log["reasoning_steps"] = serialization.loads(log.get("reasoning_steps") or "[]")
+        log["manual_review_recommended"] = bool(log.get("manual_review_recommended", 0))
+        log["trace"] = serialization.loads(log["trace"]) if log.get("trace") else None
+        
+        # Resolve chunk text references
+        for source in log["retrieved_sources"]:
+            if isinstance(source, dict) and "text_ref" in source:
+                source["text"] = self._chunk_text(source.pop("text_ref"))
+        if log.get("llm_prompt"):
+            log["llm_prompt"] = CHUNK_REF_PATTERN.sub(
+                lambda match: self._chunk_text(match.group(1)), log["llm_prompt"]
+            )
+        
+        return log
+
+    def _fetch_chunk_text(self, content_hash: str) -> str:
+        """Load a referenced chunk text, or a placeholder if it is missing"""
+        row = self.db.connection().execute(
+            "SELECT content FROM audit_chunk_texts WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        
+        if row is None:
+            # The log references text that isn't stored: make the gap visible
+            logger.warning("Audit chunk text %s is missing from audit_chunk_texts", content_hash)
+            metrics.AUDIT_MISSING_CHUNK_TEXTS.inc()
+            return f"[missing audit chunk text {content_hash}]"
+        
+        return self.codec.decode(row["content"])
+
+
+@lru_cache(maxsize=None)
+def get_audit_logger() -> AuditLogger:
+    """Process-wide audit logger shared by all routes"""
+    return AuditLogger()
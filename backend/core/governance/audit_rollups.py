@@ -0,0 +1,237 @@
+"""
+Incrementally maintained audit analytics rollups
+"""
+
+from typing import Dict, Any, Iterable, List, Optional
+from collections import defaultdict
+from datetime import datetime
+import sqlite3
+
+
+CONFIDENCE_BUCKETS = 10
+
+# Rollup tables keyed by time bucket; the key is a prefix of the ISO timestamp
+TIME_ROLLUPS = {
+    "hour": ("audit_rollup_hourly", 13),  # YYYY-MM-DDTHH
+    "day": ("audit_rollup_daily", 10),    # YYYY-MM-DD
+}
+
+
+class AuditRollups:
+    """
+    Per-hour/day counts, per-document citation counts and confidence
+    histograms, updated in the same transaction as each batch of logs
+
+    Rollups cover every log ever written: archiving or purging logs from
+    the hot table doesn't change them.
+    """
+
+    @staticmethod
+    def create_tables(conn: sqlite3.Connection):
+        """Create the rollup tables"""
+        for table, _ in TIME_ROLLUPS.values():
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT PRIMARY KEY,
+                    questions INTEGER NOT NULL,
+                    confidence_sum REAL NOT NULL,
+                    confidence_count INTEGER NOT NULL,
+                    manual_reviews INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_rollup_documents (
+                day TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                citations INTEGER NOT NULL,
+                PRIMARY KEY (day, document_id)
+            ) WITHOUT ROWID
+        """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_rollup_confidence (
+                day TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                questions INTEGER NOT NULL,
+                PRIMARY KEY (day, bucket)
+            ) WITHOUT ROWID
+        """)
+
+    def apply(self, conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]):
+        """
+        Add a batch of log records to the rollups
+
+        Args:
+            conn: Connection with the write transaction open
+            records: Records as built by AuditLogger.build_record
+        """
+        time_totals = {granularity: defaultdict(lambda: [0, 0.0, 0, 0]) for granularity in TIME_ROLLUPS}
+        document_counts = defaultdict(int)
+        confidence_counts = defaultdict(int)
+
+        for record in records:
+            timestamp = record["timestamp"]
+            score = record["confidence_score"]
+            day = timestamp[:10]
+
+            for granularity, (_, width) in TIME_ROLLUPS.items():
+                totals = time_totals[granularity][timestamp[:width]]
+                totals[0] += 1
+                if score is not None:
+                    totals[1] += score
+                    totals[2] += 1
+                if record["manual_review_recommended"]:
+                    totals[3] += 1
+
+            # Count each document once per answer
+            for document_id in {
+                citation.get("document_id") for citation in record["citations"]
+                if citation.get("document_id")
+            }:
+                document_counts[(day, document_id)] += 1
+
+            if score is not None:
+                confidence_counts[(day, self.confidence_bucket(score))] += 1
+
+        for granularity, (table, _) in TIME_ROLLUPS.items():
+            conn.executemany(f"""
+                INSERT INTO {table} (bucket, questions, confidence_sum, confidence_count, manual_reviews)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (bucket) DO UPDATE SET
+                    questions = questions + excluded.questions,
+                    confidence_sum = confidence_sum + excluded.confidence_sum,
+                    confidence_count = confidence_count + excluded.confidence_count,
+                    manual_reviews = manual_reviews + excluded.manual_reviews
+            """, [(bucket, *totals) for bucket, totals in time_totals[granularity].items()])
+
+        conn.executemany("""
+            INSERT INTO audit_rollup_documents (day, document_id, citations)
+            VALUES (?, ?, ?)
+            ON CONFLICT (day, document_id) DO UPDATE SET
+                citations = citations + excluded.citations
+        """, [(day, document_id, count) for (day, document_id), count in document_counts.items()])
+
+        conn.executemany("""
+            INSERT INTO audit_rollup_confidence (day, bucket, questions)
+            VALUES (?, ?, ?)
+            ON CONFLICT (day, bucket) DO UPDATE SET
+                questions = questions + excluded.questions
+        """, [(day, bucket, count) for (day, bucket), count in confidence_counts.items()])
+
+    def stats(
+        self,
+        conn: sqlite3.Connection,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        granularity: str = "day",
+        top_documents: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Aggregate the rollups over a date range
+
+        Reads one row per time bucket (and per document/confidence bucket
+        per day), never the logs themselves. Ranges are aligned to whole
+        buckets.
+
+        Args:
+            conn: Database connection
+            start_date: First bucket to include
+            end_date: Last bucket to include
+            granularity: "hour" or "day" for the time series
+            top_documents: Number of most-cited documents to return
+
+        Returns:
+            Totals, time series, confidence histogram and top documents
+        """
+        table, width = TIME_ROLLUPS[granularity]
+        day_where, day_params = self._range(start_date, end_date, "day", 10)
+
+        where, params = self._range(start_date, end_date, "bucket", width)
+        series = [
+            self._summary(row, bucket=row["bucket"])
+            for row in conn.execute(
+                f"SELECT * FROM {table} WHERE {where} ORDER BY bucket", params
+            )
+        ]
+
+        # Same buckets as the series, so the totals always equal its sum
+        totals_row = conn.execute(f"""
+            SELECT
+                COALESCE(SUM(questions), 0) AS questions,
+                COALESCE(SUM(confidence_sum), 0) AS confidence_sum,
+                COALESCE(SUM(confidence_count), 0) AS confidence_count,
+                COALESCE(SUM(manual_reviews), 0) AS manual_reviews
+            FROM {table}
+            WHERE {where}
+        """, params).fetchone()
+
+        histogram = {
+            row["bucket"]: row["questions"]
+            for row in conn.execute(f"""
+                SELECT bucket, SUM(questions) AS questions FROM audit_rollup_confidence
+                WHERE {day_where} GROUP BY bucket
+            """, day_params)
+        }
+
+        documents = conn.execute(f"""
+            SELECT document_id, SUM(citations) AS citations FROM audit_rollup_documents
+            WHERE {day_where}
+            GROUP BY document_id
+            ORDER BY citations DESC, document_id
+            LIMIT ?
+        """, day_params + [top_documents]).fetchall()
+
+        return {
+            "granularity": granularity,
+            "totals": self._summary(totals_row),
+            "series": series,
+            "confidence_distribution": [
+                {
+                    "min_score": bucket / CONFIDENCE_BUCKETS,
+                    "max_score": (bucket + 1) / CONFIDENCE_BUCKETS,
+                    "questions": histogram.get(bucket, 0),
+                }
+                for bucket in range(CONFIDENCE_BUCKETS)
+            ],
+            "top_documents": [
+                {"document_id": row["document_id"], "citations": row["citations"]}
+                for row in documents
+            ],
+        }
+
+    @staticmethod
+    def confidence_bucket(score: float) -> int:
+        """Histogram bucket (0-9) for a confidence score"""
+        return min(max(int(score * CONFIDENCE_BUCKETS), 0), CONFIDENCE_BUCKETS - 1)
+
+    @staticmethod
+    def _range(
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        column: str,
+        width: int
+    ) -> tuple:
+        """WHERE clause selecting the buckets that overlap a date range"""
+        where = "1=1"
+        params: List[Any] = []
+        if start_date:
+            where += f" AND {column} >= ?"
+            params.append(start_date.isoformat()[:width])
+        if end_date:
+            where += f" AND {column} <= ?"
+            params.append(end_date.isoformat()[:width])
+        return where, params
+
+    @staticmethod
+    def _summary(row: sqlite3.Row, **extra) -> Dict[str, Any]:
+        """Turn summed counters into rates"""
+        questions = row["questions"]
+        return {
+            **extra,
+            "questions": questions,
+            "average_confidence": (
+                row["confidence_sum"] / row["confidence_count"] if row["confidence_count"] else None
+            ),
+            "manual_review_rate": row["manual_reviews"] / questions if questions else None,
+        }
@@ -0,0 +1,359 @@
+"""
+Asynchronous, batched audit log writer
+"""
+
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import json
+import logging
+import os
+import time
+from core.config import settings
+from core.governance.audit_logger import AuditLogger, get_audit_logger
+from core.observability import metrics
+
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("batch", "record")
+
+
+class AuditBackpressureError(Exception):
+    """Raised when the audit queue stays full for longer than the enqueue timeout"""
+
+
+class AuditUnavailableError(Exception):
+    """Raised when records can be neither written nor spilled to the dead-letter file"""
+
+
+class AuditWriter:
+    """
+    Queues audit records and writes them in batched transactions
+
+    Requests only pay for an in-memory enqueue; a background task drains the
+    queue, committing up to batch_size records per transaction or whatever
+    arrived within flush_interval. Writes happen on a dedicated thread whose
+    connection runs with synchronous=FULL, so each commit is fsynced:
+
+    - durability "batch": one transaction (and fsync) per batch
+    - durability "record": one transaction (and fsync) per record
+
+    The queue is bounded: when it is full, callers wait (backpressure) and
+    get AuditBackpressureError after enqueue_timeout. stop() flushes
+    everything still queued.
+
+    Records that still fail after max_write_attempts are appended (and
+    fsynced) to a dead-letter file, which is replayed into the database on
+    start() and once writes succeed again. Lines of that file that can't be
+    parsed (e.g. torn by a crash mid-append) are moved to a ".corrupt" file
+    next to it rather than blocking the replay. If even that fails, the records
+    are logged and later submits write synchronously, raising
+    AuditUnavailableError until a write succeeds, as the direct write did
+    before the writer existed.
+    """
+
+    def __init__(
+        self,
+        audit_logger: AuditLogger,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_queue_size: int = None,
+        durability: str = None,
+        enqueue_timeout: float = None,
+        max_write_attempts: int = 3,
+        dead_letter_path: str = None,
+        replay_interval: float = 30.0
+    ):
+        self.audit_logger = audit_logger
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        )
+        self.max_queue_size = max_queue_size or settings.AUDIT_QUEUE_MAX_SIZE
+        self.durability = durability or settings.AUDIT_DURABILITY
+        self.enqueue_timeout = enqueue_timeout or settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS
+        self.max_write_attempts = max_write_attempts
+        self.dead_letter_path = dead_letter_path or settings.AUDIT_DEAD_LETTER_PATH
+        self.replay_interval = replay_interval
+
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"AUDIT_DURABILITY must be one of {DURABILITY_MODES}")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = False
+        self._dead_letters = 0
+        self._next_replay = 0.0
+        self._unavailable: Optional[Exception] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background flush task is running"""
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the background flush task"""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-writer")
+        self._stopping = False
+        await self._in_writer_thread(self._configure_connection)
+        await self._replay()
+        self._task = asyncio.create_task(self._run())
+        metrics.AUDIT_QUEUE_DEPTH.set_function(lambda: self._queue.qsize() if self._queue else 0)
+        metrics.AUDIT_DEAD_LETTER_PENDING.set_function(lambda: self._dead_letters)
+
+    async def stop(self):
+        """Flush queued records and stop the background task"""
+        if not self.running:
+            return
+
+        self._stopping = True
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._task = None
+
+    async def log_interaction(self, **kwargs) -> str:
+        """
+        Queue an interaction for logging
+
+        Takes the same arguments as AuditLogger.log_interaction.
+
+        Returns:
+            Log entry ID (the entry is written within flush_interval)
+        """
+        record = self.audit_logger.build_record(**kwargs)
+        await self.submit(record)
+        return record["id"]
+
+    async def submit(self, record: Dict[str, Any]):
+        """
+        Queue a record built by AuditLogger.build_record
+
+        Falls back to a direct write when the writer isn't running, or
+        while records can't be stored (see the class docstring).
+
+        Raises:
+            AuditBackpressureError: If the queue stays full for enqueue_timeout
+            AuditUnavailableError: If the direct write after a storage
+                failure fails too
+        """
+        if not self.running or self._stopping:
+            await asyncio.to_thread(self.audit_logger.write_records, [record])
+            return
+        if self._unavailable is not None:
+            await self._write_through([record])
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.put(record), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise AuditBackpressureError(
+                f"Audit queue full ({self.max_queue_size} records pending)"
+            )
+
+    async def submit_many(self, records: List[Dict[str, Any]]):
+        """
+        Write records built by AuditLogger.build_record as one batch
+
+        Bypasses the queue: the records are written on the writer thread
+        (or directly when the writer isn't running) in one transaction, or
+        one per record with durability "record". Used for bulk callers
+        such as batch questions, which would otherwise fill the queue.
+        """
+        if not records:
+            return
+        if not self.running or self._stopping:
+            await asyncio.to_thread(self.audit_logger.write_records, records)
+            return
+        if self._unavailable is not None:
+            await self._write_through(records)
+            return
+        await self._write_batch(records)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and configuration"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "batch_size": self.batch_size,
+            "durability": self.durability,
+            "dead_letter_pending": self._dead_letters,
+            "unavailable": self._unavailable is not None,
+        }
+
+    async def _run(self):
+        """Collect batches from the queue and write them"""
+        while True:
+            batch = [await self._queue.get()]
+
+            # Fill the batch until it is full or the flush window closes
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._write_batch(batch)
+            except Exception:
+                # Keep flushing: stop() relies on this task draining the queue
+                logger.exception("Failed to write a batch of %d audit record(s)", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Write a batch, retrying transient database errors, then dead-lettering it"""
+        groups = [batch] if self.durability == "batch" else [[record] for record in batch]
+
+        written = False
+        for group in groups:
+            for attempt in range(1, self.max_write_attempts + 1):
+                try:
+                    await self._in_writer_thread(self.audit_logger.write_records, group)
+                    written = True
+                    break
+                except Exception as e:
+                    if attempt == self.max_write_attempts:
+                        await self._dead_letter(group, e)
+                    else:
+                        await asyncio.sleep(0.1 * 2 ** attempt)
+
+        # The database is taking writes again: catch up on dead letters
+        if written and self._dead_letters and time.monotonic() >= self._next_replay:
+            await self._replay()
+
+    async def _replay(self):
+        """Replay dead letters on the writer thread, logging instead of raising"""
+        try:
+            await self._in_writer_thread(self._replay_dead_letters)
+        except Exception:
+            self._next_replay = time.monotonic() + self.replay_interval
+            logger.exception("Failed to replay dead-lettered audit records from %s", self.dead_letter_path)
+
+    async def _write_through(self, records: List[Dict[str, Any]]):
+        """Write records directly, surfacing a failure to the caller"""
+        try:
+            await self._in_writer_thread(self.audit_logger.write_records, records)
+        except Exception as e:
+            metrics.AUDIT_DEAD_LETTER_RECORDS.labels("rejected").inc(len(records))
+            raise AuditUnavailableError(f"Audit log unavailable: {str(e)}") from e
+        self._unavailable = None
+        logger.info("Audit log writes recovered")
+
+    async def _dead_letter(self, records: List[Dict[str, Any]], error: Exception):
+        """Keep records that could not be written in the dead-letter file"""
+        ids = ", ".join(record["id"] for record in records)
+        try:
+            await self._in_writer_thread(self._spill, records)
+        except Exception:
+            self._unavailable = error
+            metrics.AUDIT_DEAD_LETTER_RECORDS.labels("lost").inc(len(records))
+            logger.exception("Failed to write or dead-letter %d audit record(s): %s", len(records), ids)
+            return
+
+        self._dead_letters += len(records)
+        self._next_replay = time.monotonic() + self.replay_interval
+        metrics.AUDIT_DEAD_LETTER_RECORDS.labels("spilled").inc(len(records))
+        logger.error(
+            "Failed to write %d audit record(s) (%s): %s; kept in %s for replay",
+            len(records), error, ids, self.dead_letter_path
+        )
+
+    def _spill(self, records: List[Dict[str, Any]]):
+        """Append records to the dead-letter file and fsync it (writer thread)"""
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_dead_letters(self):
+        """Write dead-lettered records to the database and remove the file (writer thread)"""
+        if not os.path.exists(self.dead_letter_path):
+            self._dead_letters = 0
+            return
+
+        records, corrupt = [], []
+        with open(self.dead_letter_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    corrupt.append(line)
+                    continue
+                if isinstance(record, dict) and "id" in record:
+                    records.append(record)
+                else:
+                    corrupt.append(line)
+
+        if corrupt:
+            self._quarantine(corrupt)
+            # Rewrite the file without them, so a failed replay doesn't quarantine them twice
+            tmp_path = self.dead_letter_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.dead_letter_path)
+
+        try:
+            # Records written by an attempt that failed after its commit are not written twice
+            stored = self.audit_logger.existing_ids([record["id"] for record in records])
+            self.audit_logger.write_records([record for record in records if record["id"] not in stored])
+        except Exception:
+            self._dead_letters = len(records)
+            self._next_replay = time.monotonic() + self.replay_interval
+            logger.exception("Failed to replay %d dead-lettered audit record(s)", len(records))
+            return
+
+        os.remove(self.dead_letter_path)
+        self._dead_letters = 0
+        metrics.AUDIT_DEAD_LETTER_RECORDS.labels("replayed").inc(len(records) - len(stored))
+        logger.info("Replayed %d dead-lettered audit record(s)", len(records) - len(stored))
+
+    def _quarantine(self, lines: List[str]):
+        """Move unparseable dead-letter lines aside, keeping them for inspection (writer thread)"""
+        path = self.dead_letter_path + ".corrupt"
+        with open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line if line.endswith("\n") else line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.AUDIT_DEAD_LETTER_RECORDS.labels("quarantined").inc(len(lines))
+        logger.error("Moved %d unparseable dead-letter line(s) to %s", len(lines), path)
+
+    def _configure_connection(self):
+        """Make every commit on the writer thread's connection fsync"""
+        self.audit_logger.db.connection().execute("PRAGMA synchronous=FULL")
+
+    async def _in_writer_thread(self, func, *args):
+        """Run a blocking call on the dedicated writer thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+
+@lru_cache(maxsize=None)
+def get_audit_writer() -> AuditWriter:
+    """Process-wide audit writer around the shared audit logger"""
+    return AuditWriter(get_audit_logger())
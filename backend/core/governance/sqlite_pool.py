@@ -0,0 +1,104 @@
+"""
+Shared SQLite connections for governance data
+"""
+
+from typing import Iterator, List
+from contextlib import contextmanager
+import sqlite3
+import threading
+from core.config import settings
+
+
+class SQLiteConnectionManager:
+    """
+    Hands out one persistent, tuned connection per thread
+
+    SQLite connections can't be used from several threads at once, so each
+    thread keeps its own connection for the life of the process instead of
+    opening one per call. Connections run in WAL mode, so readers don't
+    block the writer, and keep a statement cache so repeated queries reuse
+    their prepared statements.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        synchronous: str = None,
+        cache_size_kb: int = None,
+        busy_timeout_ms: int = None,
+        cached_statements: int = 256
+    ):
+        self.db_path = db_path
+        self.synchronous = synchronous or settings.AUDIT_DB_SYNCHRONOUS
+        self.cache_size_kb = cache_size_kb or settings.AUDIT_DB_CACHE_SIZE_KB
+        self.busy_timeout_ms = busy_timeout_ms or settings.AUDIT_DB_BUSY_TIMEOUT_MS
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.connection = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction, committing on success"""
+        conn = self.connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    @contextmanager
+    def dedicated_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection owned by the caller, closed when the block exits
+
+        For long-running reads (e.g. streamed exports) that may be resumed
+        from different threads and shouldn't hold a shared connection.
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and tune a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
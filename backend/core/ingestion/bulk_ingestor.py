@@ -0,0 +1,521 @@
+"""
+Bulk ingestion of PDF directories and ZIP archives
+"""
+
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+from core.config import settings
+from core.ingestion.job_queue import TransientJobError
+from core.ingestion.pipeline import IngestionPipeline
+
+
+class ArchiveTooLargeError(Exception):
+    """Raised when an archive exceeds the member count or uncompressed size limits"""
+
+
+def extract_pdf_archive(
+    archive_path: str,
+    target_dir: str,
+    max_members: int = None,
+    max_member_bytes: int = None,
+    max_total_bytes: int = None
+) -> List[str]:
+    """
+    Unpack the PDF members of a ZIP archive
+
+    Each member is written to a directory named after its index, so archives
+    cannot write outside target_dir and duplicate names don't collide.
+    Limits are checked against the sizes declared in the archive before
+    anything is written, and against the bytes actually written, so a zip
+    bomb can't fill the disk.
+
+    Args:
+        archive_path: Path to the ZIP file
+        target_dir: Directory to unpack into
+        max_members: Maximum number of entries in the archive
+        max_member_bytes: Maximum uncompressed size of one PDF
+        max_total_bytes: Maximum uncompressed size of all PDFs
+
+    Returns:
+        Paths of the extracted PDF files
+
+    Raises:
+        ArchiveTooLargeError: If a limit is exceeded
+        zipfile.BadZipFile: If the archive is invalid
+    """
+    max_members = max_members or settings.BULK_ARCHIVE_MAX_MEMBERS
+    max_member_bytes = max_member_bytes or settings.BULK_ARCHIVE_MAX_MEMBER_BYTES
+    max_total_bytes = max_total_bytes or settings.BULK_ARCHIVE_MAX_TOTAL_BYTES
+
+    target = Path(target_dir)
+    target.mkdir(parents=True, exist_ok=True)
+
+    extracted = []
+    with zipfile.ZipFile(archive_path) as archive:
+        members = archive.infolist()
+        if len(members) > max_members:
+            raise ArchiveTooLargeError(f"Archive has more than {max_members} entries")
+
+        pdfs = []
+        for index, member in enumerate(members):
+            name = Path(member.filename).name
+            if member.is_dir() or not name.lower().endswith(".pdf"):
+                continue
+            if "__MACOSX" in member.filename or name.startswith("._"):
+                continue
+            if member.file_size > max_member_bytes:
+                raise ArchiveTooLargeError(
+                    f"{member.filename} exceeds {max_member_bytes} bytes uncompressed"
+                )
+            pdfs.append((index, name, member))
+
+        if sum(member.file_size for _, _, member in pdfs) > max_total_bytes:
+            raise ArchiveTooLargeError(f"Archive exceeds {max_total_bytes} bytes uncompressed")
+
+        total = 0
+        for index, name, member in pdfs:
+            file_path = target / f"{index:05d}" / name
+            file_path.parent.mkdir(exist_ok=True)
+            written = 0
+            with archive.open(member) as source, open(file_path, "wb") as dest:
+                # Declared sizes can lie: count what is actually written
+                while True:
+                    block = source.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+                    written += len(block)
+                    total += len(block)
+                    if written > max_member_bytes or total > max_total_bytes:
+                        raise ArchiveTooLargeError(
+                            f"Archive exceeds its uncompressed size limits at {member.filename}"
+                        )
+                    dest.write(block)
+            extracted.append(str(file_path))
+
+    return extracted
+
+
+def collect_directory_pdfs(directory: str, root: Optional[str] = None) -> List[str]:
+    """
+    List PDF files under a server-side directory
+
+    Args:
+        directory: Directory to scan recursively
+        root: Directory that bulk ingestion is allowed to read from
+
+    Returns:
+        Sorted PDF file paths
+
+    Raises:
+        ValueError: If directory ingestion is disabled or the path is not allowed
+    """
+    root = root or settings.BULK_INGEST_ROOT
+    if not root:
+        raise ValueError("Directory ingestion is disabled. Set BULK_INGEST_ROOT to enable it.")
+
+    root_path = Path(root).resolve()
+    path = Path(directory)
+    if not path.is_absolute():
+        path = root_path / path
+    path = path.resolve()
+
+    if path != root_path and root_path not in path.parents:
+        raise ValueError(f"Directory must be inside {root_path}")
+
+    if not path.is_dir():
+        raise ValueError(f"Directory not found: {directory}")
+
+    return sorted(
+        str(file_path) for file_path in path.rglob("*")
+        if file_path.is_file() and file_path.suffix.lower() == ".pdf"
+    )
+
+
+class BulkManifest:
+    """Persistent per-file progress of bulk batches, used to resume"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.INGESTION_QUEUE_DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite tables for bulk batches"""
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bulk_batches (
+                    id TEXT PRIMARY KEY,
+                    source_type TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    root TEXT,
+                    status TEXT NOT NULL,
+                    metadata TEXT,
+                    stats TEXT,
+                    created_at TEXT NOT NULL,
+                    finished_at TEXT
+                )
+            """)
+
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bulk_files (
+                    batch_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    document_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    pages INTEGER DEFAULT 0,
+                    chunks INTEGER DEFAULT 0,
+                    error TEXT,
+                    finished_at TEXT,
+                    PRIMARY KEY (batch_id, position)
+                )
+            """)
+
+            self._conn.commit()
+
+    def create_batch(
+        self,
+        source_type: str,
+        source: str,
+        files: List[str],
+        root: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a new batch and assign a document ID to each file
+
+        Args:
+            source_type: "archive" or "directory"
+            source: Archive filename or directory path, for display
+            files: PDF file paths, in processing order
+            root: Working directory owned by the batch (removed when done)
+            metadata: Metadata attached to every chunk of the batch
+
+        Returns:
+            The created batch
+        """
+        batch_id = str(uuid.uuid4())
+
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO bulk_batches (
+                    id, source_type, source, root, status, metadata, created_at
+                ) VALUES (?, ?, ?, ?, 'pending', ?, ?)
+            """, (
+                batch_id,
+                source_type,
+                source,
+                root,
+                json.dumps(metadata or {}),
+                datetime.now().isoformat()
+            ))
+
+            self._conn.executemany("""
+                INSERT INTO bulk_files (batch_id, position, path, document_id, status)
+                VALUES (?, ?, ?, ?, 'pending')
+            """, [
+                (batch_id, position, path, str(uuid.uuid4()))
+                for position, path in enumerate(files)
+            ])
+
+            self._conn.commit()
+
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id: str, include_files: bool = False) -> Optional[Dict[str, Any]]:
+        """Get a batch with per-status file counts"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM bulk_batches WHERE id = ?", (batch_id,)
+            ).fetchone()
+            if not row:
+                return None
+
+            counts = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM bulk_files "
+                "WHERE batch_id = ? GROUP BY status",
+                (batch_id,)
+            ).fetchall()
+
+        batch = dict(row)
+        batch["metadata"] = json.loads(batch.get("metadata") or "{}")
+        batch["stats"] = json.loads(batch["stats"]) if batch.get("stats") else {}
+        batch["file_counts"] = {count["status"]: count["count"] for count in counts}
+        batch["total_files"] = sum(batch["file_counts"].values())
+
+        if include_files:
+            batch["files"] = self.list_files(batch_id)
+
+        return batch
+
+    def list_batches(self) -> List[Dict[str, Any]]:
+        """List all batches, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM bulk_batches ORDER BY created_at DESC"
+            ).fetchall()
+
+        return [self.get_batch(row["id"]) for row in rows]
+
+    def list_files(self, batch_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the files of a batch in processing order"""
+        query = "SELECT * FROM bulk_files WHERE batch_id = ?"
+        params: List[Any] = [batch_id]
+
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+
+        query += " ORDER BY position"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_file(self, batch_id: str, position: int) -> Optional[Dict[str, Any]]:
+        """Get one file of a batch"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM bulk_files WHERE batch_id = ? AND position = ?",
+                (batch_id, position)
+            ).fetchone()
+
+        return dict(row) if row else None
+
+    def mark_files_completed(self, batch_id: str, files: List[Dict[str, Any]]):
+        """Record files whose chunks have been stored"""
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            self._conn.executemany("""
+                UPDATE bulk_files SET status = 'completed', pages = ?, chunks = ?,
+                    error = NULL, finished_at = ?
+                WHERE batch_id = ? AND position = ? AND status != 'deleted'
+            """, [
+                (entry["pages"], entry["chunks"], now, batch_id, entry["position"])
+                for entry in files
+            ])
+            self._conn.commit()
+
+    def mark_file_failed(self, batch_id: str, position: int, error: str):
+        """Record a file that could not be processed"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE bulk_files SET status = 'failed', error = ?, finished_at = ?
+                WHERE batch_id = ? AND position = ? AND status != 'deleted'
+            """, (error, datetime.now().isoformat(), batch_id, position))
+            self._conn.commit()
+
+    def mark_file_deleted(self, batch_id: str, position: int):
+        """Record a file whose document was deleted; it is skipped from then on"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE bulk_files SET status = 'deleted', finished_at = ?
+                WHERE batch_id = ? AND position = ?
+            """, (datetime.now().isoformat(), batch_id, position))
+            self._conn.commit()
+
+    def is_document_deleted(self, batch_id: str, document_id: str) -> bool:
+        """Whether a file of the batch was deleted (see mark_file_deleted)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM bulk_files WHERE batch_id = ? AND document_id = ? AND status = 'deleted'",
+                (batch_id, document_id)
+            ).fetchone()
+        return row is not None
+
+    def update_batch(
+        self,
+        batch_id: str,
+        status: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ):
+        """Update batch status and/or throughput stats"""
+        with self._lock:
+            if status:
+                finished_at = (
+                    datetime.now().isoformat() if status in ("completed", "failed") else None
+                )
+                self._conn.execute(
+                    "UPDATE bulk_batches SET status = ?, finished_at = ? WHERE id = ?",
+                    (status, finished_at, batch_id)
+                )
+            if stats is not None:
+                self._conn.execute(
+                    "UPDATE bulk_batches SET stats = ? WHERE id = ?",
+                    (json.dumps(stats), batch_id)
+                )
+            self._conn.commit()
+
+
+class BulkIngestor:
+    """Ingests a bulk batch through the staged ingestion pipeline"""
+
+    def __init__(
+        self,
+        manifest: BulkManifest,
+        pdf_processor,
+        chunker,
+        ai_client=None,
+        data_client=None,
+        extract_workers: int = None,
+        embedding_batch_size: int = None,
+        store_batch_size: int = None
+    ):
+        self.manifest = manifest
+        self.pipeline = IngestionPipeline(
+            pdf_processor=pdf_processor,
+            chunker=chunker,
+            ai_client=ai_client,
+            data_client=data_client,
+            embedding_batch_size=embedding_batch_size,
+            store_batch_size=store_batch_size or settings.BULK_STORE_BATCH_SIZE,
+            extract_workers=extract_workers or settings.BULK_EXTRACT_WORKERS
+        )
+
+    def run(self, batch_id: str, final_attempt: bool = True) -> Dict[str, Any]:
+        """
+        Process every file of a batch that is not completed yet
+
+        Files are extracted on a thread pool while earlier files are chunked,
+        embedded and stored. Chunks from several files are embedded and
+        stored together, and files are only marked completed once stored, so
+        re-running an interrupted batch resumes after the last stored file.
+        File counts, pages, chunks and elapsed time are kept in the manifest
+        and accumulate over resumed runs.
+
+        Args:
+            batch_id: Batch to process
+            final_attempt: Whether the batch is failed for good (and its
+                working directory removed) if this run raises
+
+        Returns:
+            Aggregate throughput stats for the batch
+
+        Raises:
+            TransientJobError: If embedding or storing failed for some files,
+                so the batch is retried for those files
+        """
+        batch = self.manifest.get_batch(batch_id)
+        if not batch:
+            raise ValueError(f"Unknown bulk batch: {batch_id}")
+
+        files = self.manifest.list_files(batch_id, status="pending")
+        positions = {entry["document_id"]: entry["position"] for entry in files}
+        self.manifest.update_batch(batch_id, status="running")
+
+        previous = batch["stats"]
+        stats = {
+            "runs": previous.get("runs", 0) + 1,
+            "files_completed": previous.get("files_completed", 0),
+            "files_failed": previous.get("files_failed", 0),
+            "files_skipped": batch["total_files"] - len(files),
+            "pages": previous.get("pages", 0),
+            "chunks": previous.get("chunks", 0),
+            "elapsed_seconds": previous.get("elapsed_seconds", 0.0),
+            "pages_per_second": 0.0,
+            "chunks_per_second": 0.0,
+        }
+        prior_elapsed = stats["elapsed_seconds"]
+        transient_errors: List[str] = []
+        started = time.perf_counter()
+        finished = False
+
+        def documents():
+            for entry in files:
+                yield {
+                    "document_id": entry["document_id"],
+                    "file_path": entry["path"],
+                    "metadata": {
+                        **batch["metadata"],
+                        "filename": Path(entry["path"]).name,
+                        "batch_id": batch_id
+                    }
+                }
+
+        def on_document_done(result: Dict[str, Any]):
+            position = positions[result["document_id"]]
+
+            if result["success"]:
+                self.manifest.mark_files_completed(batch_id, [{
+                    "position": position,
+                    "pages": result["total_pages"],
+                    "chunks": result["chunks_count"]
+                }])
+                stats["files_completed"] += 1
+                stats["pages"] += result["total_pages"]
+                stats["chunks"] += result["chunks_count"]
+            elif result.get("deleted"):
+                # Left marked deleted by the delete request
+                return
+            elif result["transient"]:
+                # Left pending, the retried job picks it up again
+                transient_errors.append(result["error"])
+                return
+            else:
+                self.manifest.mark_file_failed(batch_id, position, result["error"])
+                stats["files_failed"] += 1
+            self._update_throughput(stats, started, prior_elapsed)
+            self.manifest.update_batch(batch_id, stats=stats)
+
+        try:
+            # Indexes are rebuilt once after the load instead of row by row
+            data_client = self.pipeline.data_client
+            if data_client:
+                data_client.begin_bulk_load()
+            try:
+                run = self.pipeline.run(
+                    documents(),
+                    on_document_done=on_document_done,
+                    is_deleted=lambda document_id: self.manifest.is_document_deleted(batch_id, document_id)
+                )
+            finally:
+                if data_client:
+                    data_client.end_bulk_load()
+            stats["pipeline"] = run["metrics"]
+            self._update_throughput(stats, started, prior_elapsed)
+
+            if transient_errors:
+                self.manifest.update_batch(batch_id, stats=stats)
+                raise TransientJobError(
+                    f"{len(transient_errors)} file(s) will be retried: {transient_errors[0]}"
+                )
+
+            self.manifest.update_batch(batch_id, status="completed", stats=stats)
+            finished = True
+            return stats
+        except TransientJobError:
+            if final_attempt:
+                finished = True
+                self._update_throughput(stats, started, prior_elapsed)
+                self.manifest.update_batch(batch_id, status="failed", stats=stats)
+            raise
+        except Exception:
+            # Anything else fails the job without a retry
+            finished = True
+            self._update_throughput(stats, started, prior_elapsed)
+            self.manifest.update_batch(batch_id, status="failed", stats=stats)
+            raise
+        finally:
+            # Archives are unpacked into a working directory owned by the batch,
+            # kept until no further run needs it
+            if finished and batch["source_type"] == "archive" and batch.get("root"):
+                shutil.rmtree(batch["root"], ignore_errors=True)
+
+    def _update_throughput(self, stats: Dict[str, Any], started: float, prior_elapsed: float = 0.0):
+        """Refresh elapsed time (including earlier runs of the batch) and rates"""
+        elapsed = prior_elapsed + time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["pages_per_second"] = round(stats["pages"] / elapsed, 2) if elapsed else 0.0
+        stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
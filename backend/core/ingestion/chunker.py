@@ -2,7 +2,7 @@
 Text chunking for RAG pipeline
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 import re
 from core.config import settings
 
@@ -38,36 +38,62 @@ class TextChunker:
         if not text or not text.strip():
             return []
 
-        # First, try to split by paragraphs
-        paragraphs = self._split_by_paragraphs(text)
+        return list(self.iter_chunks([text], document_id, metadata))
+
+    def iter_chunks(
+        self,
+        texts: Iterable[str],
+        document_id: str,
+        metadata: Dict[str, Any] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk a stream of texts (e.g. pages), yielding chunks as they fill up
         
-        chunks = []
+        Texts are treated as separate paragraphs, so chunking the pages of a
+        document one by one gives the same chunks as chunking the full text
+        with pages separated by blank lines.
+        
+        Args:
+            texts: Texts to chunk, consumed lazily
+            document_id: ID of the source document
+            metadata: Additional metadata to attach to chunks
+            
+        Yields:
+            Chunk dictionaries with text and metadata
+        """
         current_chunk = ""
         current_length = 0
         chunk_index = 0
+        last_chunk_text = None
+
+        for text in texts:
+            if not text or not text.strip():
+                continue
+
+            # First, try to split by paragraphs
+            for para in self._split_by_paragraphs(text):
+                para_length = len(para)
+                
+                # If paragraph fits in current chunk
+                if current_length + para_length <= self.chunk_size:
+                    current_chunk += para + "\n\n"
+                    current_length += para_length + 2
+                    continue
 
-        for para in paragraphs:
-            para_length = len(para)
-            
-            # If paragraph fits in current chunk
-            if current_length + para_length <= self.chunk_size:
-                current_chunk += para + "\n\n"
-                current_length += para_length + 2
-            else:
                 # Save current chunk if it has content
                 if current_chunk.strip():
-                    chunks.append(self._create_chunk(
-                        current_chunk.strip(),
+                    last_chunk_text = current_chunk.strip()
+                    yield self._create_chunk(
+                        last_chunk_text,
                         document_id,
                         chunk_index,
                         metadata
-                    ))
+                    )
                     chunk_index += 1
                 
                 # Start new chunk with overlap
-                if self.chunk_overlap > 0 and chunks:
+                if self.chunk_overlap > 0 and last_chunk_text is not None:
                     # Get last chunk's ending for overlap
-                    last_chunk_text = chunks[-1]["text"]
                     overlap_text = last_chunk_text[-self.chunk_overlap:]
                     current_chunk = overlap_text + "\n\n" + para + "\n\n"
                     current_length = len(current_chunk)
@@ -77,14 +103,12 @@ class TextChunker:
 
         # Add final chunk
         if current_chunk.strip():
-            chunks.append(self._create_chunk(
+            yield self._create_chunk(
                 current_chunk.strip(),
                 document_id,
                 chunk_index,
                 metadata
-            ))
-
-        return chunks
+            )
 
     def _split_by_paragraphs(self, text: str) -> List[str]:
         """Split text into paragraphs"""
@@ -5,6 +5,7 @@ Complete document processing pipeline
 from typing import Dict, Any, List
 from core.ingestion.pdf_processor import PDFProcessor
 from core.ingestion.chunker import TextChunker
+from core.ingestion.pipeline import IngestionPipeline
 from services.watsonx_ai.client import WatsonxAIClient
 from services.watsonx_data.client import WatsonxDataClient
 
@@ -17,6 +18,12 @@ class DocumentProcessor:
         self.chunker = TextChunker()
         self.ai_client = WatsonxAIClient()
         self.data_client = WatsonxDataClient()
+        self.pipeline = IngestionPipeline(
+            pdf_processor=self.pdf_processor,
+            chunker=self.chunker,
+            ai_client=self.ai_client,
+            data_client=self.data_client
+        )
 
     def process_document(
         self,
@@ -27,43 +34,37 @@ class DocumentProcessor:
         """
         Process a document: extract, chunk, embed, and store
         
+        The steps run as overlapping pipeline stages, see IngestionPipeline.
+        
         Args:
             file_path: Path to PDF file
             document_id: Unique document identifier
             metadata: Additional document metadata
             
         Returns:
-            Processing result with chunk count and status
+            Processing result with chunk count, status and stage metrics
         """
         try:
-            # Step 1: Extract text from PDF
-            extracted = self.pdf_processor.extract_text(file_path)
+            run = self.pipeline.run([{
+                "document_id": document_id,
+                "file_path": file_path,
+                "metadata": metadata
+            }])
+            result = run["documents"][document_id]
             
-            # Step 2: Chunk text
-            chunks = self.chunker.chunk_text(
-                text=extracted["text"],
-                document_id=document_id,
-                metadata={
-                    **(metadata or {}),
-                    "total_pages": extracted["total_pages"],
-                    "extraction_method": extracted.get("extraction_method")
+            if not result["success"]:
+                return {
+                    "success": False,
+                    "error": result["error"],
+                    "chunks_count": 0,
+                    "pipeline": run["metrics"]
                 }
-            )
-            
-            # Step 3: Generate embeddings
-            embeddings = []
-            for chunk in chunks:
-                embedding = self.ai_client.generate_embedding(chunk["text"])
-                embeddings.append(embedding)
-            
-            # Step 4: Store in watsonx.data
-            self.data_client.store_chunks(chunks, embeddings)
             
             return {
                 "success": True,
-                "chunks_count": len(chunks),
-                "total_pages": extracted["total_pages"],
-                "chunks": chunks
+                "chunks_count": result["chunks_count"],
+                "total_pages": result["total_pages"],
+                "pipeline": run["metrics"]
             }
             
         except Exception as e:
@@ -0,0 +1,436 @@
+"""
+Persistent ingestion job queue with a bounded worker pool
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from datetime import datetime, timedelta
+import json
+import sqlite3
+import threading
+import uuid
+from core.config import settings
+
+
+# Lower value runs first
+PRIORITY_VALUES = {"high": 0, "normal": 1, "low": 2}
+PRIORITY_NAMES = {value: name for name, value in PRIORITY_VALUES.items()}
+
+# Jobs waiting for a worker count towards the queue depth
+WAITING_STATUSES = ("queued", "retrying")
+
+
+class QueueFullError(Exception):
+    """Raised when the queue has reached its maximum depth"""
+
+
+class TransientJobError(Exception):
+    """Raised by job handlers for failures that are worth retrying"""
+
+
+TRANSIENT_ERRORS = (TransientJobError, ConnectionError, TimeoutError)
+
+
+class IngestionJobQueue:
+    """Local, SQLite-backed job queue drained by a pool of worker threads"""
+
+    def __init__(
+        self,
+        db_path: str = None,
+        workers: int = None,
+        max_depth: int = None,
+        max_retries: int = None,
+        retry_backoff: float = None,
+        poll_interval: float = 1.0
+    ):
+        self.db_path = db_path or settings.INGESTION_QUEUE_DB_PATH
+        self.workers = workers or settings.INGESTION_WORKERS
+        self.max_depth = max_depth or settings.INGESTION_MAX_QUEUE_DEPTH
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.INGESTION_MAX_RETRIES
+        )
+        self.retry_backoff = (
+            retry_backoff if retry_backoff is not None
+            else settings.INGESTION_RETRY_BACKOFF_SECONDS
+        )
+        self.poll_interval = poll_interval
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # One connection shared by all workers; every access holds self._lock
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_database()
+        self._recover_interrupted_jobs()
+
+    def _init_database(self):
+        """Initialize SQLite tables for queued jobs"""
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    document_id TEXT NOT NULL,
+                    payload TEXT,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    error TEXT,
+                    result TEXT,
+                    created_at TEXT NOT NULL,
+                    run_after TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+            # Queues created before document deletion was recorded
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(ingestion_jobs)")}
+            if "deleted" not in columns:
+                self._conn.execute(
+                    "ALTER TABLE ingestion_jobs ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0"
+                )
+
+            # Covers the claim query: waiting jobs by priority, then age
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_claim
+                ON ingestion_jobs(status, priority, created_at)
+            """)
+
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_document
+                ON ingestion_jobs(document_id)
+            """)
+
+            self._conn.commit()
+
+    def _recover_interrupted_jobs(self):
+        """
+        Requeue jobs that were running when the previous process exited
+
+        The interrupted run already counts as an attempt (attempts is
+        incremented when a job is claimed), so a job that keeps crashing the
+        process fails once it has used up max_attempts instead of being
+        retried on every restart.
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'failed', finished_at = ?, "
+                "error = 'Interrupted by a restart after ' || attempts || ' attempt(s)' "
+                "WHERE status = 'running' AND attempts >= max_attempts",
+                (now,)
+            )
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'queued', started_at = NULL, "
+                "error = 'Interrupted by a restart' "
+                "WHERE status = 'running'"
+            )
+            self._conn.commit()
+
+    def register_handler(
+        self,
+        kind: str,
+        handler: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ):
+        """
+        Register the function that processes jobs of a given kind
+
+        Args:
+            kind: Job kind, e.g. "document"
+            handler: Callable receiving the job dict and returning a result dict.
+                Raise TransientJobError (or ConnectionError/TimeoutError) to
+                have the job retried with backoff.
+        """
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Start the worker pool"""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"ingestion-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the worker pool, letting running jobs finish"""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(
+        self,
+        kind: str,
+        document_id: str,
+        payload: Dict[str, Any],
+        priority: str = "normal"
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a job
+
+        Args:
+            kind: Job kind, must have a registered handler
+            document_id: Document the job belongs to
+            payload: JSON-serializable job arguments
+            priority: "high", "normal" or "low"
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullError: If the queue is at its maximum depth
+        """
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+
+        with self._wakeup:
+            if self._waiting_count() >= self.max_depth:
+                raise QueueFullError(
+                    f"Ingestion queue is full ({self.max_depth} jobs waiting)"
+                )
+
+            self._conn.execute("""
+                INSERT INTO ingestion_jobs (
+                    id, kind, document_id, payload, priority, status,
+                    attempts, max_attempts, created_at, run_after
+                ) VALUES (?, ?, ?, ?, ?, 'queued', 0, ?, ?, ?)
+            """, (
+                job_id,
+                kind,
+                document_id,
+                json.dumps(payload, default=str),
+                PRIORITY_VALUES.get(priority, PRIORITY_VALUES["normal"]),
+                self.max_retries + 1,
+                now,
+                now
+            ))
+            self._conn.commit()
+            self._wakeup.notify()
+
+        return self.get_job(job_id)
+
+    def is_full(self) -> bool:
+        """Whether a new job would be rejected"""
+        with self._lock:
+            return self._waiting_count() >= self.max_depth
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'retrying')",
+                (datetime.now().isoformat(), job_id)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def mark_deleted(self, document_id: str):
+        """
+        Record that a document was deleted
+
+        Its jobs that have not started are cancelled; a running job sees
+        the flag through is_deleted() before it stores anything.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE document_id = ? AND status IN ('queued', 'retrying')",
+                (datetime.now().isoformat(), document_id)
+            )
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET deleted = 1 WHERE document_id = ?", (document_id,)
+            )
+            self._conn.commit()
+
+    def is_deleted(self, document_id: str) -> bool:
+        """Whether a document was deleted (see mark_deleted)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM ingestion_jobs WHERE document_id = ? AND deleted = 1 LIMIT 1",
+                (document_id,)
+            ).fetchone()
+        return row is not None
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(
+        self,
+        kind: Optional[str] = None,
+        status: Optional[str] = None,
+        document_id: Optional[str] = None,
+        limit: Optional[int] = 100,
+        include_deleted: bool = True
+    ) -> List[Dict[str, Any]]:
+        """List jobs, newest first (all of them when limit is None)"""
+        query = "SELECT * FROM ingestion_jobs WHERE 1=1"
+        params: List[Any] = []
+
+        if not include_deleted:
+            query += " AND deleted = 0"
+
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+
+        if document_id:
+            query += " AND document_id = ?"
+            params.append(document_id)
+
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [self._row_to_job(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and job counts by status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM ingestion_jobs GROUP BY status"
+            ).fetchall()
+
+        by_status = {row["status"]: row["count"] for row in rows}
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "depth": sum(by_status.get(status, 0) for status in WAITING_STATUSES),
+            "by_status": by_status
+        }
+
+    def _waiting_count(self) -> int:
+        """Number of jobs waiting for a worker (caller holds the lock)"""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM ingestion_jobs WHERE status IN (?, ?)",
+            WAITING_STATUSES
+        ).fetchone()
+        return row[0]
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the next runnable job as running (caller holds the lock)"""
+        now = datetime.now().isoformat()
+        row = self._conn.execute("""
+            SELECT * FROM ingestion_jobs
+            WHERE status IN (?, ?) AND run_after <= ?
+            ORDER BY priority, created_at
+            LIMIT 1
+        """, (*WAITING_STATUSES, now)).fetchone()
+
+        if not row:
+            return None
+
+        self._conn.execute(
+            "UPDATE ingestion_jobs SET status = 'running', attempts = attempts + 1, "
+            "started_at = ? WHERE id = ?",
+            (now, row["id"])
+        )
+        self._conn.commit()
+
+        job = self._row_to_job(row)
+        job["status"] = "running"
+        job["attempts"] += 1
+        job["started_at"] = now
+        return job
+
+    def _worker_loop(self):
+        """Claim and run jobs until stopped"""
+        while not self._stop.is_set():
+            with self._wakeup:
+                job = self._claim_next()
+                if job is None:
+                    # Timed wait so delayed retries are picked up when due
+                    self._wakeup.wait(timeout=self.poll_interval)
+                    continue
+
+            self._run_job(job)
+
+    def _run_job(self, job: Dict[str, Any]):
+        """Run a claimed job and record its outcome"""
+        handler = self._handlers.get(job["kind"])
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{job['kind']}'")
+            result = handler(job)
+        except TRANSIENT_ERRORS as e:
+            if job["attempts"] < job["max_attempts"]:
+                delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+                self._finish(job["id"], "retrying", error=str(e), retry_in=delay)
+            else:
+                self._finish(job["id"], "failed", error=str(e))
+        except Exception as e:
+            self._finish(job["id"], "failed", error=str(e))
+        else:
+            self._finish(job["id"], "succeeded", result=result)
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+        retry_in: Optional[float] = None
+    ):
+        """Record the outcome of a job attempt"""
+        now = datetime.now()
+
+        with self._wakeup:
+            if retry_in is not None:
+                self._conn.execute(
+                    "UPDATE ingestion_jobs SET status = ?, error = ?, run_after = ? "
+                    "WHERE id = ?",
+                    (status, error, (now + timedelta(seconds=retry_in)).isoformat(), job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE ingestion_jobs SET status = ?, error = ?, result = ?, "
+                    "finished_at = ? WHERE id = ?",
+                    (
+                        status,
+                        error,
+                        json.dumps(result, default=str) if result is not None else None,
+                        now.isoformat(),
+                        job_id
+                    )
+                )
+            self._conn.commit()
+            self._wakeup.notify()
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a database row into a job dictionary"""
+        job = dict(row)
+        job["payload"] = json.loads(job.get("payload") or "{}")
+        job["result"] = json.loads(job["result"]) if job.get("result") else None
+        job["priority"] = PRIORITY_NAMES.get(job["priority"], "normal")
+        return job
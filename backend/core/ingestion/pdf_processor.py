@@ -2,9 +2,7 @@
 PDF processing and text extraction
 """
 
-import pdfplumber
-import PyPDF2
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 import hashlib
 from pathlib import Path
 
@@ -12,6 +10,8 @@ from pathlib import Path
 class PDFProcessor:
     """Processes PDF files and extracts text"""
 
+    PDF_HEADER = b"%PDF"
+
     def __init__(self):
         self.supported_formats = [".pdf"]
 
@@ -26,7 +26,10 @@ class PDFProcessor:
             Dictionary with text, metadata, and page information
         """
         try:
-            # Try pdfplumber first (better for complex layouts)
+            # Try pdfplumber first (better for complex layouts). PDF libraries
+            # are imported on first use to keep application startup fast.
+            import pdfplumber
+            
             with pdfplumber.open(file_path) as pdf:
                 pages = []
                 full_text = []
@@ -51,6 +54,8 @@ class PDFProcessor:
         except Exception as e:
             # Fallback to PyPDF2
             try:
+                import PyPDF2
+                
                 with open(file_path, "rb") as file:
                     pdf_reader = PyPDF2.PdfReader(file)
                     pages = []
@@ -76,6 +81,62 @@ class PDFProcessor:
             except Exception as e2:
                 raise ValueError(f"Failed to extract text from PDF: {str(e2)}")
 
+    def iter_pages(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text page by page, yielding each page as soon as it is read
+        
+        Falls back to PyPDF2 only if pdfplumber fails before the first page,
+        so pages are never yielded twice.
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Yields:
+            Page dictionaries with page number, text, total page count and
+            extraction method. Pages without text are skipped.
+        """
+        yielded = False
+        try:
+            import pdfplumber
+            
+            with pdfplumber.open(file_path) as pdf:
+                total_pages = len(pdf.pages)
+                for page_num, page in enumerate(pdf.pages, 1):
+                    text = page.extract_text()
+                    if text:
+                        yielded = True
+                        yield {
+                            "page_number": page_num,
+                            "text": text,
+                            "char_count": len(text),
+                            "total_pages": total_pages,
+                            "extraction_method": "pdfplumber"
+                        }
+            return
+        except Exception as e:
+            if yielded:
+                raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+        # Fallback to PyPDF2
+        try:
+            import PyPDF2
+            
+            with open(file_path, "rb") as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                total_pages = len(pdf_reader.pages)
+                for page_num, page in enumerate(pdf_reader.pages, 1):
+                    text = page.extract_text()
+                    if text:
+                        yield {
+                            "page_number": page_num,
+                            "text": text,
+                            "char_count": len(text),
+                            "total_pages": total_pages,
+                            "extraction_method": "PyPDF2"
+                        }
+        except Exception as e2:
+            raise ValueError(f"Failed to extract text from PDF: {str(e2)}")
+
     def validate_pdf(self, file_path: str) -> bool:
         """Validate that file is a valid PDF"""
         if not Path(file_path).exists():
@@ -87,11 +148,15 @@ class PDFProcessor:
         try:
             with open(file_path, "rb") as file:
                 # Check PDF header
-                header = file.read(4)
-                return header == b"%PDF"
+                return self.has_pdf_header(file.read(len(self.PDF_HEADER)))
         except Exception:
             return False
 
+    @classmethod
+    def has_pdf_header(cls, data: bytes) -> bool:
+        """Check whether the leading bytes of a file are a PDF header"""
+        return data[:len(cls.PDF_HEADER)] == cls.PDF_HEADER
+
     def get_file_hash(self, file_path: str) -> str:
         """Generate hash for file to track versions"""
         sha256_hash = hashlib.sha256()
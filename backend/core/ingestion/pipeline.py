@@ -0,0 +1,569 @@
+"""
+Staged ingestion pipeline: extract -> chunk -> embed -> store
+
+Each stage runs on its own thread and hands work to the next one through a
+bounded queue, so PDF extraction, embedding and storage overlap instead of
+running one after the other. Documents flow through the stages in order;
+every stage forwards "start"/"end"/"error" markers so downstream stages
+know where a document begins and ends.
+
+If a stage raises (a bug, or an exception from the on_document_done
+callback), the run is aborted: its queues stop blocking so every stage
+winds down, and run() re-raises the error once all threads have exited.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Callable, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+from core.config import settings
+
+
+_END = object()
+
+# How often blocked queue operations check whether the run was aborted
+ABORT_POLL_SECONDS = 0.1
+
+
+class StageMetrics:
+    """Counters and timings for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.starved_seconds = 0.0  # waiting on the upstream queue
+        self.blocked_seconds = 0.0  # waiting on a full downstream queue
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def snapshot(self, elapsed: float) -> Dict[str, Any]:
+        """Stage metrics as a dictionary"""
+        wall = (self.finished_at or time.perf_counter()) - (self.started_at or 0.0)
+        busy = max(0.0, wall - self.starved_seconds - self.blocked_seconds) if self.started_at else 0.0
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(busy, 4),
+            "starved_seconds": round(self.starved_seconds, 4),
+            "blocked_seconds": round(self.blocked_seconds, 4),
+            "throughput_per_second": round(self.items_out / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(busy / elapsed, 3) if elapsed else 0.0,
+        }
+
+
+class StageQueue:
+    """
+    Bounded queue that records depth and wait times for its stages
+
+    Once abort is set, put() drops items instead of blocking and get()
+    returns _END, so stages on either side of a failed one finish.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        producer: StageMetrics,
+        consumer: StageMetrics,
+        abort: Optional[threading.Event] = None
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.producer = producer
+        self.consumer = consumer
+        self.abort = abort or threading.Event()
+        self.high_water = 0
+        self._depth_total = 0
+        self._puts = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, item: Any, count: int = 1):
+        """Put an item, accounting the wait to the producing stage"""
+        started = time.perf_counter()
+        while True:
+            if self.abort.is_set():
+                return
+            try:
+                self._queue.put(item, timeout=ABORT_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self.producer.blocked_seconds += time.perf_counter() - started
+        self.producer.items_out += count
+
+        depth = self._queue.qsize()
+        self.high_water = max(self.high_water, depth)
+        self._depth_total += depth
+        self._puts += 1
+
+    def get(self) -> Any:
+        """Get an item, accounting the wait to the consuming stage"""
+        started = time.perf_counter()
+        item = _END
+        while not self.abort.is_set():
+            try:
+                item = self._queue.get(timeout=ABORT_POLL_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        self.consumer.starved_seconds += time.perf_counter() - started
+        return item
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth metrics as a dictionary"""
+        return {
+            "maxsize": self.maxsize,
+            "depth": self._queue.qsize(),
+            "high_water": self.high_water,
+            "average_depth": round(self._depth_total / self._puts, 2) if self._puts else 0.0,
+        }
+
+
+class IngestionPipeline:
+    """Runs documents through overlapping extract, chunk, embed and store stages"""
+
+    STAGES = ("extract", "chunk", "embed", "store")
+
+    def __init__(
+        self,
+        pdf_processor,
+        chunker,
+        ai_client=None,
+        data_client=None,
+        queue_size: int = None,
+        embedding_batch_size: int = None,
+        store_batch_size: int = None,
+        extract_workers: int = 1
+    ):
+        self.pdf_processor = pdf_processor
+        self.chunker = chunker
+        self.ai_client = ai_client
+        self.data_client = data_client
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.embedding_batch_size = embedding_batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.store_batch_size = store_batch_size or settings.PIPELINE_STORE_BATCH_SIZE
+        self.extract_workers = extract_workers
+
+    def run(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        on_document_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+        is_deleted: Optional[Callable[[str], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ingest documents through the pipeline
+
+        Args:
+            documents: Dicts with document_id, file_path and optional metadata
+            on_document_done: Called from the store stage with each document's
+                result as soon as its last chunk is stored (or it fails)
+            is_deleted: Checked for each document before and after it is
+                published; a document deleted meanwhile is discarded and
+                reported with success False and deleted True
+
+        Returns:
+            Dictionary with per-document results and pipeline metrics
+
+        Raises:
+            Exception: The first error that escaped a stage, after all
+                stages have stopped
+        """
+        metrics = {name: StageMetrics(name) for name in self.STAGES}
+        abort = threading.Event()
+        errors: List[BaseException] = []
+        queues = [
+            StageQueue("pages", self.queue_size, metrics["extract"], metrics["chunk"], abort),
+            StageQueue("chunks", self.queue_size, metrics["chunk"], metrics["embed"], abort),
+            StageQueue("embedded", self.queue_size, metrics["embed"], metrics["store"], abort),
+        ]
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def done(result: Dict[str, Any]):
+            results[result["document_id"]] = result
+            if on_document_done:
+                on_document_done(result)
+
+        stages = [
+            (self._extract_stage, (documents, queues[0], abort)),
+            (self._chunk_stage, (queues[0], queues[1])),
+            (self._embed_stage, (queues[1], queues[2])),
+            (self._store_stage, (queues[2], done, is_deleted)),
+        ]
+
+        started = time.perf_counter()
+        threads = []
+        for name, (target, args) in zip(self.STAGES, stages):
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(metrics[name], target, args, abort, errors),
+                name=f"ingest-{name}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - started
+        return {
+            "documents": results,
+            "metrics": self._metrics_snapshot(metrics, queues, elapsed),
+        }
+
+    def _run_stage(
+        self,
+        metrics: StageMetrics,
+        target: Callable,
+        args: Tuple,
+        abort: threading.Event,
+        errors: List[BaseException]
+    ):
+        """Run a stage function, timing it; an escaping error aborts the run"""
+        metrics.started_at = time.perf_counter()
+        try:
+            target(metrics, *args)
+        except BaseException as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            metrics.finished_at = time.perf_counter()
+
+    def _extract_stage(
+        self,
+        metrics: StageMetrics,
+        documents: Iterable[Dict[str, Any]],
+        outbox: StageQueue,
+        abort: threading.Event
+    ):
+        """Extract pages of each document"""
+        try:
+            if self.extract_workers > 1:
+                self._extract_prefetched(metrics, documents, outbox, abort)
+                return
+
+            for document in documents:
+                if abort.is_set():
+                    return
+                metrics.items_in += 1
+                doc_id = document["document_id"]
+                outbox.put(("start", doc_id, document), count=0)
+                try:
+                    info = {"total_pages": 0, "extraction_method": None}
+                    for page in self.pdf_processor.iter_pages(document["file_path"]):
+                        info["total_pages"] = page["total_pages"]
+                        info["extraction_method"] = page["extraction_method"]
+                        outbox.put(("page", doc_id, page))
+                    outbox.put(("end", doc_id, info), count=0)
+                except Exception as e:
+                    outbox.put(("error", doc_id, {"error": str(e), "transient": False}), count=0)
+        finally:
+            outbox.put(_END, count=0)
+
+    def _extract_prefetched(
+        self,
+        metrics: StageMetrics,
+        documents: Iterable[Dict[str, Any]],
+        outbox: StageQueue,
+        abort: threading.Event
+    ):
+        """Extract several documents concurrently, forwarding them in order"""
+
+        def extract_all(document: Dict[str, Any]) -> List[Dict[str, Any]]:
+            return list(self.pdf_processor.iter_pages(document["file_path"]))
+
+        with ThreadPoolExecutor(
+            max_workers=self.extract_workers,
+            thread_name_prefix="ingest-extract"
+        ) as executor:
+            # Bounded window of documents in flight so memory stays flat
+            remaining = iter(documents)
+            window = deque()
+            for document in remaining:
+                window.append((document, executor.submit(extract_all, document)))
+                if len(window) >= self.extract_workers * 2:
+                    break
+
+            while window:
+                document, future = window.popleft()
+                if abort.is_set():
+                    future.cancel()
+                    continue
+                next_document = next(remaining, None)
+                if next_document is not None:
+                    window.append((next_document, executor.submit(extract_all, next_document)))
+
+                metrics.items_in += 1
+                doc_id = document["document_id"]
+                outbox.put(("start", doc_id, document), count=0)
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    outbox.put(("error", doc_id, {"error": str(e), "transient": False}), count=0)
+                    continue
+
+                for page in pages:
+                    outbox.put(("page", doc_id, page))
+                outbox.put(("end", doc_id, {
+                    "total_pages": pages[-1]["total_pages"] if pages else 0,
+                    "extraction_method": pages[-1]["extraction_method"] if pages else None,
+                }), count=0)
+
+    def _chunk_stage(self, metrics: StageMetrics, inbox: StageQueue, outbox: StageQueue):
+        """Chunk page text as pages arrive"""
+        try:
+            while True:
+                message = inbox.get()
+                if message is _END:
+                    return
+
+                kind, doc_id, document = message
+                if kind == "page":
+                    # Rest of a document whose chunking failed
+                    continue
+                if kind != "start":
+                    outbox.put(message, count=0)
+                    continue
+
+                # Chunks share this dict, so total_pages can be filled in
+                # from the first page before any chunk is emitted
+                metadata = dict(document.get("metadata") or {})
+                terminal: List[Any] = []
+
+                def page_texts():
+                    while True:
+                        item = inbox.get()
+                        if item is _END:
+                            terminal.append(("error", doc_id, {
+                                "error": "Pipeline input ended mid-document",
+                                "transient": False,
+                            }))
+                            terminal.append(_END)
+                            return
+                        if item[0] != "page":
+                            terminal.append(item)
+                            return
+                        metrics.items_in += 1
+                        metadata.setdefault("total_pages", item[2]["total_pages"])
+                        metadata.setdefault("extraction_method", item[2]["extraction_method"])
+                        yield item[2]["text"]
+
+                outbox.put(("start", doc_id, document), count=0)
+                try:
+                    for chunk in self.chunker.iter_chunks(page_texts(), doc_id, metadata):
+                        outbox.put(("chunk", doc_id, chunk))
+                except Exception as e:
+                    # Keep _END if page_texts already consumed it
+                    terminal[:] = [("error", doc_id, {"error": str(e), "transient": False})] + [
+                        item for item in terminal if item is _END
+                    ]
+
+                for item in terminal:
+                    if item is _END:
+                        return
+                    outbox.put(item, count=0)
+        finally:
+            outbox.put(_END, count=0)
+
+    def _embed_stage(self, metrics: StageMetrics, inbox: StageQueue, outbox: StageQueue):
+        """Embed chunks in batches, possibly spanning documents"""
+        buffer: List[Dict[str, Any]] = []
+        # "end" markers wait until the document's last chunks are flushed
+        deferred: List[Any] = []
+        failed = set()
+
+        def flush():
+            if buffer:
+                batch = list(buffer)
+                buffer.clear()
+                try:
+                    embeddings = self._embed([chunk["text"] for chunk in batch])
+                except Exception as e:
+                    # Embedding errors are usually service errors, worth retrying
+                    for doc_id in dict.fromkeys(chunk["document_id"] for chunk in batch):
+                        failed.add(doc_id)
+                        outbox.put(("error", doc_id, {"error": str(e), "transient": True}), count=0)
+                else:
+                    outbox.put(("batch", None, (batch, embeddings)), count=len(batch))
+
+            for marker in deferred:
+                if marker[1] not in failed:
+                    outbox.put(marker, count=0)
+            deferred.clear()
+
+        try:
+            while True:
+                message = inbox.get()
+                if message is _END:
+                    flush()
+                    return
+
+                kind, doc_id, payload = message
+                if kind == "chunk":
+                    metrics.items_in += 1
+                    if doc_id in failed:
+                        continue
+                    buffer.append(payload)
+                    if len(buffer) >= self.embedding_batch_size:
+                        flush()
+                elif kind == "end":
+                    deferred.append(message)
+                elif kind == "error":
+                    buffer[:] = [chunk for chunk in buffer if chunk["document_id"] != doc_id]
+                    failed.add(doc_id)
+                    outbox.put(message, count=0)
+                else:
+                    outbox.put(message, count=0)
+        finally:
+            outbox.put(_END, count=0)
+
+    def _store_stage(
+        self,
+        metrics: StageMetrics,
+        inbox: StageQueue,
+        done: Callable[[Dict[str, Any]], None],
+        is_deleted: Optional[Callable[[str], bool]] = None
+    ):
+        """
+        Stage embedded chunks in bulk and publish each finished document
+
+        Chunks are bulk-inserted into staging as batches fill up; a document
+        becomes visible to search in one transaction once its last chunk is
+        staged, so failed documents are never partially searchable.
+        """
+        chunks: List[Dict[str, Any]] = []
+        embeddings: List[List[float]] = []
+        deferred: List[Any] = []
+        stored_counts: Dict[str, int] = {}
+        failed = set()
+        load_id = None
+
+        def flush():
+            if chunks:
+                try:
+                    if self.data_client:
+                        self.data_client.stage_chunks(load_id, list(chunks), list(embeddings))
+                except Exception as e:
+                    # Storage outages are transient, the caller may retry
+                    for doc_id in dict.fromkeys(chunk["document_id"] for chunk in chunks):
+                        fail(doc_id, {"error": f"Error storing chunks: {str(e)}", "transient": True})
+                else:
+                    for chunk in chunks:
+                        stored_counts[chunk["document_id"]] = stored_counts.get(chunk["document_id"], 0) + 1
+                    metrics.items_out += len(chunks)
+                chunks.clear()
+                embeddings.clear()
+
+            for _, doc_id, info in deferred:
+                if doc_id in failed:
+                    continue
+                if is_deleted and is_deleted(doc_id):
+                    discard(doc_id)
+                    continue
+                try:
+                    if self.data_client:
+                        self.data_client.commit_document(load_id, doc_id)
+                except Exception as e:
+                    fail(doc_id, {"error": f"Error storing chunks: {str(e)}", "transient": True})
+                    continue
+                # Deleted while it was being published: take it down again
+                if is_deleted and is_deleted(doc_id):
+                    if self.data_client:
+                        self.data_client.delete_document(doc_id)
+                    discard(doc_id)
+                    continue
+                done({
+                    "document_id": doc_id,
+                    "success": True,
+                    "chunks_count": stored_counts.pop(doc_id, 0),
+                    "total_pages": info["total_pages"],
+                    "extraction_method": info["extraction_method"],
+                })
+            deferred.clear()
+
+        def discard(doc_id: str):
+            fail(doc_id, {"error": "Document was deleted", "transient": False, "deleted": True})
+
+        def fail(doc_id: str, info: Dict[str, Any]):
+            if doc_id in failed:
+                return
+            failed.add(doc_id)
+            stored_counts.pop(doc_id, None)
+            if self.data_client and load_id:
+                try:
+                    self.data_client.abort_document(load_id, doc_id)
+                except Exception:
+                    # Leftover staged rows are purged by a later begin_load
+                    pass
+            done({
+                "document_id": doc_id,
+                "success": False,
+                "chunks_count": 0,
+                "error": info["error"],
+                "transient": info["transient"],
+                "deleted": info.get("deleted", False),
+            })
+
+        try:
+            load_id = self.data_client.begin_load() if self.data_client else None
+        except Exception as e:
+            # Store unreachable: fail every document so the caller can retry
+            error = {"error": f"Error storing chunks: {str(e)}", "transient": True}
+            while True:
+                message = inbox.get()
+                if message is _END:
+                    return
+                if message[0] in ("end", "error"):
+                    fail(message[1], error)
+
+        while True:
+            message = inbox.get()
+            if message is _END:
+                flush()
+                return
+
+            kind, doc_id, payload = message
+            if kind == "batch":
+                batch_chunks, batch_embeddings = payload
+                metrics.items_in += len(batch_chunks)
+                for chunk, embedding in zip(batch_chunks, batch_embeddings):
+                    if chunk["document_id"] in failed:
+                        continue
+                    chunks.append(chunk)
+                    embeddings.append(embedding)
+                if len(chunks) >= self.store_batch_size:
+                    flush()
+            elif kind == "end":
+                deferred.append(message)
+            elif kind == "error":
+                keep = [i for i, chunk in enumerate(chunks) if chunk["document_id"] != doc_id]
+                chunks[:] = [chunks[i] for i in keep]
+                embeddings[:] = [embeddings[i] for i in keep]
+                fail(doc_id, payload)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts"""
+        if not self.ai_client:
+            return [[0.0] * settings.EMBEDDING_DIMENSION for _ in texts]
+        return self.ai_client.generate_embeddings(texts)
+
+    def _metrics_snapshot(
+        self,
+        metrics: Dict[str, StageMetrics],
+        queues: List[StageQueue],
+        elapsed: float
+    ) -> Dict[str, Any]:
+        """Per-stage throughput, queue depths and the busiest stage"""
+        stages = {name: stage.snapshot(elapsed) for name, stage in metrics.items()}
+        return {
+            "elapsed_seconds": round(elapsed, 4),
+            "stages": stages,
+            "queues": {q.name: q.snapshot() for q in queues},
+            "bottleneck": max(stages, key=lambda name: stages[name]["busy_seconds"]),
+        }
@@ -0,0 +1,80 @@
+"""
+Streaming upload persistence
+"""
+
+from typing import Dict, Any, Callable, Optional
+import hashlib
+import os
+import aiofiles
+from core.config import settings
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size"""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when the leading bytes of an upload don't match its format"""
+
+
+async def save_upload(
+    upload,
+    destination: str,
+    max_bytes: int = None,
+    chunk_size: int = None,
+    header_check: Optional[Callable[[bytes], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Stream an upload to disk in fixed-size chunks
+
+    The SHA-256 hash is computed while writing, and the first chunk is
+    checked before anything is written, so only one chunk is ever held in
+    memory. The partial file is removed if the upload is rejected.
+
+    Args:
+        upload: Object with an async read(size) method (e.g. UploadFile)
+        destination: File path to write to
+        max_bytes: Maximum accepted size
+        chunk_size: Bytes read per chunk
+        header_check: Predicate applied to the first chunk
+
+    Returns:
+        Dictionary with path, size and sha256
+
+    Raises:
+        InvalidUploadError: If header_check rejects the first chunk
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    first_chunk = await upload.read(chunk_size)
+    if header_check and not header_check(first_chunk):
+        raise InvalidUploadError("File content does not match its type")
+
+    sha256_hash = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(destination, "wb") as f:
+            chunk = first_chunk
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"File exceeds the maximum upload size of {max_bytes} bytes"
+                    )
+
+                sha256_hash.update(chunk)
+                await f.write(chunk)
+                chunk = await upload.read(chunk_size)
+    except Exception:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+
+    return {
+        "path": destination,
+        "size": size,
+        "sha256": sha256_hash.hexdigest()
+    }
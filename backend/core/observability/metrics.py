@@ -0,0 +1,451 @@
+"""
+In-process Prometheus metrics
+
+A small registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format (served on /metrics). Recording a value
+is a dict lookup and a short lock, so instrumenting hot paths is cheap.
+
+Metrics are per process: with several uvicorn workers, scrape each worker
+(or aggregate them in Prometheus).
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+import math
+import threading
+import time
+
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; wide enough for LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base for labelled metrics; children are created on first use and cached"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> object:
+        """Child metric for the given label values (positional, in labelnames order)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        """Child for a metric without labels"""
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self, name: str, labelnames: Sequence[str], key: Sequence[str]) -> List[str]:
+        return [f"{name}_total{_format_labels(labelnames, key)} {_format_value(self._value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (exported with a _total suffix)"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function at scrape time"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+    def render(self, name: str, labelnames: Sequence[str], key: Sequence[str]) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (in-flight requests, queue depth)"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def render(self, name: str, labelnames: Sequence[str], key: Sequence[str]) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (math.inf,), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies) over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    """Set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def track(
+    histogram: _HistogramChild,
+    requests: Optional[Counter] = None,
+    in_flight: Optional[_GaugeChild] = None,
+    labels: Sequence[str] = ()
+) -> Iterator[None]:
+    """
+    Time a call, count it by outcome and track it as in flight
+
+    Args:
+        histogram: Histogram child observing the duration
+        requests: Counter labelled by labels + ("success" | "error")
+        in_flight: Gauge child incremented for the duration of the call
+        labels: Label values for requests, before the outcome
+    """
+    if in_flight is not None:
+        in_flight.inc()
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        outcome = "success"
+    finally:
+        histogram.observe(time.perf_counter() - start)
+        if in_flight is not None:
+            in_flight.dec()
+        if requests is not None:
+            requests.labels(*labels, outcome).inc()
+
+
+registry = Registry()
+
+# Questions and reasoning loop
+QUESTIONS = registry.counter(
+    "policyiq_questions",
+    "Questions processed by the reasoning loop, by outcome",
+    ("outcome",)
+)
+QUESTION_SECONDS = registry.histogram(
+    "policyiq_question_duration_seconds",
+    "End-to-end reasoning loop latency"
+)
+QUESTIONS_IN_FLIGHT = registry.gauge(
+    "policyiq_questions_in_flight",
+    "Questions currently in the reasoning loop"
+)
+COALESCED_REQUESTS = registry.counter(
+    "policyiq_coalesced_requests",
+    "Requests that joined an identical call already in flight (question, embedding)",
+    ("operation",)
+)
+REASONING_STAGE_SECONDS = registry.histogram(
+    "policyiq_reasoning_stage_duration_seconds",
+    "Latency of each stage of answering a question (plan, search, reason, verify, respond, audit)",
+    ("stage",)
+)
+
+# Hybrid search
+SEARCH_SECONDS = registry.histogram(
+    "policyiq_search_duration_seconds",
+    "Hybrid search latency per leg (embedding, vector, keyword, combine)",
+    ("leg",)
+)
+SEARCH_ERRORS = registry.counter(
+    "policyiq_search_errors",
+    "Hybrid search legs that failed and were skipped",
+    ("leg",)
+)
+SEARCH_RESULTS = registry.histogram(
+    "policyiq_search_results",
+    "Chunks returned per hybrid search",
+    buckets=(0, 1, 2, 5, 10, 20, 50)
+)
+
+# watsonx.ai
+WATSONX_AI_SECONDS = registry.histogram(
+    "policyiq_watsonx_ai_request_duration_seconds",
+    "watsonx.ai call latency (embeddings, generation)",
+    ("operation",)
+)
+WATSONX_AI_REQUESTS = registry.counter(
+    "policyiq_watsonx_ai_requests",
+    "watsonx.ai calls by operation and outcome",
+    ("operation", "outcome")
+)
+WATSONX_AI_IN_FLIGHT = registry.gauge(
+    "policyiq_watsonx_ai_requests_in_flight",
+    "watsonx.ai calls currently in progress",
+    ("operation",)
+)
+WATSONX_AI_QUEUE_WAIT_SECONDS = registry.histogram(
+    "policyiq_watsonx_ai_queue_wait_seconds",
+    "Time generations waited for an admission slot, by priority",
+    ("priority",)
+)
+WATSONX_AI_QUEUE_DEPTH = registry.gauge(
+    "policyiq_watsonx_ai_queue_depth",
+    "Generations waiting for an admission slot, by priority",
+    ("priority",)
+)
+WATSONX_AI_ADMISSIONS = registry.counter(
+    "policyiq_watsonx_ai_admissions",
+    "Generation admission decisions by priority and outcome (admitted, timeout)",
+    ("priority", "outcome")
+)
+WATSONX_AI_RETRIES = registry.counter(
+    "policyiq_watsonx_ai_retries",
+    "watsonx.ai calls retried after a transient error or 429",
+    ("operation",)
+)
+WATSONX_AI_HEDGES = registry.counter(
+    "policyiq_watsonx_ai_hedges",
+    "Hedged watsonx.ai calls (launched, won by the hedge, skipped for lack of capacity)",
+    ("operation", "outcome")
+)
+WATSONX_AI_CIRCUIT_STATE = registry.gauge(
+    "policyiq_watsonx_ai_circuit_state",
+    "Circuit breaker state per operation (0 closed, 1 half open, 2 open)",
+    ("operation",)
+)
+WATSONX_AI_CIRCUIT_REJECTIONS = registry.counter(
+    "policyiq_watsonx_ai_circuit_rejections",
+    "watsonx.ai calls rejected without trying while the circuit was open",
+    ("operation",)
+)
+WATSONX_AI_CONCURRENCY_LIMIT = registry.gauge(
+    "policyiq_watsonx_ai_concurrency_limit",
+    "Current limit on concurrent generations (adapted from latency and 429s)"
+)
+
+# Audit log
+AUDIT_WRITE_SECONDS = registry.histogram(
+    "policyiq_audit_write_duration_seconds",
+    "Audit log write transaction latency"
+)
+AUDIT_RECORDS_WRITTEN = registry.counter(
+    "policyiq_audit_records_written",
+    "Audit records committed to the database"
+)
+AUDIT_WRITES = registry.counter(
+    "policyiq_audit_writes",
+    "Audit write transactions by outcome",
+    ("outcome",)
+)
+AUDIT_QUEUE_DEPTH = registry.gauge(
+    "policyiq_audit_queue_depth",
+    "Audit records waiting in the writer queue"
+)
+AUDIT_DEAD_LETTER_RECORDS = registry.counter(
+    "policyiq_audit_dead_letter_records",
+    "Audit records that failed to write, by outcome (spilled, replayed, quarantined, lost, rejected)",
+    ("outcome",)
+)
+AUDIT_MISSING_CHUNK_TEXTS = registry.counter(
+    "policyiq_audit_missing_chunk_texts",
+    "Audit chunk text references that could not be resolved"
+)
+AUDIT_DEAD_LETTER_PENDING = registry.gauge(
+    "policyiq_audit_dead_letter_pending",
+    "Audit records in the dead-letter file waiting to be replayed"
+)
@@ -0,0 +1,187 @@
+"""
+Statistical sampling profiler for a running worker
+
+A background thread snapshots every thread's Python stack at a fixed
+interval (sys._current_frames) for a bounded duration and counts identical
+stacks. Nothing is hooked into the profiled code, so overhead is one stack
+walk per thread per sample and stops when the run ends.
+
+Output is the collapsed-stack format read by flamegraph.pl, speedscope and
+inferno: one "frame;frame;frame count" line per distinct stack, root first.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+# Stacks through these code paths are kept with scope="hot"
+HOT_PATHS = {
+    "ReasoningLoop": os.path.join("core", "agent", "reasoning_loop.py"),
+    "TextChunker": os.path.join("core", "ingestion", "chunker.py"),
+    "PDFProcessor": os.path.join("core", "ingestion", "pdf_processor.py"),
+}
+
+# Leaf frames of threads that are waiting rather than running
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+}
+
+SCOPES = ("all", "app", "hot")
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is already running in this process"""
+
+
+class SamplingProfiler:
+    """Samples all thread stacks of the current process"""
+
+    _run_lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.01, scope: str = "all", include_idle: bool = False):
+        """
+        Args:
+            interval: Seconds between samples
+            scope: "all" stacks, "app" (through backend code) or "hot"
+                (through ReasoningLoop, TextChunker or PDFProcessor)
+            include_idle: Keep stacks of threads blocked in waits/selects
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {SCOPES}")
+        self.interval = interval
+        self.scope = scope
+        self.include_idle = include_idle
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+
+    def run(self, duration: float) -> Counter:
+        """
+        Sample for duration seconds (blocking; call from a thread)
+
+        Returns:
+            Counter of collapsed stacks (root first, ";"-joined)
+
+        Raises:
+            ProfilerBusyError: If another profile is running
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running in this process")
+
+        try:
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + duration
+            next_sample = time.monotonic()
+
+            while next_sample < deadline:
+                self._sample(own_thread)
+                self.samples += 1
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind (e.g. GIL contention): skip missed ticks
+                    next_sample = time.monotonic()
+        finally:
+            self._run_lock.release()
+
+        return self.stacks
+
+    def collapsed(self) -> str:
+        """Counted stacks in the collapsed-stack format"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _sample(self, own_thread: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+
+            codes = self._walk(frame)
+            leaf = (os.path.basename(codes[0].co_filename), codes[0].co_name)
+            if not self.include_idle and leaf in IDLE_FRAMES:
+                continue
+            if not self._in_scope(codes):
+                continue
+
+            labels = [self._label(code) for code in reversed(codes)]
+            thread_name = names.get(thread_id, str(thread_id)).replace(";", ":").replace(" ", "_")
+            self.stacks[";".join([thread_name] + labels)] += 1
+
+    @staticmethod
+    def _walk(frame) -> List[object]:
+        """Code objects from the leaf frame to the root"""
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        return codes
+
+    def _in_scope(self, codes: Iterable[object]) -> bool:
+        if self.scope == "all":
+            return True
+        for code in codes:
+            filename = code.co_filename
+            if self.scope == "app":
+                if filename.startswith(_BACKEND_DIR) and "site-packages" not in filename:
+                    return True
+            elif any(filename.endswith(path) for path in HOT_PATHS.values()):
+                return True
+        return False
+
+    def _label(self, code) -> str:
+        """module:qualified_function label for a code object (cached)"""
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(_BACKEND_DIR):
+                module = os.path.relpath(filename, _BACKEND_DIR)
+            else:
+                module = os.path.basename(filename)
+                if module == "__init__.py":
+                    module = os.path.basename(os.path.dirname(filename)) + "/" + module
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{module}:{name}".replace(";", ":").replace(" ", "_")
+            self._labels[code] = label
+        return label
+
+
+def profile(
+    duration: float,
+    interval: float = 0.01,
+    scope: str = "all",
+    include_idle: bool = False
+) -> Tuple[str, int]:
+    """
+    Profile the current process
+
+    Args:
+        duration: Seconds to sample for
+        interval: Seconds between samples
+        scope: Stack filter (see SamplingProfiler)
+        include_idle: Keep stacks of waiting threads
+
+    Returns:
+        (collapsed stacks, number of samples taken)
+    """
+    profiler = SamplingProfiler(interval=interval, scope=scope, include_idle=include_idle)
+    profiler.run(duration)
+    return profiler.collapsed(), profiler.samples
+
+
+def is_running() -> bool:
+    """Whether a profile is running in this process"""
+    return SamplingProfiler._run_lock.locked()
@@ -0,0 +1,148 @@
+"""
+Lightweight per-request tracing
+
+A trace is a flat list of timed spans (stage start offset, duration,
+attributes such as result counts or token usage) for one request. The
+active trace and span are kept in context variables, so code deep in the
+call stack (hybrid search, the watsonx.ai client) adds spans without the
+trace being passed around, and asyncio tasks and to_thread calls inherit it.
+
+Outside a trace, span() and annotate() do nothing.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import time
+import uuid
+
+from core.config import settings
+
+
+class Span:
+    """One timed stage of a trace"""
+
+    __slots__ = ("name", "parent", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional[int], start: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Add attributes (result counts, cache hits, token usage, ...)"""
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Span returned outside a trace"""
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Timeline as plain data (milliseconds relative to the trace start)
+
+        Spans still open have a null duration.
+        """
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "spans": [
+                {
+                    "id": index,
+                    "name": span.name,
+                    "parent": span.parent,
+                    "start_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": (
+                        round((span.end - span.start) * 1000, 3) if span.end is not None else None
+                    ),
+                    **({"attributes": span.attributes} if span.attributes else {}),
+                    **({"error": span.error} if span.error else {}),
+                }
+                for index, span in enumerate(self.spans)
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("policyiq_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("policyiq_span", default=None)
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Optional[Trace]]:
+    """
+    Record spans opened within the block into a new trace
+
+    Yields None when TRACING_ENABLED is off.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Time the block as a child of the current span"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, _current_span.get(), time.perf_counter(), attributes)
+    trace.spans.append(current)
+    token = _current_span.set(len(trace.spans) - 1)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def annotate(**attributes):
+    """Add attributes to the current span"""
+    trace = _current_trace.get()
+    index = _current_span.get()
+    if trace is not None and index is not None:
+        trace.spans[index].set(**attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace being recorded in this context, if any"""
+    return _current_trace.get()
@@ -2,29 +2,49 @@
 Hybrid search combining vector and keyword search
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
 from services.watsonx_data.client import WatsonxDataClient
 from services.watsonx_ai.client import WatsonxAIClient
 from core.config import settings
+from core.observability import metrics, tracing
+
+
+@contextmanager
+def _leg(name: str):
+    """Time a search leg in the metrics and in the request trace"""
+    with metrics.SEARCH_SECONDS.labels(name).time(), tracing.span(name) as span:
+        yield span
 
 
 class HybridSearch:
     """Hybrid search combining vector similarity and keyword matching"""
 
-    def __init__(self):
-        try:
-            self.data_client = WatsonxDataClient()
-        except Exception:
-            self.data_client = None
-            import warnings
-            warnings.warn("WatsonxDataClient not initialized. Search will return empty results.")
+    def __init__(
+        self,
+        data_client: Optional[WatsonxDataClient] = None,
+        ai_client: Optional[WatsonxAIClient] = None
+    ):
+        """
+        Args:
+            data_client: Shared watsonx.data client (created if not given)
+            ai_client: Shared watsonx.ai client (created if not given)
+        """
+        self.data_client = data_client
+        if self.data_client is None:
+            try:
+                self.data_client = WatsonxDataClient()
+            except Exception:
+                import warnings
+                warnings.warn("WatsonxDataClient not initialized. Search will return empty results.")
         
-        try:
-            self.ai_client = WatsonxAIClient()
-        except Exception:
-            self.ai_client = None
-            import warnings
-            warnings.warn("WatsonxAIClient not initialized. Embeddings will use fallback.")
+        self.ai_client = ai_client
+        if self.ai_client is None:
+            try:
+                self.ai_client = WatsonxAIClient()
+            except Exception:
+                import warnings
+                warnings.warn("WatsonxAIClient not initialized. Embeddings will use fallback.")
         
         self.keyword_weight = settings.KEYWORD_WEIGHT
         self.vector_weight = settings.VECTOR_WEIGHT
@@ -34,7 +54,8 @@ class HybridSearch:
     def search(
         self,
         query: str,
-        top_k: int = None
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Perform hybrid search combining vector and keyword results
@@ -42,6 +63,7 @@ class HybridSearch:
         Args:
             query: Search query
             top_k: Number of results to return
+            query_embedding: Embedding of query, if already computed (e.g. in a batch)
             
         Returns:
             List of relevant chunks with combined scores
@@ -52,38 +74,53 @@ class HybridSearch:
         if not self.data_client or not self.ai_client:
             return []
 
-        # Generate query embedding
-        try:
-            query_embedding = self.ai_client.generate_embedding(query)
-        except Exception:
-            # If embedding fails, return empty results
-            return []
-
-        # Perform vector search
-        try:
-            vector_results = self.data_client.vector_search(
-                query_embedding=query_embedding,
-                top_k=top_k * 2,  # Get more results for reranking
-                threshold=self.similarity_threshold
-            )
-        except Exception:
-            vector_results = []
-
-        # Perform keyword search
-        try:
-            keyword_results = self.data_client.keyword_search(
-                query=query,
-                top_k=top_k * 2
-            )
-        except Exception:
-            keyword_results = []
-
-        # Combine and rerank results
-        combined_results = self._combine_results(
-            vector_results,
-            keyword_results,
-            top_k
-        )
+        with tracing.span("hybrid_search", top_k=top_k) as search_span:
+            # Generate query embedding
+            try:
+                if query_embedding is None:
+                    with _leg("embedding"):
+                        query_embedding = self.ai_client.generate_embedding(query)
+                else:
+                    search_span.set(precomputed_embedding=True)
+            except Exception:
+                # If embedding fails, return empty results
+                metrics.SEARCH_ERRORS.labels("embedding").inc()
+                return []
+
+            # Perform vector search
+            try:
+                with _leg("vector") as span:
+                    vector_results = self.data_client.vector_search(
+                        query_embedding=query_embedding,
+                        top_k=top_k * 2,  # Get more results for reranking
+                        threshold=self.similarity_threshold
+                    )
+                    span.set(results=len(vector_results))
+            except Exception:
+                metrics.SEARCH_ERRORS.labels("vector").inc()
+                vector_results = []
+
+            # Perform keyword search
+            try:
+                with _leg("keyword") as span:
+                    keyword_results = self.data_client.keyword_search(
+                        query=query,
+                        top_k=top_k * 2
+                    )
+                    span.set(results=len(keyword_results))
+            except Exception:
+                metrics.SEARCH_ERRORS.labels("keyword").inc()
+                keyword_results = []
+
+            # Combine and rerank results
+            with _leg("combine"):
+                combined_results = self._combine_results(
+                    vector_results,
+                    keyword_results,
+                    top_k
+                )
+            metrics.SEARCH_RESULTS.observe(len(combined_results))
+            search_span.set(results=len(combined_results))
 
         return combined_results
 
@@ -0,0 +1,61 @@
+"""
+JSON serialization with an optional fast path
+
+Uses orjson when it is installed (several times faster than the stdlib
+json module for both encoding and decoding) and falls back to json
+otherwise. Output is compact, UTF-8 and interchangeable between the two.
+"""
+
+from typing import Any, Union
+import json
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        """Encode an object as a JSON string"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON document"""
+        return orjson.loads(data)
+
+    # Default FastAPI response class
+    FastJSONResponse = ORJSONResponse
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON bytes"""
+        return dumps(obj).encode("utf-8")
+
+    def dumps(obj: Any) -> str:
+        """Encode an object as a JSON string"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON document"""
+        return json.loads(data)
+
+    FastJSONResponse = JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    """Encode values neither library handles natively (e.g. numpy scalars, sets)"""
+    if hasattr(obj, "item"):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
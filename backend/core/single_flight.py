@@ -0,0 +1,115 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls with the same key share one execution: the first caller
+(the leader) runs the function, callers arriving while it is in flight
+wait for and receive the same result (or exception). Nothing is cached;
+once the call finishes, the next caller with that key starts a new one.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+import threading
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run func, or join the call already in flight for key
+
+        The call runs as its own task, so it completes for the other
+        callers even if the leader is cancelled (e.g. its client went away).
+        Once every caller waiting on it has been cancelled, nobody wants the
+        result and the call is cancelled too.
+
+        Args:
+            key: Identity of the call
+            func: Coroutine function to run if no call is in flight
+
+        Returns:
+            (result, shared), shared being True for callers that joined
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Abandoned: later callers start a fresh call instead of joining this one
+                    self._forget(key, task)
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent blocking calls across threads"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func, or wait for the call already in flight for key
+
+        Args:
+            key: Identity of the call
+            func: Function to run if no call is in flight
+
+        Returns:
+            (result, shared), shared being True for callers that waited
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if not shared:
+                call = self._calls[key] = _Call()
+
+        if shared:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result, shared
+
+    def in_flight(self) -> int:
+        return len(self._calls)
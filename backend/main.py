@@ -3,17 +3,42 @@ PolicyIQ FastAPI Application
 Main entry point for the backend service
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
-from api.routes import documents, questions, audit
+from api.routes import documents, questions, audit, admin
 from core.config import settings
+from core.container import container
+from core.serialization import FastJSONResponse
+from core.governance.audit_logger import get_audit_logger
+from core.governance.audit_writer import get_audit_writer
+from core.observability import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared clients and start background workers on startup; drain them on shutdown"""
+    container.start()
+    documents.init_services(container.ai_client, container.data_client)
+    documents.restore_documents()
+    documents.job_queue.start()
+    if settings.AUDIT_WRITER_ENABLED:
+        await get_audit_writer().start()
+    yield
+    documents.job_queue.stop()
+    await get_audit_writer().stop()
+    get_audit_logger().close()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Regulatory Compliance QA Agent for Banking and Finance",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware
@@ -29,6 +54,7 @@ app.add_middleware(
 app.include_router(documents.router, prefix="/api/v1/documents", tags=["Documents"])
 app.include_router(questions.router, prefix="/api/v1/questions", tags=["Questions"])
 app.include_router(audit.router, prefix="/api/v1/audit", tags=["Audit"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 
 @app.get("/")
@@ -47,6 +73,13 @@ async def health_check():
     return {"status": "healthy"}
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus metrics for this worker process"""
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
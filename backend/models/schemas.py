@@ -3,7 +3,7 @@ Pydantic schemas for request/response models
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
@@ -16,6 +16,23 @@ class DocumentStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobStatus(str, Enum):
+    """Ingestion job status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobPriority(str, Enum):
+    """Ingestion job priority"""
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
 class DocumentUpload(BaseModel):
     """Document upload request"""
     filename: str
@@ -33,6 +50,57 @@ class DocumentResponse(BaseModel):
     uploaded_at: datetime
     processed_at: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = None
+    job_id: Optional[str] = None
+
+
+class IngestionJobResponse(BaseModel):
+    """Ingestion job status response"""
+    id: str
+    document_id: str
+    kind: str
+    status: JobStatus
+    priority: JobPriority
+    attempts: int = 0
+    max_attempts: int
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class IngestionQueueStats(BaseModel):
+    """Ingestion queue depth and worker stats"""
+    workers: int
+    max_depth: int
+    depth: int
+    by_status: Dict[str, int]
+
+
+class BulkFileStatus(BaseModel):
+    """Progress of one file in a bulk ingestion batch"""
+    position: int
+    path: str
+    document_id: str
+    status: str
+    pages: int = 0
+    chunks: int = 0
+    error: Optional[str] = None
+
+
+class BulkIngestionResponse(BaseModel):
+    """Bulk ingestion batch status"""
+    id: str
+    job_id: Optional[str] = None
+    source_type: str
+    source: str
+    status: JobStatus
+    total_files: int
+    file_counts: Dict[str, int]
+    stats: Dict[str, Any]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    files: Optional[List[BulkFileStatus]] = None
 
 
 class Citation(BaseModel):
@@ -50,6 +118,15 @@ class QuestionRequest(BaseModel):
     """Question request"""
     question: str = Field(..., min_length=1, max_length=1000)
     context: Optional[Dict[str, Any]] = None
+    include_trace: bool = False
+
+
+class BatchQuestionRequest(BaseModel):
+    """Batch of questions answered together (e.g. a questionnaire)"""
+    questions: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(..., min_length=1)
+    context: Optional[Dict[str, Any]] = None  # Shared by all questions
+    max_concurrency: Optional[int] = Field(None, ge=1)  # Concurrent LLM calls, capped by the server
+    include_trace: bool = False
 
 
 class AnswerResponse(BaseModel):
@@ -60,6 +137,8 @@ class AnswerResponse(BaseModel):
     confidence_score: float = Field(..., ge=0.0, le=1.0)
     manual_review_recommended: bool = False
     reasoning_steps: Optional[List[str]] = None
+    degraded: bool = False  # Retrieval-only answer while watsonx.ai is unavailable
+    trace: Optional[Dict[str, Any]] = None  # Stage timeline, when include_trace is set
 
 
 class AuditLogEntry(BaseModel):
@@ -75,6 +154,7 @@ class AuditLogEntry(BaseModel):
     llm_response: Optional[str] = None
     retrieved_sources: List[Dict[str, Any]]
     document_versions: Dict[str, str]
+    trace: Optional[Dict[str, Any]] = None
 
 
 class AuditLogQuery(BaseModel):
@@ -83,9 +163,60 @@ class AuditLogQuery(BaseModel):
     end_date: Optional[datetime] = None
     min_confidence: Optional[float] = None
     document_id: Optional[str] = None
+    chunk_id: Optional[str] = None
     limit: int = Field(default=100, ge=1, le=1000)
 
 
+class AuditSearchResult(BaseModel):
+    """Full-text search hit"""
+    id: str
+    timestamp: datetime
+    question: str
+    answer_snippet: str
+    confidence_score: float
+    manual_review_recommended: bool
+    score: float
+
+
+class AuditSearchResponse(BaseModel):
+    """Page of full-text search results"""
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[AuditSearchResult]
+
+
+class AuditStatsSummary(BaseModel):
+    """Aggregated audit counters"""
+    bucket: Optional[str] = None
+    questions: int
+    average_confidence: Optional[float] = None
+    manual_review_rate: Optional[float] = None
+
+
+class ConfidenceBucket(BaseModel):
+    """Confidence histogram bucket"""
+    min_score: float
+    max_score: float
+    questions: int
+
+
+class DocumentCitationCount(BaseModel):
+    """Number of answers citing a document"""
+    document_id: str
+    citations: int
+
+
+class AuditStatsResponse(BaseModel):
+    """Audit analytics from the rollup tables"""
+    granularity: str
+    totals: AuditStatsSummary
+    series: List[AuditStatsSummary]
+    confidence_distribution: List[ConfidenceBucket]
+    top_documents: List[DocumentCitationCount]
+
+
 class ErrorResponse(BaseModel):
     """Error response"""
     error: str
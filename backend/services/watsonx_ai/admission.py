@@ -0,0 +1,239 @@
+"""
+Admission control for watsonx.ai generations
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from core.config import settings
+from core.observability import metrics, tracing
+
+
+# Lower value is admitted first
+PRIORITY_VALUES = {"interactive": 0, "batch": 1}
+
+
+class AdmissionTimeoutError(Exception):
+    """Raised when a call waits longer than the queue timeout for a slot"""
+
+
+class RateLimitedError(Exception):
+    """Raised by the client when watsonx.ai answers 429 Too Many Requests"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits concurrent generations, queueing the rest by priority
+
+    Every generation takes a slot for its duration. When all slots are
+    taken, callers wait in a priority queue (interactive before batch,
+    FIFO within a priority) and get AdmissionTimeoutError after
+    queue_timeout, so a burst of questions queues briefly and then sheds
+    load instead of piling requests onto watsonx.ai until they time out.
+
+    With adaptive concurrency the number of slots follows AIMD: it grows
+    by one per window of successful calls and is multiplied by
+    backoff_factor (at most once per cooldown) when watsonx.ai answers
+    429 or a call takes longer than latency_target. It stays between
+    min_in_flight and max_in_flight.
+
+    Blocking calls should go through run(), which holds the slot until the
+    worker thread finishes rather than until the caller stops waiting.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = None,
+        min_in_flight: int = None,
+        queue_timeout: float = None,
+        adaptive: bool = None,
+        latency_target: float = None,
+        backoff_factor: float = 0.5,
+        cooldown: float = 1.0
+    ):
+        self.max_in_flight = max_in_flight or settings.WATSONX_AI_MAX_IN_FLIGHT
+        self.min_in_flight = min(min_in_flight or settings.WATSONX_AI_MIN_IN_FLIGHT, self.max_in_flight)
+        self.queue_timeout = (
+            queue_timeout if queue_timeout is not None
+            else settings.WATSONX_AI_QUEUE_TIMEOUT_SECONDS
+        )
+        self.adaptive = adaptive if adaptive is not None else settings.WATSONX_AI_ADAPTIVE_CONCURRENCY
+        self.latency_target = latency_target or settings.WATSONX_AI_LATENCY_TARGET_SECONDS
+        self.backoff_factor = backoff_factor
+        self.cooldown = cooldown
+
+        self.limit = float(self.max_in_flight)
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        # Slots bound the number of running calls, so this never queues for long
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix="watsonx-generation"
+        )
+
+        metrics.WATSONX_AI_CONCURRENCY_LIMIT.set_function(lambda: int(self.limit))
+        for priority, value in PRIORITY_VALUES.items():
+            metrics.WATSONX_AI_QUEUE_DEPTH.labels(priority).set_function(
+                lambda value=value: sum(1 for waiter in self._waiters if waiter[0] == value)
+            )
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive"):
+        """
+        Hold a generation slot for the duration of the block
+
+        Only calls that finished (with a result or an error) feed the
+        adaptive limit; a cancelled call (hedge loser, client gone) says
+        nothing about watsonx.ai and its truncated latency is ignored.
+
+        Args:
+            priority: "interactive" (user-facing requests) or "batch"
+
+        Raises:
+            AdmissionTimeoutError: If no slot frees up within queue_timeout
+        """
+        await self.acquire(priority)
+        start = time.perf_counter()
+        rate_limited = cancelled = False
+        try:
+            yield
+        except RateLimitedError:
+            rate_limited = True
+            raise
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self.release(time.perf_counter() - start, rate_limited, observe=not cancelled)
+
+    async def run(self, priority: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking call on a worker thread while holding a slot
+
+        A thread can't be interrupted, so when the caller is cancelled (a
+        hedge loser, a client that went away) the request to watsonx.ai
+        keeps going. The slot is therefore released by the thread's done
+        callback, not by the caller, and the number of requests actually
+        in flight never exceeds the limit. A call cancelled before its
+        thread started is released without feeding the adaptive limit;
+        one that ran to completion reports its real latency, whether or
+        not anyone still waited for it.
+
+        Args:
+            priority: "interactive" (user-facing requests) or "batch"
+            func: Blocking function to call
+            *args: Arguments for func
+
+        Returns:
+            func's result
+
+        Raises:
+            AdmissionTimeoutError: If no slot frees up within queue_timeout
+        """
+        await self.acquire(priority)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        def finished(future: Future):
+            latency = time.perf_counter() - start
+            completed = not future.cancelled()
+            rate_limited = completed and isinstance(future.exception(), RateLimitedError)
+            try:
+                loop.call_soon_threadsafe(self.release, latency, rate_limited, completed)
+            except RuntimeError:
+                # Event loop closed (shutdown): nobody is left to admit
+                pass
+
+        try:
+            future = self._executor.submit(contextvars.copy_context().run, func, *args)
+        except BaseException:
+            self.release(0.0, False, observe=False)
+            raise
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    def has_capacity(self) -> bool:
+        """Whether a call would be admitted right now without queueing"""
+        return self.in_flight < int(self.limit) and not self._waiters
+
+    async def acquire(self, priority: str = "interactive"):
+        """Wait for a slot (see slot())"""
+        value = PRIORITY_VALUES[priority]
+        start = time.perf_counter()
+
+        # Admit immediately only if nobody at the same or a higher priority is waiting
+        if self.in_flight < int(self.limit) and not any(waiter[0] <= value for waiter in self._waiters):
+            self.in_flight += 1
+            self._observe_wait(priority, start)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (value, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the timeout fired: give the slot back
+                self.release(0.0, False, observe=False)
+            else:
+                self._remove(entry, future)
+            metrics.WATSONX_AI_ADMISSIONS.labels(priority, "timeout").inc()
+            raise AdmissionTimeoutError(
+                f"watsonx.ai is at capacity ({int(self.limit)} generations in flight); "
+                f"no slot freed up within {self.queue_timeout:g}s"
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(0.0, False, observe=False)
+            else:
+                self._remove(entry, future)
+            raise
+        self._observe_wait(priority, start)
+
+    def release(self, latency: float, rate_limited: bool, observe: bool = True):
+        """Free a slot, adjust the limit from the call's outcome and admit waiters"""
+        self.in_flight -= 1
+        if self.adaptive and observe:
+            self._adjust(latency, rate_limited)
+
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _adjust(self, latency: float, rate_limited: bool):
+        now = time.monotonic()
+        if rate_limited or latency > self.latency_target:
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(float(self.min_in_flight), self.limit * self.backoff_factor)
+        else:
+            # Additive increase: about one slot per limit's worth of successful calls
+            self.limit = min(float(self.max_in_flight), self.limit + 1 / self.limit)
+
+    def _remove(self, entry: Tuple[int, int, asyncio.Future], future: asyncio.Future):
+        future.cancel()
+        try:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+
+    def _observe_wait(self, priority: str, start: float):
+        waited = time.perf_counter() - start
+        metrics.WATSONX_AI_QUEUE_WAIT_SECONDS.labels(priority).observe(waited)
+        metrics.WATSONX_AI_ADMISSIONS.labels(priority, "admitted").inc()
+        tracing.annotate(queue_wait_ms=round(waited * 1000, 3), priority=priority)
@@ -2,11 +2,30 @@
 IBM watsonx.ai client for LLM interactions
 """
 
-from ibm_watson_machine_learning import APIClient
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
 from typing import Dict, Any, List, Optional
-import json
+import functools
+import threading
+import time
 from core.config import settings
+from core.observability import metrics, tracing
+from core.single_flight import SingleFlight
+from services.watsonx_ai.admission import AdmissionController, RateLimitedError
+from services.watsonx_ai.resilience import ResilientCaller, TransientServiceError
+
+
+def _instrumented(operation: str):
+    """Record latency, outcome and in-flight count of a watsonx.ai call, and trace it"""
+    def decorator(func):
+        histogram = metrics.WATSONX_AI_SECONDS.labels(operation)
+        in_flight = metrics.WATSONX_AI_IN_FLIGHT.labels(operation)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.track(histogram, metrics.WATSONX_AI_REQUESTS, in_flight, (operation,)), \
+                    tracing.span(f"watsonx_ai.{operation}"):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class WatsonxAIClient:
@@ -17,29 +36,67 @@ class WatsonxAIClient:
         self.url = settings.WATSONX_AI_URL
         self.project_id = settings.WATSONX_AI_PROJECT_ID
         self.model = settings.WATSONX_AI_MODEL
+        self.iam_url = settings.WATSONX_AI_IAM_URL
+        self.use_sdk = settings.WATSONX_AI_USE_SDK
         
-        # Initialize client only if credentials are available
-        self.client = None
+        # The SDK client is created on first use: importing the SDK is slow
+        # and connecting to it makes network calls
+        self._client = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
         self._use_direct_api = False  # Flag to use direct API instead of SDK
+        self._local_embedding_model = None  # sentence-transformers fallback
+        self._local_embedding_lock = threading.Lock()
         
-        if self.api_key and self.project_id:
-            try:
-                # Try to initialize WML client
-                # Note: Some versions have threading issues, so we'll use direct API as fallback
-                authenticator = IAMAuthenticator(self.api_key)
-                
-                # Initialize WML client
-                self.client = APIClient({
-                    "url": self.url,
-                    "authenticator": authenticator
-                })
-                self.client.set.default_project(self.project_id)
-            except Exception as e:
-                # If SDK fails, we'll use direct REST API calls
-                import warnings
-                warnings.warn(f"SDK initialization failed, will use direct API: {str(e)}")
-                self.client = None
+        # IAM bearer token, reused until shortly before it expires
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+        
+        # Shared limit on concurrent generations (async callers)
+        self.admission = AdmissionController()
+        
+        # Retries, hedging and circuit breakers per operation
+        # (hedges only when a generation slot is free, so they never queue)
+        self.generation_calls = ResilientCaller("generation", hedge_gate=self.admission.has_capacity)
+        self.embedding_calls = ResilientCaller("embeddings", hedge=False)
+        
+        # Concurrent requests to embed the same text share one call
+        self._embedding_flight = SingleFlight()
+
+    @property
+    def client(self):
+        """WML SDK client, or None if it is unavailable (direct API is used then)"""
+        if self._client_initialized:
+            return self._client
+        
+        with self._client_lock:
+            if self._client_initialized:
+                return self._client
+            self._client_initialized = True
+            if not self.use_sdk:
                 self._use_direct_api = True
+            elif self.api_key and self.project_id:
+                try:
+                    # Note: Some versions have threading issues, so we'll use direct API as fallback
+                    from ibm_watson_machine_learning import APIClient
+                    from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+                    
+                    authenticator = IAMAuthenticator(self.api_key)
+                    
+                    # Initialize WML client
+                    client = APIClient({
+                        "url": self.url,
+                        "authenticator": authenticator
+                    })
+                    client.set.default_project(self.project_id)
+                    self._client = client
+                except Exception as e:
+                    # If SDK fails, we'll use direct REST API calls
+                    import warnings
+                    warnings.warn(f"SDK initialization failed, will use direct API: {str(e)}")
+                    self._use_direct_api = True
+            return self._client
 
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -51,46 +108,95 @@ class WatsonxAIClient:
         Returns:
             Embedding vector
         """
-        # Note: This is a placeholder. Actual implementation depends on
-        # watsonx.ai embedding API. You may need to use a different approach
-        # or use sentence-transformers as a fallback.
-        try:
-            # Example API call structure (adjust based on actual API)
-            payload = {
-                "model_id": settings.EMBEDDING_MODEL,
-                "inputs": [text],
-                "parameters": {}
-            }
+        if not settings.COALESCE_EMBEDDINGS:
+            return self.generate_embeddings([text])[0]
+        
+        embedding, shared = self._embedding_flight.do(text, lambda: self.generate_embeddings([text])[0])
+        if shared:
+            metrics.COALESCED_REQUESTS.labels("embedding").inc()
+            tracing.annotate(coalesced=True)
+        return embedding
+
+    @_instrumented("embeddings")
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a batch of texts in one call
+        
+        Args:
+            texts: Texts to embed
             
-            # This would be the actual API call
-            # response = self.client.deployments.score(...)
-            # For now, return placeholder
-            raise NotImplementedError(
-                "Embedding generation needs to be implemented based on "
-                "actual watsonx.ai embedding API"
-            )
-        except (NotImplementedError, Exception) as e:
-            # Fallback to sentence-transformers if available
+        Returns:
+            Embedding vectors, in the same order as texts
+        """
+        if not texts:
+            return []
+
+        if settings.EMBEDDING_BACKEND == "watsonx":
+            # No silent fallback: local vectors don't match stored watsonx ones
+            return self._generate_remote_embeddings(texts)
+        
+        # Local sentence-transformers model
+        model = self._get_local_embedding_model()
+        if model is None:
+            # Return dummy embedding vectors
+            tracing.annotate(texts=len(texts), backend="dummy")
+            return [[0.0] * settings.EMBEDDING_DIMENSION for _ in texts]
+        tracing.annotate(texts=len(texts), backend="local")
+        return model.encode(texts).tolist()
+
+    def _generate_remote_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the watsonx.ai embeddings REST API (retried on transient errors)"""
+        self._require_credentials()
+        
+        payload = {
+            "model_id": settings.EMBEDDING_MODEL,
+            "inputs": texts,
+            "project_id": self.project_id
+        }
+        
+        def call():
+            with tracing.span("text_embeddings"):
+                return self._post(
+                    f"{self._api_base_url()}/text/embeddings?version=2023-10-25",
+                    json=payload,
+                    headers=self._auth_headers()
+                )
+        
+        response = self.embedding_calls.call_sync(call)
+        tracing.annotate(texts=len(texts), backend="watsonx", model=settings.EMBEDDING_MODEL)
+        return [result["embedding"] for result in response.json()["results"]]
+
+    def _get_local_embedding_model(self):
+        """Load the sentence-transformers fallback model once per client"""
+        if self._local_embedding_model is not None:
+            return self._local_embedding_model
+
+        with self._local_embedding_lock:
+            # Concurrent first calls load the model once
+            if self._local_embedding_model is not None:
+                return self._local_embedding_model
+
             try:
                 from sentence_transformers import SentenceTransformer
-                # Use a default model if the configured one fails
-                try:
-                    model = SentenceTransformer(settings.EMBEDDING_MODEL)
-                except Exception:
-                    # Fallback to a common model
-                    model = SentenceTransformer('all-MiniLM-L6-v2')
-                return model.encode(text).tolist()
             except ImportError:
-                # If sentence-transformers is not available, return a dummy embedding
+                # If sentence-transformers is not available, use dummy embeddings
                 # This allows the code to run but embeddings won't work properly
                 import warnings
                 warnings.warn(
                     "sentence-transformers not available. Using dummy embeddings. "
                     "Install with: pip install sentence-transformers"
                 )
-                # Return a dummy embedding vector
-                return [0.0] * settings.EMBEDDING_DIMENSION
+                return None
+
+            # Use a default model if the configured one fails
+            try:
+                self._local_embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+            except Exception:
+                # Fallback to a common model
+                self._local_embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            return self._local_embedding_model
 
+    @_instrumented("generation")
     def generate_completion(
         self,
         prompt: str,
@@ -111,14 +217,7 @@ class WatsonxAIClient:
             Dictionary with generated text and metadata
         """
         # Check if we have credentials (even if SDK client failed, we can use direct API)
-        if not self.api_key or not self.project_id:
-            error_msg = "watsonx.ai credentials missing. "
-            if not self.api_key:
-                error_msg += "WATSONX_AI_API_KEY is missing in .env file. "
-            if not self.project_id:
-                error_msg += "WATSONX_AI_PROJECT_ID is missing in .env file. "
-            error_msg += "Run 'python test_credentials.py' to diagnose."
-            raise Exception(error_msg)
+        self._require_credentials()
         
         try:
             # Construct the prompt
@@ -135,10 +234,6 @@ class WatsonxAIClient:
                 "repetition_penalty": 1.1
             }
 
-            # Use watsonx.ai foundation models API
-            # Use direct REST API (more reliable than SDK)
-            import requests
-            
             # Skip SDK if we had initialization issues or prefer direct API
             use_direct_api = self._use_direct_api or not self.client
             
@@ -173,14 +268,18 @@ class WatsonxAIClient:
                     else:
                         generated_text = str(response)
                     
+                    usage = {
+                        "prompt_tokens": len(full_prompt.split()),
+                        "completion_tokens": len(generated_text.split()),
+                        "total_tokens": len(full_prompt.split()) + len(generated_text.split())
+                    }
+                    tracing.annotate(backend="sdk", model=self.model, usage=usage)
+                    
                     return {
                         "text": generated_text,
                         "model": self.model,
-                        "usage": {
-                            "prompt_tokens": len(full_prompt.split()),
-                            "completion_tokens": len(generated_text.split()),
-                            "total_tokens": len(full_prompt.split()) + len(generated_text.split())
-                        }
+                        "prompt": full_prompt,
+                        "usage": usage
                     }
                 except (ImportError, AttributeError, Exception) as sdk_error:
                     # Fall through to direct API
@@ -189,48 +288,9 @@ class WatsonxAIClient:
             
             if use_direct_api:
                 # Fallback: Use direct REST API call
-                import requests
-                
                 try:
-                    # Get IAM token - use standard IAM endpoint
-                    token_url = "https://iam.cloud.ibm.com/identity/token"
-                    token_data = {
-                        "apikey": self.api_key,
-                        "grant_type": "urn:ibm:params:oauth:grant-type:apikey"
-                    }
-                    
-                    token_response = requests.post(
-                        token_url,
-                        data=token_data,
-                        headers={"Content-Type": "application/x-www-form-urlencoded"},
-                        timeout=10
-                    )
-                    
-                    if token_response.status_code != 200:
-                        error_data = token_response.json() if token_response.headers.get('content-type', '').startswith('application/json') else {}
-                        error_msg = error_data.get("errorMessage", f"HTTP {token_response.status_code}")
-                        raise Exception(f"API key validation failed: {error_msg}. Please check your API key in .env file.")
-                    
-                    token = token_response.json().get("access_token")
-                    
-                    if not token:
-                        raise Exception("Failed to get access token from response")
-                    
-                    # Call foundation models API
-                    # Construct the correct endpoint URL
-                    # Format: https://{region}.ml.cloud.ibm.com/ml/v1/text/generation
-                    if "/ml/v1" not in self.url:
-                        # Add /ml/v1 if not present
-                        base_url = self.url.rstrip('/') + "/ml/v1"
-                    else:
-                        base_url = self.url.rstrip('/')
-                    
-                    api_url = f"{base_url}/text/generation?version=2023-05-29"
-                    
-                    headers = {
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json"
-                    }
+                    api_url = f"{self._api_base_url()}/text/generation?version=2023-05-29"
+                    headers = self._auth_headers()
                     
                     payload = {
                         "model_id": self.model,
@@ -239,22 +299,28 @@ class WatsonxAIClient:
                         "project_id": self.project_id
                     }
                     
-                    api_response = requests.post(api_url, json=payload, headers=headers, timeout=30)
-                    api_response.raise_for_status()
+                    with tracing.span("text_generation"):
+                        api_response = self._post(api_url, json=payload, headers=headers)
                     result = api_response.json()
                     
                     generated_text = result.get("results", [{}])[0].get("generated_text", "")
                     
+                    usage = result.get("usage", {
+                        "prompt_tokens": len(full_prompt.split()),
+                        "completion_tokens": len(generated_text.split()),
+                        "total_tokens": len(full_prompt.split()) + len(generated_text.split())
+                    })
+                    tracing.annotate(backend="rest", model=self.model, usage=usage)
+                    
                     return {
                         "text": generated_text,
                         "model": self.model,
-                        "usage": result.get("usage", {
-                            "prompt_tokens": len(full_prompt.split()),
-                            "completion_tokens": len(generated_text.split()),
-                            "total_tokens": len(full_prompt.split()) + len(generated_text.split())
-                        })
+                        "prompt": full_prompt,
+                        "usage": usage
                     }
                     
+                except (RateLimitedError, TransientServiceError):
+                    raise
                 except Exception as api_error:
                     # If both methods fail, raise with helpful error
                     error_msg = f"API error: {str(api_error)}"
@@ -262,9 +328,116 @@ class WatsonxAIClient:
                         error_msg = f"SDK error: {sdk_error_msg}. {error_msg}"
                     raise Exception(f"Failed to generate completion: {error_msg}")
                 
+        except (RateLimitedError, TransientServiceError):
+            raise
         except Exception as e:
             raise Exception(f"Error generating completion: {str(e)}")
 
+    def _require_credentials(self):
+        """Raise if the API key or project ID is missing"""
+        if not self.api_key or not self.project_id:
+            error_msg = "watsonx.ai credentials missing. "
+            if not self.api_key:
+                error_msg += "WATSONX_AI_API_KEY is missing in .env file. "
+            if not self.project_id:
+                error_msg += "WATSONX_AI_PROJECT_ID is missing in .env file. "
+            error_msg += "Run 'python test_credentials.py' to diagnose."
+            raise Exception(error_msg)
+
+    def _api_base_url(self) -> str:
+        """Foundation models API root, e.g. https://us-south.ml.cloud.ibm.com/ml/v1"""
+        if "/ml/v1" not in self.url:
+            return self.url.rstrip('/') + "/ml/v1"
+        return self.url.rstrip('/')
+
+    def _auth_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self._get_token()}",
+            "Content-Type": "application/json"
+        }
+
+    def _get_token(self) -> str:
+        """
+        IAM bearer token for the API key
+        
+        Tokens are cached and refreshed a minute before they expire, instead
+        of exchanging the API key on every call.
+        
+        Raises:
+            TransientServiceError: If IAM times out, is unreachable or returns a 5xx
+        """
+        if self._token and time.time() < self._token_expires_at:
+            tracing.annotate(token_cached=True)
+            return self._token
+        
+        import requests
+        
+        with self._token_lock:
+            if self._token and time.time() < self._token_expires_at:
+                return self._token
+            
+            try:
+                with tracing.span("iam_token"):
+                    token_response = requests.post(
+                        self.iam_url,
+                        data={
+                            "apikey": self.api_key,
+                            "grant_type": "urn:ibm:params:oauth:grant-type:apikey"
+                        },
+                        headers={"Content-Type": "application/x-www-form-urlencoded"},
+                        timeout=10
+                    )
+            except (requests.Timeout, requests.ConnectionError) as e:
+                raise TransientServiceError(f"IAM token request failed: {str(e)}") from e
+            
+            if token_response.status_code >= 500:
+                raise TransientServiceError(f"IAM returned HTTP {token_response.status_code}")
+            if token_response.status_code != 200:
+                error_data = token_response.json() if token_response.headers.get('content-type', '').startswith('application/json') else {}
+                error_msg = error_data.get("errorMessage", f"HTTP {token_response.status_code}")
+                raise Exception(f"API key validation failed: {error_msg}. Please check your API key in .env file.")
+            
+            token_data = token_response.json()
+            token = token_data.get("access_token")
+            if not token:
+                raise Exception("Failed to get access token from response")
+            
+            expires_in = token_data.get("expires_in", 3600)
+            self._token = token
+            self._token_expires_at = time.time() + max(expires_in - 60, expires_in / 2)
+            return token
+
+    def _post(self, url: str, **kwargs):
+        """
+        POST with the configured timeout, raising for HTTP errors
+        
+        Timeouts, connection errors and 5xx responses raise
+        TransientServiceError and 429 raises RateLimitedError, so callers
+        can retry them.
+        """
+        import requests
+        
+        try:
+            response = requests.post(url, timeout=settings.WATSONX_AI_TIMEOUT_SECONDS, **kwargs)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise TransientServiceError(f"watsonx.ai request failed: {str(e)}") from e
+        self._check_response(response)
+        return response
+
+    def _check_response(self, response):
+        """Raise for HTTP errors, dropping the cached token if it was rejected"""
+        if response.status_code == 401:
+            self._token = None
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitedError(
+                "watsonx.ai rate limit exceeded",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        if response.status_code >= 500:
+            raise TransientServiceError(f"watsonx.ai returned HTTP {response.status_code}")
+        response.raise_for_status()
+
     def generate_with_context(
         self,
         question: str,
@@ -308,6 +481,45 @@ Answer:"""
             temperature=0.1
         )
 
+    async def agenerate_with_context(
+        self,
+        question: str,
+        context: List[str],
+        system_prompt: Optional[str] = None,
+        priority: str = "interactive"
+    ) -> Dict[str, Any]:
+        """
+        generate_with_context for async callers, under admission control
+        
+        Waits for a generation slot (see AdmissionController), then runs
+        the blocking call on a worker thread so the event loop keeps
+        serving other requests. Transient failures are retried (and slow
+        calls hedged) as configured in ResilientCaller.
+        
+        Args:
+            question: User question
+            context: Retrieved context chunks
+            system_prompt: Optional system prompt
+            priority: "interactive" or "batch"
+            
+        Returns:
+            Generated response with metadata
+            
+        Raises:
+            AdmissionTimeoutError: If no slot frees up within the queue timeout
+            CircuitOpenError: If generation is failing and the circuit is open
+            RateLimitedError: If watsonx.ai still answers 429 after retries
+            TransientServiceError: If the call still fails after retries
+        """
+        async def attempt():
+            # Each attempt (and hedge) takes its own slot, held until its thread
+            # finishes, so retries see the current limit
+            return await self.admission.run(
+                priority, self.generate_with_context, question, context, system_prompt
+            )
+        
+        return await self.generation_calls.call(attempt)
+
     def _get_default_system_prompt(self) -> str:
         """Get default system prompt for compliance QA"""
         return """You are PolicyIQ, an expert regulatory compliance assistant for banking and finance.
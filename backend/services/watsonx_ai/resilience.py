@@ -0,0 +1,285 @@
+"""
+Retries, hedging and circuit breaking for watsonx.ai calls
+"""
+
+from typing import Any, Awaitable, Callable, Deque, Optional
+from collections import deque
+import asyncio
+import random
+import threading
+import time
+from core.config import settings
+from core.observability import metrics, tracing
+from services.watsonx_ai.admission import RateLimitedError
+
+
+class TransientServiceError(Exception):
+    """Raised by the client for failures worth retrying (5xx, timeouts, connection errors)"""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling watsonx.ai while the circuit breaker is open"""
+
+
+RETRYABLE_ERRORS = (TransientServiceError, RateLimitedError)
+
+# Circuit states, as exported in the circuit state gauge
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a service is degraded
+
+    After failure_threshold consecutive failed calls the circuit opens and
+    calls are rejected with CircuitOpenError for reset_timeout seconds.
+    Then one trial call is let through (half open): success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, operation: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.operation = operation
+        self.failure_threshold = failure_threshold or settings.WATSONX_AI_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = (
+            reset_timeout if reset_timeout is not None
+            else settings.WATSONX_AI_BREAKER_RESET_SECONDS
+        )
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        metrics.WATSONX_AI_CIRCUIT_STATE.labels(operation).set_function(lambda: self.state)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        metrics.WATSONX_AI_CIRCUIT_REJECTIONS.labels(self.operation).inc()
+        raise CircuitOpenError(
+            f"watsonx.ai {self.operation} is unavailable after {self.failures} consecutive failures; "
+            f"retrying in {self.retry_in():.0f}s"
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Let another trial through after one ended without a verdict on the service"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for the hedging delay"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency at fraction (0..1), or None until min_samples calls were seen"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ResilientCaller:
+    """
+    Wraps idempotent watsonx.ai calls with retries, hedging and a circuit breaker
+
+    - retries: RETRYABLE_ERRORS are retried up to max_attempts times with
+      exponential backoff and full jitter, never sooner than a 429's
+      Retry-After; delays are capped at max_delay, and an error whose
+      Retry-After is longer than that is raised instead of retried
+    - hedging (async calls only, off by default): if a call has not
+      finished after the hedge_percentile latency of recent calls, a second
+      identical call is started (if hedge_gate allows) and the first
+      result wins
+    - circuit breaker: calls that still fail after their retries count as
+      failures; while the circuit is open, calls raise CircuitOpenError
+      immediately
+
+    Other errors (bad requests, admission timeouts) are raised as they are
+    and don't count against the circuit.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        max_attempts: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+        hedge: bool = None,
+        hedge_percentile: float = None,
+        hedge_min_delay: float = None,
+        hedge_gate: Optional[Callable[[], bool]] = None,
+        breaker: CircuitBreaker = None
+    ):
+        self.operation = operation
+        self.max_attempts = max_attempts or settings.WATSONX_AI_RETRY_ATTEMPTS
+        self.base_delay = (
+            base_delay if base_delay is not None
+            else settings.WATSONX_AI_RETRY_BASE_DELAY_SECONDS
+        )
+        self.max_delay = max_delay or settings.WATSONX_AI_RETRY_MAX_DELAY_SECONDS
+        self.hedge = hedge if hedge is not None else settings.WATSONX_AI_HEDGE_ENABLED
+        self.hedge_percentile = hedge_percentile or settings.WATSONX_AI_HEDGE_PERCENTILE
+        self.hedge_min_delay = (
+            hedge_min_delay if hedge_min_delay is not None
+            else settings.WATSONX_AI_HEDGE_MIN_DELAY_SECONDS
+        )
+        self.hedge_gate = hedge_gate
+        self.breaker = breaker or CircuitBreaker(operation)
+        self.latencies = LatencyTracker()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before retry number attempt (1-based): full jitter, at least Retry-After, at most max_delay"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return min(max(delay, self._retry_after(error)), self.max_delay)
+
+    def should_retry(self, attempt: int, error: Exception) -> bool:
+        """Whether a failed attempt is retried: attempts remain and Retry-After fits in max_delay"""
+        return attempt < self.max_attempts and self._retry_after(error) <= self.max_delay
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        return getattr(error, "retry_after", None) or 0.0
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an async, idempotent call
+
+        Args:
+            func: Coroutine function making one attempt
+
+        Returns:
+            The first successful attempt's result
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        self.breaker.before_call()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = await self._attempt(func)
+            except RETRYABLE_ERRORS as e:
+                if not self.should_retry(attempt, e):
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(self._before_retry(attempt, e))
+            except BaseException:
+                # Not the service's fault (bad request, admission timeout, cancellation)
+                self.breaker.release_trial()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def call_sync(self, func: Callable[[], Any]) -> Any:
+        """Run a blocking, idempotent call with retries (no hedging); see call()"""
+        self.breaker.before_call()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                start = time.perf_counter()
+                result = func()
+            except RETRYABLE_ERRORS as e:
+                if not self.should_retry(attempt, e):
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self._before_retry(attempt, e))
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            else:
+                self.latencies.observe(time.perf_counter() - start)
+                self.breaker.record_success()
+                return result
+
+    def _before_retry(self, attempt: int, error: Exception) -> float:
+        delay = self.backoff(attempt, error)
+        metrics.WATSONX_AI_RETRIES.labels(self.operation).inc()
+        tracing.annotate(retries=attempt, last_error=type(error).__name__)
+        return delay
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off or not warmed up"""
+        if not self.hedge or self.breaker.state != CLOSED:
+            return None
+        threshold = self.latencies.percentile(self.hedge_percentile)
+        return None if threshold is None else max(self.hedge_min_delay, threshold)
+
+    async def _attempt(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """One attempt, hedged with a second identical call if it runs long"""
+        start = time.perf_counter()
+        delay = self.hedge_delay()
+        if delay is None:
+            result = await func()
+            self.latencies.observe(time.perf_counter() - start)
+            return result
+
+        primary = asyncio.ensure_future(func())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                self.latencies.observe(time.perf_counter() - start)
+                return primary.result()
+            if self.hedge_gate and not self.hedge_gate():
+                # No spare capacity: a hedge would only add load
+                metrics.WATSONX_AI_HEDGES.labels(self.operation, "skipped").inc()
+                result = await primary
+                self.latencies.observe(time.perf_counter() - start)
+                return result
+
+            metrics.WATSONX_AI_HEDGES.labels(self.operation, "launched").inc()
+            tracing.annotate(hedged=True)
+            hedge = asyncio.ensure_future(func())
+            tasks.append(hedge)
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.WATSONX_AI_HEDGES.labels(self.operation, "won").inc()
+                        self.latencies.observe(time.perf_counter() - start)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # Unfinished calls are cancelled however this attempt ends (including
+            # when the caller is cancelled while waiting). A losing call's thread
+            # finishes in the background, still holding its admission slot (see
+            # AdmissionController.run); its result is dropped
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
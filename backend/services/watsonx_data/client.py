@@ -2,23 +2,150 @@
 IBM watsonx.data client for vector storage and retrieval
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+from array import array
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
 import json
+import sys
+import threading
+import uuid
 from core.config import settings
 
 
+def pack_embedding(embedding: List[float]) -> bytes:
+    """Serialize an embedding as little-endian float32 bytes"""
+    values = array("f", embedding)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    """Deserialize an embedding written by pack_embedding"""
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+CHUNK_COLUMNS = (
+    "chunk_id", "document_id", "chunk_index", "text",
+    "embedding", "metadata", "created_at"
+)
+
+# Bulk loads in progress per database, so the index is dropped by the first
+# and rebuilt by the last (shared by all clients in the process)
+_bulk_loads: Dict[str, int] = {}
+_bulk_loads_lock = threading.Lock()
+
+
 class WatsonxDataClient:
     """Client for interacting with IBM watsonx.data"""
 
-    def __init__(self):
+    def __init__(self, connection_factory: Optional[Callable[[], Any]] = None):
         self.url = settings.WATSONX_DATA_URL
         self.username = settings.WATSONX_DATA_USERNAME
         self.password = settings.WATSONX_DATA_PASSWORD
         self.database = settings.WATSONX_DATA_DATABASE
+        self.insert_batch_rows = settings.WATSONX_DATA_INSERT_BATCH_ROWS
         
-        # Initialize connection (placeholder - adjust based on actual API)
-        # This would typically use a JDBC/ODBC connection or REST API
-        self.connection = None
+        # DB-API connections, one per thread, opened on first use. watsonx.data
+        # is reached through its Presto engine; a sqlite:/// URL (or an
+        # explicit factory) gives a local stand-in with the same schema.
+        self._connection_factory = connection_factory or self._default_connection_factory()
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._placeholder = "?"
+        self._dialect = "sqlite" if (self.url or "").startswith("sqlite:") else "presto"
+
+    @property
+    def connection(self):
+        """This thread's connection, if one has been opened"""
+        return getattr(self._local, "connection", None)
+
+    def _default_connection_factory(self) -> Optional[Callable[[], Any]]:
+        """Pick a DB-API driver from WATSONX_DATA_URL"""
+        if not self.url:
+            return None
+
+        if self.url.startswith("sqlite:"):
+            import sqlite3
+            path = self.url.split("sqlite:///", 1)[-1]
+            return lambda: sqlite3.connect(path, timeout=30)
+
+        def connect_presto():
+            # Optional dependency: pip install presto-python-client
+            import prestodb
+
+            parsed = urlparse(self.url)
+            return prestodb.dbapi.connect(
+                host=parsed.hostname,
+                port=parsed.port or 443,
+                user=self.username,
+                catalog=settings.WATSONX_DATA_CATALOG,
+                schema=self.database,
+                http_scheme=parsed.scheme or "https",
+                auth=prestodb.auth.BasicAuthentication(self.username, self.password),
+            )
+
+        return connect_presto
+
+    def _get_connection(self):
+        """Open the connection and create tables on first use"""
+        if self.connection is None and self._connection_factory:
+            connection = self._connection_factory()
+            driver_name = type(connection).__module__.split(".")[0]
+            if getattr(sys.modules.get(driver_name), "paramstyle", "qmark") in ("format", "pyformat"):
+                self._placeholder = "%s"
+            if driver_name == "sqlite3":
+                self._dialect = "sqlite"
+            self._local.connection = connection
+
+        if self.connection is not None and not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_tables()
+                    self._schema_ready = True
+
+        return self.connection
+
+    def _create_tables(self):
+        """
+        Create the chunk table and its staging table
+
+        Both carry the load_id that wrote each row, which identifies the
+        version of a document in document_chunks (see commit_document).
+        """
+        cursor = self.connection.cursor()
+        for table in ("document_chunks", "document_chunks_staging"):
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    chunk_id VARCHAR,
+                    document_id VARCHAR,
+                    chunk_index INTEGER,
+                    text VARCHAR,
+                    embedding VARBINARY,
+                    metadata VARCHAR,
+                    created_at VARCHAR,
+                    load_id VARCHAR
+                )
+            """)
+        self.connection.commit()
+
+        # Tables created before versioning lack load_id
+        try:
+            self._execute("SELECT load_id FROM document_chunks WHERE 1 = 0", []).fetchall()
+        except Exception:
+            self.connection.rollback()
+            self._execute("ALTER TABLE document_chunks ADD COLUMN load_id VARCHAR", [])
+            self.connection.commit()
+
+        # A bulk load in progress rebuilds the index when it ends
+        if not _bulk_loads.get(self.url):
+            self.build_index()
 
     def store_chunks(
         self,
@@ -28,6 +155,10 @@ class WatsonxDataClient:
         """
         Store document chunks with embeddings in watsonx.data
         
+        Chunks are bulk-inserted into a staging table and each document is
+        then published in one transaction, so searches never see a partially
+        stored document.
+        
         Args:
             chunks: List of chunk dictionaries
             embeddings: List of embedding vectors
@@ -35,33 +166,196 @@ class WatsonxDataClient:
         Returns:
             True if successful
         """
-        # Placeholder implementation
-        # Actual implementation would:
-        # 1. Create table if not exists
-        # 2. Insert chunks with embeddings
-        # 3. Create vector index for similarity search
-        
         try:
-            # Example structure (adjust based on actual API):
-            # CREATE TABLE IF NOT EXISTS document_chunks (
-            #     chunk_id VARCHAR PRIMARY KEY,
-            #     document_id VARCHAR,
-            #     text TEXT,
-            #     embedding VECTOR,
-            #     metadata JSON,
-            #     created_at TIMESTAMP
-            # )
-            
-            # For each chunk:
-            # INSERT INTO document_chunks VALUES (...)
-            
-            # Create vector index:
-            # CREATE VECTOR INDEX chunk_embedding_idx ON document_chunks(embedding)
+            if not self._get_connection():
+                # Not configured, nothing to store into
+                return True
+
+            load_id = self.begin_load()
+            try:
+                self.stage_chunks(load_id, chunks, embeddings)
+                for document_id in dict.fromkeys(chunk["document_id"] for chunk in chunks):
+                    self.commit_document(load_id, document_id)
+            finally:
+                self.abort_load(load_id)
             
             return True
         except Exception as e:
             raise Exception(f"Error storing chunks: {str(e)}")
 
+    def begin_load(self) -> str:
+        """
+        Start a load and return its ID
+
+        Staged rows left behind by loads older than a day (e.g. a crashed
+        worker) are purged.
+        """
+        if self._get_connection():
+            cutoff = (datetime.now() - timedelta(days=1)).isoformat()
+            self._execute(
+                f"DELETE FROM document_chunks_staging WHERE created_at < {self._placeholder}",
+                [cutoff]
+            )
+            self.connection.commit()
+        return str(uuid.uuid4())
+
+    def stage_chunks(
+        self,
+        load_id: str,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ):
+        """
+        Bulk-insert chunks into the staging table with multi-row INSERTs
+
+        Args:
+            load_id: Load the rows belong to
+            chunks: Chunk dictionaries, possibly from several documents
+            embeddings: Embedding vectors, stored as packed float32
+        """
+        if not chunks or not self._get_connection():
+            return
+
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                chunk["chunk_id"],
+                chunk["document_id"],
+                chunk.get("chunk_index", 0),
+                chunk["text"],
+                pack_embedding(embedding),
+                json.dumps(chunk.get("metadata") or {}, default=str),
+                now,
+                load_id,
+            )
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+        row_sql = "(" + ", ".join([self._placeholder] * 8) + ")"
+        for start in range(0, len(rows), self.insert_batch_rows):
+            batch = rows[start:start + self.insert_batch_rows]
+            self._execute(
+                f"INSERT INTO document_chunks_staging ({', '.join(CHUNK_COLUMNS)}, load_id) "
+                f"VALUES {', '.join([row_sql] * len(batch))}",
+                [value for row in batch for value in row]
+            )
+        self.connection.commit()
+
+    def commit_document(self, load_id: str, document_id: str):
+        """
+        Publish a staged document, replacing any previously stored version
+
+        The new version (rows tagged with load_id) is inserted before the
+        old versions are deleted. On SQLite this runs as one transaction.
+        The Presto connection autocommits every statement and the Iceberg
+        connector has no multi-statement transactions, so there a failure
+        between the statements leaves the document with both versions
+        (never with none) until it is committed again, which deletes every
+        version but the new one.
+        """
+        if not self._get_connection():
+            return
+
+        p = self._placeholder
+        columns = ", ".join(CHUNK_COLUMNS + ("load_id",))
+        try:
+            self._execute(
+                f"INSERT INTO document_chunks ({columns}) "
+                f"SELECT {columns} FROM document_chunks_staging "
+                f"WHERE load_id = {p} AND document_id = {p} ORDER BY chunk_index",
+                [load_id, document_id]
+            )
+            self._execute(
+                f"DELETE FROM document_chunks WHERE document_id = {p} "
+                f"AND (load_id IS NULL OR load_id <> {p})",
+                [document_id, load_id]
+            )
+            self._execute(
+                f"DELETE FROM document_chunks_staging WHERE load_id = {p} AND document_id = {p}",
+                [load_id, document_id]
+            )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def abort_document(self, load_id: str, document_id: str):
+        """Discard the staged rows of a document"""
+        if not self._get_connection():
+            return
+
+        p = self._placeholder
+        self._execute(
+            f"DELETE FROM document_chunks_staging WHERE load_id = {p} AND document_id = {p}",
+            [load_id, document_id]
+        )
+        self.connection.commit()
+
+    def abort_load(self, load_id: str):
+        """Discard whatever is still staged for a load"""
+        if not self._get_connection():
+            return
+
+        self._execute(
+            f"DELETE FROM document_chunks_staging WHERE load_id = {self._placeholder}",
+            [load_id]
+        )
+        self.connection.commit()
+
+    def begin_bulk_load(self):
+        """
+        Drop secondary indexes so a bulk load doesn't maintain them row by row
+
+        Bulk loads are counted per database: the index is dropped when the
+        first one begins and rebuilt when the last one ends (end_bulk_load),
+        so concurrent bulk jobs don't rebuild it under each other. Uploads
+        committed while a bulk load runs go without the index. The count is
+        per process, so bulk jobs should run in one ingestion process.
+        """
+        if not self._get_connection():
+            return
+
+        with _bulk_loads_lock:
+            _bulk_loads[self.url] = _bulk_loads.get(self.url, 0) + 1
+            if _bulk_loads[self.url] == 1 and self._dialect == "sqlite":
+                self._execute("DROP INDEX IF EXISTS idx_chunks_document", [])
+                self.connection.commit()
+
+    def end_bulk_load(self):
+        """Rebuild indexes and statistics once the last bulk load has ended"""
+        if not self._get_connection():
+            return
+
+        with _bulk_loads_lock:
+            _bulk_loads[self.url] = max(0, _bulk_loads.get(self.url, 0) - 1)
+            if _bulk_loads[self.url] == 0:
+                self.build_index()
+
+    def build_index(self):
+        """Build lookup indexes and refresh table statistics"""
+        if self._dialect == "sqlite":
+            self._execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_document "
+                "ON document_chunks(document_id, chunk_index)",
+                []
+            )
+            self._execute(
+                "CREATE INDEX IF NOT EXISTS idx_staging_load "
+                "ON document_chunks_staging(load_id, document_id)",
+                []
+            )
+            self._execute("ANALYZE document_chunks", [])
+        else:
+            # Iceberg tables have no secondary indexes; refresh optimizer stats
+            self._execute("ANALYZE document_chunks", [])
+        self.connection.commit()
+
+    def _execute(self, sql: str, params: List[Any]):
+        """Execute a statement on a fresh cursor"""
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
     def vector_search(
         self,
         query_embedding: List[float],
@@ -126,10 +420,31 @@ class WatsonxDataClient:
 
     def get_document_chunks(self, document_id: str) -> List[Dict[str, Any]]:
         """Get all chunks for a document"""
-        # SELECT * FROM document_chunks WHERE document_id = ?
-        return []
+        if not self._get_connection():
+            return []
+
+        cursor = self._execute(
+            f"SELECT {', '.join(CHUNK_COLUMNS)} FROM document_chunks "
+            f"WHERE document_id = {self._placeholder} ORDER BY chunk_index",
+            [document_id]
+        )
+
+        chunks = []
+        for row in cursor.fetchall():
+            chunk = dict(zip(CHUNK_COLUMNS, row))
+            chunk["embedding"] = unpack_embedding(bytes(chunk["embedding"]))
+            chunk["metadata"] = json.loads(chunk["metadata"] or "{}")
+            chunks.append(chunk)
+        return chunks
 
     def delete_document(self, document_id: str) -> bool:
         """Delete all chunks for a document"""
-        # DELETE FROM document_chunks WHERE document_id = ?
+        if not self._get_connection():
+            return True
+
+        self._execute(
+            f"DELETE FROM document_chunks WHERE document_id = {self._placeholder}",
+            [document_id]
+        )
+        self.connection.commit()
         return True
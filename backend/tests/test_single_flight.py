@@ -0,0 +1,89 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.single_flight import AsyncSingleFlight
+
+
+async def _cancel(task: asyncio.Task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("q", generate) for _ in range(3)))
+        assert [result for result, _ in results] == ["answer"] * 3
+        assert [shared for _, shared in results] == [False, True, True]
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_call_survives_while_a_waiter_remains():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.create_task(flight.do("q", generate))
+        follower = asyncio.create_task(flight.do("q", generate))
+        await asyncio.sleep(0)
+
+        await _cancel(leader)
+        release.set()
+        assert await follower == ("answer", True)
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_generation_never_starts():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        budget = asyncio.Semaphore(1)
+        started = []
+
+        async def generate():
+            # Queued behind the generation budget, as in a batch
+            async with budget:
+                started.append(1)
+                return "answer"
+
+        await budget.acquire()
+        waiters = [asyncio.create_task(flight.do("q", generate)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        for waiter in waiters:
+            await _cancel(waiter)
+        assert flight.in_flight() == 0
+
+        budget.release()
+        await asyncio.sleep(0.01)
+        assert started == []
+
+        # The next caller starts a fresh call instead of joining the cancelled one
+        assert await flight.do("q", generate) == ("answer", False)
+        assert started == [1]
+
+    asyncio.run(scenario())